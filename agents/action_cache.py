@@ -0,0 +1,257 @@
+import hashlib
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+from dotenv import load_dotenv
+from utils import metrics
+from utils.cache import TTLCache
+load_dotenv()
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "at", "to", "for", "with", "by", "from",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "there", "these",
+    "some", "very", "near", "into", "has", "have", "can", "seen", "visible", "appears", "image"
+}
+
+# Signature of the generic per-(issue_type, severity) plan created by warming
+GENERIC_TOKENS = ("*",)
+
+
+def normalize_description(description: str) -> FrozenSet[str]:
+    """Bag of content words: lowercased, stopwords dropped, plural 's' stripped"""
+    tokens = set()
+    for word in re.findall(r"[a-z0-9]+", (description or "").lower()):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.add(word)
+    return frozenset(tokens)
+
+
+def jaccard(a: Iterable[str], b: Iterable[str]) -> float:
+    a, b = set(a), set(b)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def signature_key(issue_type: str, severity: str, tokens: Iterable[str]) -> str:
+    raw = f"{issue_type}|{severity}|{' '.join(sorted(tokens))}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class InMemoryActionBackend:
+    """LRU + TTL backend local to the process"""
+
+    def __init__(self, max_size: int = 2048, ttl: float = 604800):
+        self._entries = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def candidates(self, issue_type: str, severity: str) -> Iterable[Dict[str, Any]]:
+        return [
+            entry for _, entry in self._entries.items()
+            if entry["issue_type"] == issue_type and entry["severity"] == severity
+        ]
+
+    def put(self, entry: Dict[str, Any]):
+        self._entries.set(entry["key"], entry)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SQLActionBackend:
+    """Backend stored in the ``action_plan_cache`` table, shared by every API worker"""
+
+    def __init__(self, ttl: float = 604800, scan_limit: int = 500):
+        self.ttl = ttl
+        self.scan_limit = scan_limit
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        from database.models import ActionPlanCacheEntry, SessionLocal
+        db = SessionLocal()
+        try:
+            row = db.query(ActionPlanCacheEntry).filter(
+                ActionPlanCacheEntry.key == key,
+                ActionPlanCacheEntry.created_at >= self._cutoff()
+            ).first()
+            return self._to_entry(row) if row else None
+        finally:
+            db.close()
+
+    def candidates(self, issue_type: str, severity: str) -> Iterable[Dict[str, Any]]:
+        from database.models import ActionPlanCacheEntry, SessionLocal
+        db = SessionLocal()
+        try:
+            rows = db.query(ActionPlanCacheEntry).filter(
+                ActionPlanCacheEntry.issue_type == issue_type,
+                ActionPlanCacheEntry.severity == severity,
+                ActionPlanCacheEntry.created_at >= self._cutoff()
+            ).order_by(ActionPlanCacheEntry.created_at.desc()).limit(self.scan_limit).all()
+            return [self._to_entry(row) for row in rows]
+        finally:
+            db.close()
+
+    def put(self, entry: Dict[str, Any]):
+        from database.models import ActionPlanCacheEntry, SessionLocal
+        db = SessionLocal()
+        try:
+            db.merge(ActionPlanCacheEntry(
+                key=entry["key"],
+                issue_type=entry["issue_type"],
+                severity=entry["severity"],
+                tokens=sorted(entry["tokens"]),
+                actions=entry["actions"],
+                total_tokens=entry["total_tokens"],
+                generic=entry["generic"],
+                created_at=datetime.utcnow()
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def clear(self):
+        from database.models import ActionPlanCacheEntry, SessionLocal
+        db = SessionLocal()
+        try:
+            db.query(ActionPlanCacheEntry).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    @staticmethod
+    def _to_entry(row) -> Dict[str, Any]:
+        return {
+            "key": row.key,
+            "issue_type": row.issue_type,
+            "severity": row.severity,
+            "tokens": frozenset(row.tokens or []),
+            "actions": row.actions,
+            "total_tokens": row.total_tokens or 0,
+            "generic": bool(row.generic)
+        }
+
+
+class ActionPlanCache:
+    """Semantic cache of action plans keyed on ``(issue_type, severity, description)``.
+
+    Descriptions are reduced to a set of content words. A lookup tries the
+    exact signature, then the most similar cached description of the same
+    type and severity with Jaccard similarity >= ``threshold``. The generic
+    plan a warmed cache holds for each pair is never a lookup hit: it knows
+    nothing about the report, so ``generic`` only hands it out when a plan
+    cannot be generated.
+    """
+
+    def __init__(self, backend, threshold: float = 0.5):
+        self.backend = backend
+        self.threshold = threshold
+        self.hits = 0
+        self.similar_hits = 0
+        self.generic_hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, issue_type: str, severity: str, description: str) -> Optional[Dict[str, Any]]:
+        """Cached action plan for this issue, or None"""
+        tokens = normalize_description(description)
+        entry = self.backend.get(signature_key(issue_type, severity, tokens))
+        counter = "hits"
+        if entry is None:
+            best = None
+            for candidate in self.backend.candidates(issue_type, severity):
+                if candidate["generic"]:
+                    continue
+                score = jaccard(tokens, candidate["tokens"])
+                if score >= self.threshold and (best is None or score > best[0]):
+                    best = (score, candidate)
+            if best is not None:
+                entry, counter = best[1], "similar_hits"
+
+        metrics.CACHE_LOOKUPS.labels("action_plan", counter[:-1] if entry is not None else "miss").inc()
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            setattr(self, counter, getattr(self, counter) + 1)
+            self.tokens_saved += entry["total_tokens"]
+        return entry["actions"]
+
+    def generic(self, issue_type: str, severity: str) -> Optional[Dict[str, Any]]:
+        """Warmed plan for the pair, to use instead of the hard-coded fallback; None if not warmed"""
+        entry = self.backend.get(signature_key(issue_type, severity, GENERIC_TOKENS))
+        if entry is None:
+            return None
+        with self._lock:
+            self.generic_hits += 1
+        return entry["actions"]
+
+    def store(self, issue_type: str, severity: str, description: str, actions: Dict[str, Any],
+              total_tokens: int = 0, generic: bool = False):
+        """Cache ``actions``; ``generic`` marks the warmed plan for the whole pair"""
+        if generic:
+            tokens = frozenset()
+            key = signature_key(issue_type, severity, GENERIC_TOKENS)
+        else:
+            tokens = normalize_description(description)
+            key = signature_key(issue_type, severity, tokens)
+        self.backend.put({
+            "key": key,
+            "issue_type": issue_type,
+            "severity": severity,
+            "tokens": tokens,
+            "actions": actions,
+            "total_tokens": total_tokens,
+            "generic": generic
+        })
+
+    def has_generic(self, issue_type: str, severity: str) -> bool:
+        return self.backend.get(signature_key(issue_type, severity, GENERIC_TOKENS)) is not None
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.similar_hits = self.generic_hits = self.misses = self.tokens_saved = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            served = self.hits + self.similar_hits
+            lookups = served + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "generic_hits": self.generic_hits,
+                "misses": self.misses,
+                "hit_ratio": served / lookups if lookups else 0.0,
+                "tokens_saved": self.tokens_saved
+            }
+
+
+def build_action_cache() -> Optional[ActionPlanCache]:
+    """Create the action plan cache configured by ``ACTION_CACHE_*`` env vars"""
+    backend_name = os.getenv("ACTION_CACHE_BACKEND", "memory").lower()
+    ttl = float(os.getenv("ACTION_CACHE_TTL", "604800"))
+
+    if backend_name in ("none", "off", ""):
+        return None
+    if backend_name == "sql":
+        backend = SQLActionBackend(ttl=ttl)
+    elif backend_name == "memory":
+        backend = InMemoryActionBackend(
+            max_size=int(os.getenv("ACTION_CACHE_SIZE", "2048")),
+            ttl=ttl
+        )
+    else:
+        raise ValueError(f"Unknown ACTION_CACHE_BACKEND: {backend_name}")
+
+    return ActionPlanCache(backend, threshold=float(os.getenv("ACTION_CACHE_THRESHOLD", "0.5")))
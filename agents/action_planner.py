@@ -1,17 +1,86 @@
-from groq import Groq
-import os
-import json
-from typing import Dict, List
+import logging
+from typing import Dict, List, Tuple
 from dotenv import load_dotenv
+from utils import metrics
+from utils.llm_client import CircuitOpenError, get_llm_client
+from utils.structured_output import ActionPlanOutput, complete_structured
+from agents.action_cache import build_action_cache
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+ISSUE_TYPES = ["water_leak", "garbage", "pothole", "criminal_activity", "dirt_on_road", "accident"]
+SEVERITIES = ["low", "medium", "high", "critical"]
+
+FALLBACK_ACTIONS = {
+    "immediate_actions": ["Report to authorities", "Document the issue"],
+    "citizen_actions": ["Stay safe", "Inform neighbors"],
+    "authority_actions": ["Inspect the site", "Deploy team"],
+    "preventive_measures": ["Regular maintenance", "Community awareness"]
+}
+
 class ActionPlannerAgent:
     def __init__(self):
-        self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self.groq_client = get_llm_client()
+        self.cache = build_action_cache()
         
     def suggest_actions(self, issue_type: str, description: str, severity: str) -> List[Dict[str, str]]:
         """Generate actionable suggestions for the detected issue"""
+        return self.plan(issue_type, description, severity)[0]
+    
+    def plan(self, issue_type: str, description: str, severity: str) -> Tuple[Dict, bool, int]:
+        """Action plan, whether it came from the cache, and the model calls made for it.
+
+        When the model call fails (or the LLM circuit is open) the warmed
+        generic plan for the pair is used if there is one, else
+        FALLBACK_ACTIONS; neither is cached as this description's plan.
+        The calls spent on the failed attempt are still counted.
+        """
+        if self.cache is not None:
+            cached = self.cache.lookup(issue_type, severity, description)
+            if cached is not None:
+                return cached, True, 0
         
+        try:
+            actions, total_tokens, calls = self._generate(issue_type, description, severity)
+        except Exception as e:
+            logger.warning("Action planning failed, using fallback: %s", e)
+            metrics.FALLBACKS.labels("action_plan").inc()
+            calls = 0 if isinstance(e, CircuitOpenError) else getattr(e, "attempts", 1)
+            generic = self.cache.generic(issue_type, severity) if self.cache is not None else None
+            if generic is not None:
+                return generic, True, calls
+            return dict(FALLBACK_ACTIONS), False, calls
+        
+        if self.cache is not None:
+            self.cache.store(issue_type, severity, description, actions, total_tokens=total_tokens)
+        return actions, False, calls
+    
+    def warm_cache(self, issue_types: List[str] = None, severities: List[str] = None) -> int:
+        """Precompute a generic plan for every (issue_type, severity) pair not cached yet"""
+        if self.cache is None:
+            return 0
+        with metrics.caller("warm_action_cache"):
+            return self._warm(issue_types, severities)
+    
+    def _warm(self, issue_types: List[str] = None, severities: List[str] = None) -> int:
+        warmed = 0
+        for issue_type in issue_types or ISSUE_TYPES:
+            for severity in severities or SEVERITIES:
+                if self.cache.has_generic(issue_type, severity):
+                    continue
+                description = f"{severity} severity {issue_type.replace('_', ' ')} reported by a citizen"
+                try:
+                    actions, total_tokens, _ = self._generate(issue_type, description, severity)
+                except Exception as e:
+                    logger.warning("Warming action plan for %s/%s failed: %s", issue_type, severity, e)
+                    continue
+                self.cache.store(issue_type, severity, description, actions, total_tokens=total_tokens, generic=True)
+                warmed += 1
+        return warmed
+    
+    def _generate(self, issue_type: str, description: str, severity: str) -> Tuple[Dict, int]:
+        """Ask the model for a plan; returns ``(actions, total_tokens, calls)`` and raises on failure"""
         prompt = f"""As a civic management expert, provide actionable suggestions for this issue:
 
 Issue Type: {issue_type}
@@ -31,22 +100,13 @@ Respond in JSON format:
     "preventive_measures": ["measure1", "measure2", ...]
 }}"""
 
-        try:
-            response = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.5,
-                max_tokens=1024
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            return result
-            
-        except Exception as e:
-            print(f"Error in action planning: {e}")
-            return {
-                "immediate_actions": ["Report to authorities", "Document the issue"],
-                "citizen_actions": ["Stay safe", "Inform neighbors"],
-                "authority_actions": ["Inspect the site", "Deploy team"],
-                "preventive_measures": ["Regular maintenance", "Community awareness"]
-            }
\ No newline at end of file
+        result, response, calls = complete_structured(
+            self.groq_client,
+            ActionPlanOutput,
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.5,
+            max_tokens=1024
+        )
+        usage = getattr(response, "usage", None)
+        return result, getattr(usage, "total_tokens", 0) or 0, calls
\ No newline at end of file
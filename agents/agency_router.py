@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, object_session
+from database.models import Agency, SessionLocal
+load_dotenv()
+
+DEFAULT_ROUTING_PRIORITY = 100
+
+
+class AgencyRouter:
+    """In-memory ``issue_type -> [agency, ...]`` index.
+
+    The agencies table is loaded once and kept in a dict, so routing a report
+    is a dictionary lookup with no database round trip. The index is
+    rebuilt when an Agency is written through the ORM in this process, and
+    after ``ttl`` seconds it re-checks a cheap version stamp
+    (row count + latest ``updated_at``) to pick up changes made elsewhere.
+    """
+
+    def __init__(self, ttl: float = None, default_agency: str = None, session_factory=SessionLocal):
+        self.ttl = ttl if ttl is not None else float(os.getenv("AGENCY_ROUTING_TTL", "300"))
+        self.default_agency_name = default_agency or os.getenv("DEFAULT_AGENCY")
+        self.session_factory = session_factory
+        self._routes = None  # (index, default) swapped in as one tuple
+        self._stale = True
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def route(self, issue_type: str) -> Optional[Dict[str, Any]]:
+        """Highest-priority agency for ``issue_type``, else the default agency"""
+        agencies = self.route_all(issue_type)
+        return agencies[0] if agencies else None
+
+    def route_all(self, issue_type: str) -> List[Dict[str, Any]]:
+        """Every agency handling ``issue_type`` in priority order, or ``[default]``"""
+        index, default = self._current_routes()
+        matches = index.get(issue_type)
+        if matches:
+            return list(matches)
+        return [default] if default else []
+
+    def invalidate(self):
+        """Force a rebuild on the next lookup"""
+        self._stale = True
+
+    def _current_routes(self):
+        routes = self._routes
+        if routes is not None and not self._stale and time.monotonic() - self._checked_at < self.ttl:
+            return routes
+        with self._lock:
+            if self._routes is not None and not self._stale and time.monotonic() - self._checked_at < self.ttl:
+                return self._routes
+            db = self.session_factory()
+            try:
+                count, latest = db.query(func.count(Agency.id), func.max(Agency.updated_at)).one()
+                version = (count, latest)
+                if self._routes is None or self._stale or version != self._version:
+                    self._stale = False
+                    self._routes = self._build(db.query(Agency).all())
+                    self._version = version
+                self._checked_at = time.monotonic()
+            finally:
+                db.close()
+            return self._routes
+
+    def _build(self, agencies):
+        index: Dict[str, List[Dict[str, Any]]] = {}
+        default = None
+        ordered = sorted(
+            agencies,
+            key=lambda a: (a.routing_priority if a.routing_priority is not None else DEFAULT_ROUTING_PRIORITY, a.id)
+        )
+        for agency in ordered:
+            data = {
+                "agency_id": agency.id,
+                "agency_name": agency.name,
+                "email": agency.email,
+                "phone": agency.phone
+            }
+            for issue_type in agency.issue_types or []:
+                index.setdefault(issue_type, []).append(data)
+            if default is None and (
+                agency.is_default or (self.default_agency_name and agency.name == self.default_agency_name)
+            ):
+                default = data
+        return index, default
+
+
+_router: Optional[AgencyRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_agency_router() -> AgencyRouter:
+    """Process-wide router shared by every NotificationAgent"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = AgencyRouter()
+    return _router
+
+
+@event.listens_for(Agency, "after_insert")
+@event.listens_for(Agency, "after_update")
+@event.listens_for(Agency, "after_delete")
+def _mark_agencies_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["agencies_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    # Rebuilding before the commit lands would cache the old rows again
+    if session.info.pop("agencies_changed", False) and _router is not None:
+        _router.invalidate()
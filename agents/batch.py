@@ -0,0 +1,469 @@
+import csv
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from database.models import BatchItem, BatchJob, CivicIssue, SessionLocal
+from utils.rate_limit import RateLimiter
+from utils.uploads import InvalidImageError, UploadTooLargeError, store_image_bytes
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Failures worth another attempt: lost / locked database connections, pool
+# exhaustion and I/O hiccups. LLM errors are not among them; the LLM client
+# already retries each call and owns the circuit breaker.
+TRANSIENT_ERRORS = (OperationalError, PoolTimeoutError, ConnectionError, TimeoutError, InterruptedError)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+MANIFEST_NAMES = ("manifest.csv", "manifest.jsonl")
+MANIFEST_FIELDS = ("reporter_name", "location", "latitude", "longitude", "audio_text")
+
+
+class ManifestError(ValueError):
+    """Raised for unreadable manifests or rows that don't name an image"""
+
+
+class BatchNotFoundError(LookupError):
+    pass
+
+
+class BatchBusyError(RuntimeError):
+    """Raised when a batch is already being processed in this process"""
+
+
+class BatchSource:
+    """Images, and an optional embedded manifest, from a directory or zip archive.
+
+    Item keys are paths relative to the directory / archive root. Nothing is
+    extracted by name, so archive paths can't escape the upload directory.
+    """
+
+    def __init__(self, source):
+        self.images: Dict[str, int] = {}  # item key -> uncompressed size
+        self.manifest: Optional[Tuple[str, bytes]] = None
+        self._archive = None
+        self._root = None
+
+        if isinstance(source, (str, Path)) and Path(source).is_dir():
+            self._root = Path(source)
+            entries = [
+                (path.relative_to(self._root).as_posix(), path.stat().st_size)
+                for path in sorted(self._root.rglob("*")) if path.is_file()
+            ]
+        else:
+            try:
+                self._archive = zipfile.ZipFile(source)
+            except zipfile.BadZipFile:
+                raise ManifestError("Batch source is neither a directory nor a zip archive")
+            entries = [(info.filename, info.file_size) for info in self._archive.infolist() if not info.is_dir()]
+
+        for key, size in entries:
+            name = key.rsplit("/", 1)[-1]
+            if name.startswith(".") or key.startswith("__MACOSX/"):
+                continue
+            if name.lower() in MANIFEST_NAMES and self.manifest is None:
+                self.manifest = (name, self.read(key))
+            elif Path(name).suffix.lower() in IMAGE_EXTENSIONS:
+                self.images[key] = size
+
+    def read(self, key: str) -> bytes:
+        if self._archive is not None:
+            return self._archive.read(key)
+        return (self._root / key).read_bytes()
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Item key for a manifest file name, matching on the base name if unambiguous"""
+        name = name.strip().lstrip("./")
+        if name in self.images:
+            return name
+        matches = [key for key in self.images if key.rsplit("/", 1)[-1] == name]
+        return matches[0] if len(matches) == 1 else None
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+
+
+def parse_manifest(data: bytes, name: str) -> List[Dict[str, Any]]:
+    """Rows of a CSV or JSONL manifest as ``{"filename", reporter_name, location, ...}``"""
+    text = data.decode("utf-8-sig")
+    if name.lower().endswith(".csv"):
+        rows = list(csv.DictReader(io.StringIO(text)))
+    elif name.lower().endswith((".jsonl", ".ndjson")):
+        try:
+            rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise ManifestError(f"Invalid JSONL manifest: {e}")
+    else:
+        raise ManifestError("Manifest must be a .csv or .jsonl file")
+
+    parsed = []
+    for number, row in enumerate(rows, start=1):
+        filename = row.get("filename") or row.get("image") or row.get("file")
+        if not filename:
+            raise ManifestError(f"Manifest row {number} has no filename")
+        entry = {"filename": str(filename)}
+        for field in MANIFEST_FIELDS:
+            value = row.get(field)
+            if value in ("", None):
+                entry[field] = None
+            elif field in ("latitude", "longitude"):
+                try:
+                    entry[field] = float(value)
+                except (TypeError, ValueError):
+                    raise ManifestError(f"Manifest row {number} has an invalid {field}")
+            else:
+                entry[field] = str(value)
+        parsed.append(entry)
+    return parsed
+
+
+def create_batch(
+    db,
+    source: BatchSource,
+    upload_dir: Path,
+    max_bytes: int,
+    max_pixels: Optional[int] = None,
+    manifest: Optional[Tuple[str, bytes]] = None,
+    defaults: Dict[str, Any] = None,
+    label: str = None
+) -> str:
+    """Store every image content-addressed and record one pending ``BatchItem`` each.
+
+    Manifest rows (an explicit ``manifest`` wins over one inside the source)
+    decide which images are imported and with which reporter / location;
+    without a manifest every image in the source is imported with
+    ``defaults``. Items whose image is missing, too large or unreadable are
+    recorded as failed right away. Returns the batch id.
+    """
+    defaults = defaults or {}
+    manifest = manifest or source.manifest
+    if manifest is not None:
+        rows = parse_manifest(manifest[1], manifest[0])
+    else:
+        rows = [{"filename": key} for key in sorted(source.images)]
+
+    batch_id = uuid.uuid4().hex
+    items = []
+    seen = set()
+    for row in rows:
+        key = source.resolve(row["filename"])
+        item_key = key or row["filename"]
+        if item_key in seen:
+            raise ManifestError(f"{item_key} is listed more than once")
+        seen.add(item_key)
+
+        item = {
+            "batch_id": batch_id,
+            "item_key": item_key,
+            "image_path": None,
+            "image_hash": None,
+            "status": "pending",
+            "attempts": 0,
+            "error": None
+        }
+        for field in MANIFEST_FIELDS:
+            value = row.get(field)
+            item[field] = value if value is not None else defaults.get(field)
+
+        if key is None:
+            item.update(status="failed", error="Image not found in batch")
+        elif source.images[key] > max_bytes:
+            item.update(status="failed", error=f"Image exceeds the {max_bytes} byte limit")
+        else:
+            try:
+                saved = store_image_bytes(source.read(key), upload_dir, max_bytes, max_pixels)
+                item.update(image_path=str(saved.path), image_hash=saved.sha256)
+            except (UploadTooLargeError, InvalidImageError) as e:
+                item.update(status="failed", error=str(e))
+        items.append(item)
+
+    db.add(BatchJob(id=batch_id, source=label, status="pending", total_items=len(items)))
+    if items:
+        db.execute(insert(BatchItem), items)
+    db.commit()
+    return batch_id
+
+
+def batch_summary(db, batch_id: str) -> Dict[str, Any]:
+    batch = db.query(BatchJob).filter(BatchJob.id == batch_id).first()
+    if batch is None:
+        raise BatchNotFoundError(batch_id)
+    counts = dict(
+        db.query(BatchItem.status, func.count(BatchItem.id))
+        .filter(BatchItem.batch_id == batch_id)
+        .group_by(BatchItem.status)
+        .all()
+    )
+    return {
+        "batch_id": batch.id,
+        "source": batch.source,
+        "status": batch.status,
+        "total_items": batch.total_items,
+        "counts": counts,
+        "created_at": batch.created_at.isoformat() if batch.created_at else None,
+        "updated_at": batch.updated_at.isoformat() if batch.updated_at else None
+    }
+
+
+class BatchProcessor:
+    """Runs the pending items of a batch through the agent workflow.
+
+    Items are processed by a dedicated thread pool (so a large import doesn't
+    occupy the API's report workers), started no faster than
+    ``rate_per_minute`` and retried with exponential backoff after a
+    transient database or I/O error (``TRANSIENT_ERRORS``). An item whose
+    vision call failed is not retried here: the LLM client has already
+    retried it, and more attempts would only work against its circuit
+    breaker and token budget during an outage. Finished items are
+    written in chunks: one bulk insert of issues and notifications plus one
+    bulk update of their batch items per transaction. An item's status only
+    changes in the transaction that stores its issue, so after a crash
+    re-running the batch picks up exactly the items still pending.
+    """
+
+    def __init__(
+        self,
+        orchestrator,
+        concurrency: int = None,
+        rate_per_minute: float = None,
+        max_retries: int = None,
+        flush_size: int = None,
+        flush_interval: float = 2.0,
+        retry_delay: float = 1.0,
+        session_factory=SessionLocal
+    ):
+        self.orchestrator = orchestrator
+        self.concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+        rate = rate_per_minute if rate_per_minute is not None else float(os.getenv("BATCH_RATE_PER_MINUTE", "60"))
+        self.limiter = RateLimiter.per_minute(rate)
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("BATCH_MAX_RETRIES", "3"))
+        self.flush_size = flush_size or int(os.getenv("BATCH_FLUSH_SIZE", "25"))
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.session_factory = session_factory
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def is_active(self, batch_id: str) -> bool:
+        return batch_id in self._active
+
+    def run(self, batch_id: str, retry_failed: bool = False) -> Iterator[Dict[str, Any]]:
+        """Process the batch's pending items, yielding one result per item once it is committed.
+
+        The first yielded record is ``{"type": "batch", ...}`` and the last is
+        ``{"type": "summary", ...}``. Closing the iterator early (e.g. the
+        client disconnected) stores results that already finished and leaves
+        the rest pending for a later run.
+        """
+        db = self.session_factory()
+        try:
+            batch = db.query(BatchJob).filter(BatchJob.id == batch_id).first()
+            if batch is None:
+                raise BatchNotFoundError(batch_id)
+            statuses = ["pending", "failed"] if retry_failed else ["pending"]
+            items = [
+                {column.name: getattr(row, column.name) for column in BatchItem.__table__.columns}
+                for row in db.query(BatchItem).filter(
+                    BatchItem.batch_id == batch_id,
+                    BatchItem.status.in_(statuses),
+                    BatchItem.image_path.isnot(None)
+                ).order_by(BatchItem.id)
+            ]
+        finally:
+            db.close()
+
+        with self._lock:
+            if batch_id in self._active:
+                raise BatchBusyError(f"Batch {batch_id} is already running")
+            self._active.add(batch_id)
+
+        try:
+            self._set_status(batch_id, "running")
+            yield {"type": "batch", "batch_id": batch_id, "items": len(items)}
+            yield from self._process_items(batch_id, items)
+            self._set_status(batch_id, "completed")
+            db = self.session_factory()
+            try:
+                yield {"type": "summary", **batch_summary(db, batch_id)}
+            finally:
+                db.close()
+        except BaseException:
+            self._set_status(batch_id, "interrupted")
+            raise
+        finally:
+            with self._lock:
+                self._active.discard(batch_id)
+
+    def _process_items(self, batch_id: str, items: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch")
+        finished = []
+        try:
+            remaining = {pool.submit(self._process_item, item) for item in items}
+            last_flush = time.monotonic()
+            while remaining:
+                done, remaining = wait(remaining, timeout=self.flush_interval, return_when=FIRST_COMPLETED)
+                finished.extend(future.result() for future in done)
+                if finished and (
+                    len(finished) >= self.flush_size
+                    or not remaining
+                    or time.monotonic() - last_flush >= self.flush_interval
+                ):
+                    chunk, finished = finished, []
+                    yield from self._write_chunk(batch_id, chunk)
+                    last_flush = time.monotonic()
+        except GeneratorExit:
+            # Keep the work that already finished; everything else stays pending
+            if finished:
+                list(self._write_chunk(batch_id, finished))
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _process_item(self, item: Dict[str, Any]):
+        """Run the workflow for one item, retrying transient errors; returns ``(item, state, attempts, error)``"""
+        for attempt in range(1, self.max_retries + 2):
+            self.limiter.acquire()
+            try:
+                state = self.orchestrator.process(self._initial_state(item), persist=False)
+            except TRANSIENT_ERRORS as e:
+                logger.warning("Batch item %s attempt %s failed: %s", item["item_key"], attempt, e)
+                if attempt > self.max_retries:
+                    return item, None, attempt, str(e)
+                time.sleep(self.retry_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                continue
+            except Exception as e:
+                logger.warning("Batch item %s failed: %s", item["item_key"], e)
+                return item, None, attempt, str(e)
+            if state.get("detection_fallback"):
+                return item, None, attempt, "Vision detection failed"
+            return item, state, attempt, None
+
+    @staticmethod
+    def _initial_state(item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "image_path": item["image_path"],
+            "audio_text": item["audio_text"],
+            "reporter_name": item["reporter_name"],
+            "location": item["location"],
+            "latitude": item["latitude"],
+            "longitude": item["longitude"],
+            "issue_detected": False,
+            "issue_type": "",
+            "severity": "",
+            "description": "",
+            "confidence": 0.0,
+            "suggested_actions": {},
+            "agency_data": {},
+            "notification_message": "",
+            "notification_sent": False,
+            "issue_id": None,
+            "image_hash": item["image_hash"],
+            "duplicate_of": None,
+            "detection_cached": False,
+            "llm_calls": {},
+            "node_timings": {},
+            "error": ""
+        }
+
+    def _write_chunk(self, batch_id: str, chunk) -> Iterator[Dict[str, Any]]:
+        """Store a chunk of finished items in one transaction, then yield their results"""
+        db = self.session_factory()
+        try:
+            issues = []
+            for item, state, _, _ in chunk:
+                if state is not None and state["issue_detected"]:
+                    issue = CivicIssue(
+                        reporter_name=item["reporter_name"],
+                        location=item["location"],
+                        latitude=item["latitude"],
+                        longitude=item["longitude"],
+                        image_path=item["image_path"],
+                        audio_path=item["audio_text"],
+                        **self.orchestrator.issue_fields(state)
+                    )
+                    issues.append((item, state, issue))
+            db.add_all([issue for _, _, issue in issues])
+            db.flush()
+
+            notifier = self.orchestrator.notifier
+            issue_ids = {}
+            for item, state, issue in issues:
+                issue_ids[item["id"]] = issue.id
+                if state.get("incident"):
+                    self.orchestrator.attach_to_incident(db, state)
+                elif state.get("agency_data") and state.get("notification_message"):
+                    notifier.send_notification(
+                        issue.id, state["agency_data"], state["notification_message"], db=db,
+                        hold_seconds=notifier.polish_hold if notifier.should_polish(state["severity"]) else 0
+                    )
+
+            now = datetime.utcnow()
+            results = []
+            updates = []
+            for item, state, attempts, error in chunk:
+                if state is None:
+                    status = "failed"
+                elif state["issue_detected"]:
+                    status = "done"
+                else:
+                    status = "no_issue"
+                issue_id = issue_ids.get(item["id"])
+                updates.append({
+                    "id": item["id"],
+                    "status": status,
+                    "issue_id": issue_id,
+                    "attempts": item["attempts"] + attempts,
+                    "error": error,
+                    "updated_at": now
+                })
+                results.append({
+                    "type": "item",
+                    "item": item["item_key"],
+                    "status": status,
+                    "issue_id": issue_id,
+                    "issue_type": state["issue_type"] if state else None,
+                    "severity": state["severity"] if state else None,
+                    "duplicate_of": state.get("duplicate_of") if state else None,
+                    "attempts": item["attempts"] + attempts,
+                    "error": error
+                })
+            db.execute(update(BatchItem), updates)
+            db.query(BatchJob).filter(BatchJob.id == batch_id).update({"updated_at": now})
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        cache = self.orchestrator.detection_cache
+        notifier = self.orchestrator.notifier
+        for item, state, issue in issues:
+            issue_id = issue_ids[item["id"]]
+            if cache is not None and state.get("image_hash") and not state.get("duplicate_of"):
+                cache.link_issue(state["image_hash"], issue_id)
+            if state.get("agency_data") and state.get("notification_message") and notifier.should_polish(state["severity"]):
+                notifier.polish_async(issue_id, self.orchestrator.issue_data(state), state["notification_message"])
+        yield from results
+
+    def _set_status(self, batch_id: str, status: str):
+        db = self.session_factory()
+        try:
+            db.query(BatchJob).filter(BatchJob.id == batch_id).update({"status": status})
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,280 @@
+import importlib
+import logging
+import os
+import random
+import smtplib
+import threading
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import and_, func, or_, update
+from database.models import Agency, Notification, SessionLocal
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class ConsoleTransport:
+    """Prints notifications to stdout (the original behaviour)"""
+
+    def send_batch(self, agency: Dict[str, Any], notifications: List[Dict[str, Any]]) -> Dict[int, Optional[str]]:
+        for notification in notifications:
+            print(f"\n{'='*60}")
+            print(f"NOTIFICATION SENT TO: {agency['agency_name']}")
+            print(f"Email: {agency['email']}")
+            print(f"Phone: {agency['phone']}")
+            print(f"\nMessage:\n{notification['message']}")
+            print(f"{'='*60}\n")
+        return {notification["id"]: None for notification in notifications}
+
+
+class SMTPTransport:
+    """Emails each notification to the agency, one SMTP session per agency batch"""
+
+    def __init__(self, host: str = "localhost", port: int = 25, sender: str = "civic-alerts@localhost",
+                 username: str = None, password: str = None, starttls: bool = False, timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls) -> "SMTPTransport":
+        return cls(
+            host=os.getenv("SMTP_HOST", "localhost"),
+            port=int(os.getenv("SMTP_PORT", "25")),
+            sender=os.getenv("SMTP_SENDER", "civic-alerts@localhost"),
+            username=os.getenv("SMTP_USERNAME") or None,
+            password=os.getenv("SMTP_PASSWORD") or None,
+            starttls=os.getenv("SMTP_STARTTLS", "false").lower() == "true",
+            timeout=float(os.getenv("SMTP_TIMEOUT", "10"))
+        )
+
+    def send_batch(self, agency: Dict[str, Any], notifications: List[Dict[str, Any]]) -> Dict[int, Optional[str]]:
+        if not agency.get("email"):
+            return {n["id"]: "Agency has no email address" for n in notifications}
+
+        results = {}
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for notification in notifications:
+                body = (notification["message"] or "").strip()
+                message = EmailMessage()
+                message["From"] = self.sender
+                message["To"] = agency["email"]
+                message["Subject"] = f"[Civic issue #{notification['issue_id']}] {body.splitlines()[0][:120] if body else ''}"
+                message.set_content(body)
+                try:
+                    smtp.send_message(message)
+                    results[notification["id"]] = None
+                except smtplib.SMTPServerDisconnected:
+                    raise
+                except smtplib.SMTPException as e:
+                    # A rejected message doesn't end the session; the rest of the batch still goes out
+                    results[notification["id"]] = str(e)
+        return results
+
+
+TRANSPORTS = {
+    "console": ConsoleTransport,
+    "smtp": SMTPTransport.from_env
+}
+
+
+def build_transport(name: str = None):
+    """Transport named by ``NOTIFICATION_TRANSPORT``: a TRANSPORTS key or ``package.module:Factory``"""
+    name = name or os.getenv("NOTIFICATION_TRANSPORT", "console")
+    if name in TRANSPORTS:
+        return TRANSPORTS[name]()
+    if ":" in name:
+        module_name, factory = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), factory)()
+    raise ValueError(f"Unknown NOTIFICATION_TRANSPORT: {name}")
+
+
+class OutboxDispatcher:
+    """Delivers ``pending`` notification rows written by the agent workflow.
+
+    Each worker claims up to ``batch_size`` due rows (``FOR UPDATE SKIP
+    LOCKED`` where the database supports it), stamps them ``sending`` with
+    a claim token and commits, so no other worker or process can pick them
+    up. The rows are then sent grouped by agency outside any transaction.
+    Delivered rows become ``sent``. Failed rows go back to ``pending`` with
+    an exponential, jittered ``next_attempt_at``, or become ``failed`` after
+    ``max_attempts``. Rows left ``sending`` by a crashed worker are
+    reclaimed after ``lease`` seconds.
+    """
+
+    def __init__(
+        self,
+        transport=None,
+        workers: int = None,
+        batch_size: int = None,
+        max_attempts: int = None,
+        backoff_base: float = None,
+        backoff_max: float = 3600,
+        poll_interval: float = None,
+        lease: float = 300,
+        session_factory=SessionLocal
+    ):
+        self.transport = transport or build_transport()
+        self.workers = workers if workers is not None else int(os.getenv("NOTIFICATION_WORKERS", "2"))
+        self.batch_size = batch_size or int(os.getenv("NOTIFICATION_BATCH_SIZE", "50"))
+        self.max_attempts = max_attempts or int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv("NOTIFICATION_BACKOFF_BASE", "30"))
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("NOTIFICATION_POLL_INTERVAL", "2"))
+        self.lease = lease
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"notification-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delivered = self.dispatch_once()
+            except Exception:
+                logger.exception("Notification worker error")
+                delivered = 0
+            if not delivered:
+                self._stop.wait(self.poll_interval)
+
+    def dispatch_once(self) -> int:
+        """Claim and deliver one batch; returns the number of rows processed"""
+        token, claimed = self.claim()
+        if not claimed:
+            return 0
+
+        by_agency: Dict[int, List[Dict[str, Any]]] = {}
+        for notification in claimed:
+            by_agency.setdefault(notification["agency_id"], []).append(notification)
+        agencies = self._agencies(list(by_agency))
+
+        outcomes: Dict[int, Optional[str]] = {}
+        for agency_id, notifications in by_agency.items():
+            agency = agencies.get(agency_id)
+            if agency is None:
+                outcomes.update({n["id"]: f"Unknown agency {agency_id}" for n in notifications})
+                continue
+            try:
+                outcomes.update(self.transport.send_batch(agency, notifications))
+            except Exception as e:
+                outcomes.update({n["id"]: f"{e.__class__.__name__}: {e}" for n in notifications})
+
+        self._record(token, claimed, outcomes)
+        return len(claimed)
+
+    def claim(self) -> Tuple[str, List[Dict[str, Any]]]:
+        """Claim a batch of due rows: ``(claim token, rows)``"""
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = or_(
+            and_(
+                Notification.status == "pending",
+                or_(Notification.next_attempt_at.is_(None), Notification.next_attempt_at <= now)
+            ),
+            and_(Notification.status == "sending", Notification.claimed_at < now - timedelta(seconds=self.lease))
+        )
+        db = self.session_factory()
+        try:
+            ids = [
+                row.id for row in db.query(Notification.id).filter(due)
+                .order_by(Notification.id).limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ]
+            if not ids:
+                db.rollback()
+                return token, []
+            # The status guard makes the claim safe even where FOR UPDATE is a no-op (SQLite)
+            db.execute(
+                update(Notification)
+                .where(Notification.id.in_(ids), due)
+                .values(status="sending", claim_token=token, claimed_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return token, [
+                {"id": n.id, "issue_id": n.issue_id, "agency_id": n.agency_id,
+                 "message": n.message, "attempts": n.attempts or 0}
+                for n in db.query(Notification).filter(Notification.claim_token == token).order_by(Notification.id)
+            ]
+        finally:
+            db.close()
+
+    def _record(self, token: str, claimed: List[Dict[str, Any]], outcomes: Dict[int, Optional[str]]):
+        """Store the outcomes of rows still held under ``token``.
+
+        A row whose lease ran out may have been reclaimed by another worker
+        while this one was sending; the token guard leaves that row to its
+        new owner.
+        """
+        now = datetime.utcnow()
+        updates = []
+        for notification in claimed:
+            error = outcomes.get(notification["id"], "No result from transport")
+            attempts = notification["attempts"] + 1
+            if error is None:
+                updates.append({"id": notification["id"], "status": "sent", "attempts": attempts,
+                                "sent_at": now, "last_error": None, "claim_token": None})
+            elif attempts >= self.max_attempts:
+                updates.append({"id": notification["id"], "status": "failed", "attempts": attempts,
+                                "last_error": error, "claim_token": None})
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                updates.append({"id": notification["id"], "status": "pending", "attempts": attempts,
+                                "last_error": error, "claim_token": None,
+                                "next_attempt_at": now + timedelta(seconds=delay)})
+        db = self.session_factory()
+        try:
+            for row in updates:
+                db.query(Notification).filter(
+                    Notification.id == row.pop("id"), Notification.claim_token == token
+                ).update(row, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _agencies(self, agency_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            return {
+                agency.id: {
+                    "agency_id": agency.id,
+                    "agency_name": agency.name,
+                    "email": agency.email,
+                    "phone": agency.phone
+                }
+                for agency in db.query(Agency).filter(Agency.id.in_(agency_ids))
+            }
+        finally:
+            db.close()
+
+
+def outbox_stats(db) -> Dict[str, Any]:
+    counts = dict(db.query(Notification.status, func.count(Notification.id)).group_by(Notification.status).all())
+    oldest = db.query(func.min(Notification.created_at)).filter(Notification.status == "pending").scalar()
+    return {
+        "counts": counts,
+        "oldest_pending_at": oldest.isoformat() if oldest else None
+    }
@@ -0,0 +1,296 @@
+import hashlib
+import io
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from sqlalchemy import or_
+from utils import metrics
+from utils.cache import TTLCache
+load_dotenv()
+
+
+def content_hash(image_data: bytes) -> str:
+    """Exact SHA-256 content hash of the raw upload"""
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def perceptual_hash(image_data: bytes, hash_size: int = 8) -> Optional[str]:
+    """64-bit difference hash (dHash) as hex, or None if the image can't be decoded.
+
+    Re-encoded, resized or slightly cropped copies of the same photo land
+    within a few bits of each other, unlike their SHA-256 digests.
+    """
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(image_data)) as img:
+            pixels = list(
+                img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).getdata()
+            )
+    except Exception:
+        return None
+
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def hash_bands(phash: str, bands: int = 4) -> list:
+    """``phash`` split into ``bands`` equal hex slices.
+
+    Two hashes within ``bands - 1`` bits of each other always share at
+    least one slice, so slices work as lookup buckets for near duplicates.
+    """
+    width = len(phash) // bands
+    return [phash[i * width:(i + 1) * width] for i in range(bands)]
+
+
+def informative(phash: str, min_bits: int) -> bool:
+    """False for near-constant hashes (flat or low-texture images), which collide across unrelated photos"""
+    set_bits = bin(int(phash, 16)).count("1")
+    return min_bits <= set_bits <= len(phash) * 4 - min_bits
+
+
+class InMemoryDetectionBackend:
+    """LRU + TTL backend local to the process"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 86400):
+        self._entries = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get(self, image_hash: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(image_hash)
+
+    def find_similar(self, phash: str, max_distance: int) -> Optional[Dict[str, Any]]:
+        best = None
+        for _, entry in self._entries.items():
+            if not entry.get("perceptual_hash"):
+                continue
+            distance = hamming_distance(phash, entry["perceptual_hash"])
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, entry)
+        return best[1] if best else None
+
+    def put(self, entry: Dict[str, Any]):
+        self._entries.set(entry["image_hash"], entry)
+
+    def link_issue(self, image_hash: str, issue_id: int):
+        entry = self._entries.get(image_hash)
+        if entry is not None and entry.get("issue_id") is None:
+            self._entries.set(image_hash, {**entry, "issue_id": issue_id})
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SQLDetectionBackend:
+    """Backend stored in the ``detection_cache`` table, shared by every API worker.
+
+    Near-duplicate lookups read only the rows sharing one 16-bit band of
+    the perceptual hash (indexed columns), not the whole table: matches up
+    to 3 bits apart are always found, further ones when a band survives.
+    """
+
+    def __init__(self, ttl: float = 86400, scan_limit: int = 500):
+        self.ttl = ttl
+        self.scan_limit = scan_limit
+
+    def get(self, image_hash: str) -> Optional[Dict[str, Any]]:
+        from database.models import DetectionCacheEntry, SessionLocal
+        db = SessionLocal()
+        try:
+            row = db.query(DetectionCacheEntry).filter(
+                DetectionCacheEntry.image_hash == image_hash,
+                DetectionCacheEntry.created_at >= self._cutoff()
+            ).first()
+            return self._to_entry(row) if row else None
+        finally:
+            db.close()
+
+    def find_similar(self, phash: str, max_distance: int) -> Optional[Dict[str, Any]]:
+        from database.models import DetectionCacheEntry, SessionLocal
+        db = SessionLocal()
+        try:
+            bands = hash_bands(phash)
+            rows = db.query(DetectionCacheEntry).filter(
+                or_(*(
+                    getattr(DetectionCacheEntry, f"phash_band_{i}") == band for i, band in enumerate(bands)
+                )),
+                DetectionCacheEntry.created_at >= self._cutoff()
+            ).order_by(DetectionCacheEntry.created_at.desc()).limit(self.scan_limit).all()
+            best = None
+            for row in rows:
+                distance = hamming_distance(phash, row.perceptual_hash)
+                if distance <= max_distance and (best is None or distance < best[0]):
+                    best = (distance, row)
+            return self._to_entry(best[1]) if best else None
+        finally:
+            db.close()
+
+    def put(self, entry: Dict[str, Any]):
+        from database.models import DetectionCacheEntry, SessionLocal
+        phash = entry.get("perceptual_hash")
+        bands = hash_bands(phash) if phash else [None] * 4
+        db = SessionLocal()
+        try:
+            db.merge(DetectionCacheEntry(
+                image_hash=entry["image_hash"],
+                perceptual_hash=phash,
+                phash_band_0=bands[0],
+                phash_band_1=bands[1],
+                phash_band_2=bands[2],
+                phash_band_3=bands[3],
+                result=entry["result"],
+                issue_id=entry.get("issue_id"),
+                created_at=datetime.utcnow()
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def link_issue(self, image_hash: str, issue_id: int):
+        from database.models import DetectionCacheEntry, SessionLocal
+        db = SessionLocal()
+        try:
+            db.query(DetectionCacheEntry).filter(
+                DetectionCacheEntry.image_hash == image_hash,
+                DetectionCacheEntry.issue_id.is_(None)
+            ).update({"issue_id": issue_id})
+            db.commit()
+        finally:
+            db.close()
+
+    def clear(self):
+        from database.models import DetectionCacheEntry, SessionLocal
+        db = SessionLocal()
+        try:
+            db.query(DetectionCacheEntry).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    @staticmethod
+    def _to_entry(row) -> Dict[str, Any]:
+        return {
+            "image_hash": row.image_hash,
+            "perceptual_hash": row.perceptual_hash,
+            "result": row.result,
+            "issue_id": row.issue_id
+        }
+
+
+class DetectionCache:
+    """Content-addressed cache of vision detection results.
+
+    Lookups try the exact SHA-256 of the image first and, when enabled, fall
+    back to the nearest perceptual hash within ``max_distance`` bits.
+    Perceptual matching is opt-in, and hashes with fewer than ``min_bits``
+    set (or unset) bits are never matched: flat, dark or blurry photos all
+    hash alike. Each entry remembers the first ``CivicIssue`` created from
+    it so repeat uploads can be linked to the original report.
+    """
+
+    def __init__(self, backend, use_perceptual: bool = False, max_distance: int = 6, min_bits: int = 12):
+        self.backend = backend
+        self.use_perceptual = use_perceptual
+        self.max_distance = max_distance
+        self.min_bits = min_bits
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, image_data: bytes, image_hash: str = None) -> Dict[str, Any]:
+        """Return ``{"image_hash", "perceptual_hash", "entry"}``; ``entry`` is None on a miss.
+
+        ``image_hash`` may be passed when the SHA-256 was already computed
+        while the upload was being stored.
+        """
+        image_hash = image_hash or content_hash(image_data)
+        phash = perceptual_hash(image_data) if self.use_perceptual else None
+        if phash is not None and not informative(phash, self.min_bits):
+            phash = None
+
+        entry = self.backend.get(image_hash)
+        result = "hit"
+        if entry is None and phash is not None:
+            entry = self.backend.find_similar(phash, self.max_distance)
+            result = "near_hit"
+        if entry is None:
+            result = "miss"
+
+        # Lookups run on the executor's worker threads
+        with self._lock:
+            if result == "hit":
+                self.hits += 1
+            elif result == "near_hit":
+                self.near_hits += 1
+            else:
+                self.misses += 1
+        metrics.CACHE_LOOKUPS.labels("detection", result).inc()
+
+        return {"image_hash": image_hash, "perceptual_hash": phash, "entry": entry}
+
+    def store(self, image_hash: str, phash: Optional[str], result: Dict[str, Any]):
+        self.backend.put({
+            "image_hash": image_hash,
+            "perceptual_hash": phash,
+            "result": result,
+            "issue_id": None
+        })
+
+    def link_issue(self, image_hash: str, issue_id: int):
+        """Record the first issue created from this image as the original"""
+        self.backend.link_issue(image_hash, issue_id)
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.near_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "near_duplicate_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.near_hits) / lookups if lookups else 0.0
+            }
+
+
+def build_detection_cache() -> Optional[DetectionCache]:
+    """Create the detection cache configured by ``DETECTION_CACHE_*`` env vars"""
+    backend_name = os.getenv("DETECTION_CACHE_BACKEND", "memory").lower()
+    ttl = float(os.getenv("DETECTION_CACHE_TTL", "86400"))
+
+    if backend_name in ("none", "off", ""):
+        return None
+    if backend_name == "sql":
+        backend = SQLDetectionBackend(ttl=ttl)
+    elif backend_name == "memory":
+        backend = InMemoryDetectionBackend(
+            max_size=int(os.getenv("DETECTION_CACHE_SIZE", "1024")),
+            ttl=ttl
+        )
+    else:
+        raise ValueError(f"Unknown DETECTION_CACHE_BACKEND: {backend_name}")
+
+    return DetectionCache(
+        backend,
+        use_perceptual=os.getenv("DETECTION_CACHE_PERCEPTUAL", "false").lower() == "true",
+        max_distance=int(os.getenv("DETECTION_CACHE_MAX_DISTANCE", "6")),
+        min_bits=int(os.getenv("DETECTION_CACHE_MIN_HASH_BITS", "12"))
+    )
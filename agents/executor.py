@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+from dotenv import load_dotenv
+from agents.triage import PRIORITY_CLASSES
+from utils import metrics
+load_dotenv()
+
+DEFAULT_WEIGHTS = {"critical": 8, "high": 4, "normal": 2, "low": 1}
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when every in-flight slot of the agent executor is taken"""
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "priority", "future", "enqueued_at")
+
+    def __init__(self, fn, args, kwargs, priority):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class AgentExecutor:
+    """Runs blocking agent work on a bounded thread pool with backpressure and priorities.
+
+    At most ``max_workers`` jobs run at once and at most ``max_in_flight``
+    jobs (running + queued) are accepted. Anything beyond that is rejected
+    immediately with ``ExecutorSaturatedError`` instead of piling up;
+    ``critical`` jobs may use ``critical_reserve`` extra slots so a surge
+    of routine reports cannot lock them out. The reserve is off by default:
+    report priority comes from keyword triage of text the reporter wrote,
+    so anyone can claim ``critical`` and it should only order the queues,
+    not grant capacity.
+
+    Each priority class has its own FIFO queue. A free worker takes the
+    head job with the highest ``weight * (1 + waited / aging_seconds)``,
+    so higher classes go first but a job that has waited long enough
+    overtakes fresh higher-priority work (no starvation). ``class_limits``
+    caps how many jobs of a class run at once, keeping workers free for
+    the classes above it.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        max_in_flight: int = None,
+        weights: Dict[str, float] = None,
+        class_limits: Dict[str, int] = None,
+        aging_seconds: float = None,
+        critical_reserve: int = None
+    ):
+        self.max_workers = max_workers or int(os.getenv("AGENT_MAX_WORKERS", "4"))
+        self.max_in_flight = max_in_flight or int(os.getenv("AGENT_MAX_IN_FLIGHT", "16"))
+        if self.max_in_flight < self.max_workers:
+            self.max_in_flight = self.max_workers
+
+        self.weights = {**DEFAULT_WEIGHTS, **json.loads(os.getenv("SCHEDULER_WEIGHTS") or "{}"), **(weights or {})}
+        # By default low-priority work leaves one worker free for anything more urgent
+        self.class_limits = {
+            "critical": self.max_workers,
+            "high": self.max_workers,
+            "normal": self.max_workers,
+            "low": max(1, self.max_workers - 1),
+            **json.loads(os.getenv("SCHEDULER_CLASS_LIMITS") or "{}"),
+            **(class_limits or {})
+        }
+        self.aging_seconds = aging_seconds or float(os.getenv("SCHEDULER_AGING_SECONDS", "10"))
+        if critical_reserve is None:
+            critical_reserve = int(os.getenv("SCHEDULER_CRITICAL_RESERVE", "0"))
+        self.critical_reserve = critical_reserve
+
+        self._queues = {priority: deque() for priority in PRIORITY_CLASSES}
+        self._running = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._waits = {priority: deque(maxlen=500) for priority in PRIORITY_CLASSES}
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"civic-agent_{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def submit(self, fn: Callable[..., Any], *args, priority: str = "normal", **kwargs) -> Future:
+        """Queue ``fn`` in its priority class, or raise if the executor is full"""
+        if priority not in self._queues:
+            priority = "normal"
+        limit = self.max_in_flight + (self.critical_reserve if priority == "critical" else 0)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new work after shutdown")
+            if self._in_flight >= limit:
+                raise ExecutorSaturatedError(
+                    f"Agent executor is at capacity ({self.max_in_flight} reports in flight)"
+                )
+            # The slot is freed when the work finishes, not when the caller stops
+            # waiting, so cancelled requests cannot overcommit the pool.
+            self._in_flight += 1
+            job = _Job(fn, args, kwargs, priority)
+            self._queues[priority].append(job)
+            metrics.SCHEDULER_QUEUE_DEPTH.labels(priority).inc()
+            self._condition.notify()
+        return job.future
+
+    async def run(self, fn: Callable[..., Any], *args, priority: str = "normal", **kwargs) -> Any:
+        """Run ``fn`` on the pool and await its result without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, priority=priority, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work; queued jobs still run"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running jobs and recent queue wait per priority class"""
+        with self._condition:
+            classes = {}
+            for priority in PRIORITY_CLASSES:
+                waits = sorted(self._waits[priority])
+                classes[priority] = {
+                    "queued": len(self._queues[priority]),
+                    "running": self._running[priority],
+                    "limit": self.class_limits[priority],
+                    "weight": self.weights[priority],
+                    "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else None,
+                    "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else None
+                }
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "workers": self.max_workers,
+                "classes": classes
+            }
+
+    def _next_job(self):
+        """Head job of the class with the best aged weight that is under its limit (lock held)"""
+        now = time.monotonic()
+        best, best_score = None, None
+        for priority, queue in self._queues.items():
+            if not queue or self._running[priority] >= self.class_limits[priority]:
+                continue
+            score = self.weights[priority] * (1 + (now - queue[0].enqueued_at) / self.aging_seconds)
+            if best is None or score > best_score:
+                best, best_score = priority, score
+        return self._queues[best].popleft() if best is not None else None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown and not any(self._queues.values()):
+                        return
+                    self._condition.wait()
+                    job = self._next_job()
+                self._running[job.priority] += 1
+                waited = time.monotonic() - job.enqueued_at
+                self._waits[job.priority].append(waited)
+            metrics.SCHEDULER_QUEUE_DEPTH.labels(job.priority).dec()
+            metrics.SCHEDULER_WAIT.labels(job.priority).observe(waited)
+            metrics.SCHEDULER_RUNNING.labels(job.priority).inc()
+
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    try:
+                        result = job.fn(*job.args, **job.kwargs)
+                    except BaseException as e:
+                        job.future.set_exception(e)
+                    else:
+                        job.future.set_result(result)
+            finally:
+                metrics.SCHEDULER_RUNNING.labels(job.priority).dec()
+                with self._condition:
+                    self._running[job.priority] -= 1
+                    self._in_flight -= 1
+                    # A class may have dropped under its limit: wake every idle worker
+                    self._condition.notify_all()
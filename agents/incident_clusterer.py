@@ -0,0 +1,171 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from sqlalchemy import func
+from database.models import CivicIssue, SessionLocal
+from database.spatial import open_incidents_near
+from utils.validators import validate_coordinates
+load_dotenv()
+
+# Issues that still accept new reports
+OPEN_STATUSES = ("reported", "in_progress")
+
+SEVERITY_LEVELS = ["low", "medium", "high", "critical"]
+
+
+def _level(severity: Optional[str]) -> int:
+    severity = (severity or "medium").lower()
+    return SEVERITY_LEVELS.index(severity) if severity in SEVERITY_LEVELS else 1
+
+
+class IncidentClusterer:
+    """Matches a freshly detected report to an open incident it duplicates.
+
+    A report matches the nearest open, non-duplicate issue of the same
+    ``issue_type`` within ``radius_m`` meters that was created in the last
+    ``window_hours`` (geohash index, see ``database.spatial``). Reports
+    without coordinates, or with no spatial match, can still match through
+    the detection cache when ``image_match`` is on: a (near-)identical photo
+    links to the issue its first upload produced.
+
+    Attaching a report bumps the incident's ``report_count``, raises its
+    priority to the report's severity if higher, and one level more every
+    ``escalate_every`` reports.
+    """
+
+    def __init__(
+        self,
+        radius_m: float = None,
+        window_hours: float = None,
+        image_match: bool = None,
+        escalate_every: int = None,
+        session_factory=SessionLocal
+    ):
+        self.radius_m = radius_m if radius_m is not None else float(os.getenv("CLUSTER_RADIUS_M", "75"))
+        self.window_hours = window_hours if window_hours is not None else float(os.getenv("CLUSTER_WINDOW_HOURS", "72"))
+        if image_match is None:
+            image_match = os.getenv("CLUSTER_IMAGE_MATCH", "true").lower() == "true"
+        self.image_match = image_match
+        self.escalate_every = escalate_every if escalate_every is not None else int(os.getenv("CLUSTER_ESCALATE_EVERY", "5"))
+        self.session_factory = session_factory
+        self.spatial_matches = 0
+        self.image_matches = 0
+        self.new_incidents = 0
+        self.escalations = 0
+        self._lock = threading.Lock()
+
+    def match(self, state: Dict[str, Any], db=None) -> Optional[Dict[str, Any]]:
+        """The incident this report belongs to, or None for a new incident"""
+        owns_session = db is None
+        if owns_session:
+            db = self.session_factory()
+        try:
+            incident = self._match(db, state)
+        finally:
+            if owns_session:
+                db.close()
+        with self._lock:
+            if incident is None:
+                self.new_incidents += 1
+            elif incident["matched_by"] == "spatial":
+                self.spatial_matches += 1
+            else:
+                self.image_matches += 1
+        return incident
+
+    def _match(self, db, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        since = datetime.utcnow() - timedelta(hours=self.window_hours)
+        lat, lon = state.get("latitude"), state.get("longitude")
+        if lat is not None and lon is not None and validate_coordinates(lat, lon):
+            nearby = open_incidents_near(
+                db, lat, lon, self.radius_m, state["issue_type"], OPEN_STATUSES,
+                since=since, exclude_id=state.get("issue_id")
+            )
+            if nearby:
+                return self._describe(db, nearby[0]["id"], "spatial", nearby[0]["distance_m"])
+
+        if self.image_match and state.get("duplicate_of"):
+            # Follow the link to the root incident in case it points at a duplicate
+            incident_id = state["duplicate_of"]
+            for _ in range(5):
+                row = db.query(CivicIssue.id, CivicIssue.duplicate_of).filter(CivicIssue.id == incident_id).first()
+                if row is None or row.duplicate_of is None:
+                    break
+                incident_id = row.duplicate_of
+            matched = db.query(CivicIssue.id).filter(
+                CivicIssue.id == incident_id,
+                CivicIssue.id != state.get("issue_id"),
+                CivicIssue.issue_type == state["issue_type"],
+                CivicIssue.status.in_(OPEN_STATUSES),
+                CivicIssue.duplicate_of.is_(None),
+                CivicIssue.created_at >= since
+            ).first()
+            if matched is not None:
+                return self._describe(db, incident_id, "image", None)
+        return None
+
+    @staticmethod
+    def _describe(db, incident_id: int, matched_by: str, distance_m: Optional[float]) -> Dict[str, Any]:
+        incident = db.query(
+            CivicIssue.assigned_agency, CivicIssue.suggested_actions, CivicIssue.location
+        ).filter(CivicIssue.id == incident_id).one()
+        return {
+            "id": incident_id,
+            "matched_by": matched_by,
+            "distance_m": distance_m,
+            "assigned_agency": incident.assigned_agency,
+            "suggested_actions": incident.suggested_actions or {},
+            "location": incident.location
+        }
+
+    def attach(self, db, incident_id: int, severity: str) -> Dict[str, Any]:
+        """Count one more report on the incident and escalate it if due; the caller commits"""
+        incident = db.query(CivicIssue).filter(CivicIssue.id == incident_id).with_for_update().one()
+        # Incremented in SQL so concurrent reports don't overwrite each other's count
+        incident.report_count = func.coalesce(CivicIssue.report_count, 1) + 1
+        db.flush()
+        db.refresh(incident, ["report_count", "priority"])
+        report_count = incident.report_count
+
+        current = _level(incident.priority)
+        target = max(current, _level(severity))
+        if self.escalate_every and report_count % self.escalate_every == 0:
+            target = max(target, current + 1)
+        target = min(target, len(SEVERITY_LEVELS) - 1)
+        escalated = target > current
+        if escalated:
+            incident.priority = SEVERITY_LEVELS[target]
+            with self._lock:
+                self.escalations += 1
+        return {
+            "report_count": report_count,
+            "priority": incident.priority,
+            "escalated": escalated,
+            "issue_type": incident.issue_type,
+            "location": incident.location,
+            "latitude": incident.latitude,
+            "longitude": incident.longitude,
+            "description": incident.description,
+            "reporter_name": incident.reporter_name
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            matched = self.spatial_matches + self.image_matches
+            total = matched + self.new_incidents
+            return {
+                "spatial_matches": self.spatial_matches,
+                "image_matches": self.image_matches,
+                "new_incidents": self.new_incidents,
+                "escalations": self.escalations,
+                "match_ratio": matched / total if total else 0.0
+            }
+
+
+def build_clusterer() -> Optional[IncidentClusterer]:
+    """Create the clusterer configured by ``CLUSTER_*`` env vars (None when disabled)"""
+    if os.getenv("CLUSTER_ENABLED", "true").lower() != "true":
+        return None
+    return IncidentClusterer()
@@ -1,21 +1,231 @@
 import base64
-from groq import Groq
+import logging
 import os
-import json
-import re
-from typing import Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
+from utils import metrics
+from utils.llm_client import get_llm_client
+from utils.image_processing import load_or_create_derived, preprocess_image, sniff_mime_type
+from utils.structured_output import DetectionOutput, ScreenOutput, complete_structured
 load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SCREEN_PROMPT = """Does this image show a civic issue: a water leak, garbage, a pothole, dirt on the road,
+criminal activity or an accident?
+
+Respond in JSON only:
+{
+    "issue_detected": true/false,
+    "issue_type": "water_leak|garbage|pothole|criminal_activity|dirt_on_road|accident|none",
+    "confidence": 0.0-1.0 (how sure you are of this answer)
+}"""
+
+
+SEVERITIES = ("low", "medium", "high", "critical")
+
+
+def merge_detections(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One verdict from per-photo detections of the same incident.
+
+    Photos vote with their confidence: first on whether there is an issue,
+    then on its type. The result is the most confident photo of the
+    winning type, raised to the highest severity any of those photos saw;
+    its confidence is the winning support averaged over all photos, so
+    disagreeing photos pull it down. Fallback results do not vote.
+    """
+    valid = [result for result in results if not result.get("fallback")]
+    if not valid:
+        return results[0]
+
+    def weight(result):
+        return float(result.get("confidence") or 0.0)
+
+    positive = [result for result in valid if result.get("issue_detected")]
+    negative = [result for result in valid if not result.get("issue_detected")]
+    if not positive or sum(map(weight, positive)) < sum(map(weight, negative)):
+        best = max(negative, key=weight)
+        return {**best, "confidence": sum(map(weight, negative)) / len(valid), "images_agreeing": len(negative)}
+
+    votes = {}
+    for result in positive:
+        votes[result.get("issue_type")] = votes.get(result.get("issue_type"), 0.0) + weight(result)
+    issue_type = max(votes, key=votes.get)
+    agreeing = [result for result in positive if result.get("issue_type") == issue_type]
+    best = max(agreeing, key=weight)
+    severity = max(
+        (result.get("severity") for result in agreeing if result.get("severity") in SEVERITIES),
+        key=SEVERITIES.index,
+        default=best.get("severity")
+    )
+    return {
+        **best,
+        "severity": severity,
+        "confidence": votes[issue_type] / len(valid),
+        "images_agreeing": len(agreeing)
+    }
+
+
 class IssueDetectorAgent:
+    """Vision detection, optionally cascaded behind a cheap screening model.
+
+    With ``VISION_CASCADE=true`` every image first goes to
+    ``VISION_SCREEN_MODEL`` at a low resolution. Only when the screen is
+    confident there is no issue (``VISION_SCREEN_NEGATIVE_CONFIDENCE``) is
+    its answer final; positive, uncertain or failed screens escalate to
+    the large model, which also writes the severity and description.
+    """
+
     def __init__(self):
-        self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        
-    def detect_issue(self, image_path: str, audio_text: str = None) -> Dict[str, Any]:
-        """Detect civic issues from image and audio using Groq Vision"""
-        
-        with open(image_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode('utf-8')
-        
+        self.groq_client = get_llm_client()
+        self.model = os.getenv("VISION_MODEL", "meta-llama/llama-4-maverick-17b-128e-instruct")
+        self.preprocess = os.getenv("VISION_PREPROCESS", "true").lower() == "true"
+        self.max_dimension = int(os.getenv("VISION_MAX_DIMENSION", "1024"))
+        self.quality = int(os.getenv("VISION_IMAGE_QUALITY", "85"))
+        self.image_format = os.getenv("VISION_IMAGE_FORMAT", "JPEG").upper()
+        self.cascade = os.getenv("VISION_CASCADE", "false").lower() == "true"
+        self.screen_model = os.getenv("VISION_SCREEN_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+        self.screen_max_dimension = int(os.getenv("VISION_SCREEN_MAX_DIMENSION", "384"))
+        self.screen_negative_confidence = float(os.getenv("VISION_SCREEN_NEGATIVE_CONFIDENCE", "0.85"))
+        self.multi_image_mode = os.getenv("VISION_MULTI_IMAGE", "batch").lower()
+        self._cascade_counts = {
+            "screened": 0,
+            "skipped": 0,
+            "escalated": 0,
+            "screen_failures": 0,
+            "compared": 0,
+            "detected_agreed": 0,
+            "type_compared": 0,
+            "type_agreed": 0
+        }
+        self._lock = threading.Lock()
+
+    def prepare_image(self, image_path: str, image_bytes: bytes = None) -> Tuple[bytes, str]:
+        """Return the bytes and MIME type actually sent to the vision model"""
+        if self.preprocess:
+            return load_or_create_derived(
+                image_path,
+                image_bytes,
+                max_dimension=self.max_dimension,
+                quality=self.quality,
+                output_format=self.image_format
+            )
+        if image_bytes is None:
+            with open(image_path, "rb") as image_file:
+                image_bytes = image_file.read()
+        return image_bytes, sniff_mime_type(image_bytes)
+
+    def detect_issue(
+        self,
+        image_path: str,
+        audio_text: str = None,
+        image_bytes: bytes = None,
+        extra_images: List[Tuple[str, bytes]] = None
+    ) -> Dict[str, Any]:
+        """Detect civic issues from image and audio using Groq Vision.
+
+        Pass ``image_bytes`` when the caller already holds the upload in
+        memory to skip reading ``image_path`` back from disk.
+        ``extra_images`` are more ``(path, bytes)`` photos of the same
+        incident: with ``VISION_MULTI_IMAGE=batch`` all photos go to the
+        model in one request, with ``vote`` each photo is detected
+        concurrently and the results are merged by ``merge_detections``.
+        The result's ``model_calls`` says how many vision calls it took.
+        """
+        images = [(image_path, image_bytes)] + list(extra_images or [])
+        if not self.cascade:
+            result, calls = self._detect_images(images, audio_text)
+            return {**result, "model_calls": calls}
+
+        screen = self.screen(image_path, audio_text, image_bytes, extra_images)
+        if screen is not None and not screen["issue_detected"] and screen["confidence"] >= self.screen_negative_confidence:
+            self._count_cascade("skipped", screen)
+            return {
+                "issue_detected": False,
+                "issue_type": "none",
+                "severity": "low",
+                "description": "No civic issue found by the screening model",
+                "confidence": screen["confidence"],
+                "cascade": "screened_out",
+                "model_calls": 1
+            }
+
+        result, calls = self._detect_images(images, audio_text)
+        self._count_cascade("escalated", screen, result)
+        return {**result, "cascade": "escalated", "model_calls": calls + 1}
+
+    def screen(
+        self,
+        image_path: str,
+        audio_text: str = None,
+        image_bytes: bytes = None,
+        extra_images: List[Tuple[str, bytes]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Cheap first opinion from the small model on low-resolution copies; None if it failed"""
+        try:
+            images = []
+            for path, data in [(image_path, image_bytes)] + list(extra_images or []):
+                if data is None:
+                    with open(path, "rb") as image_file:
+                        data = image_file.read()
+                images.append(preprocess_image(data, self.screen_max_dimension, 75, "JPEG"))
+            prompt = SCREEN_PROMPT
+            if len(images) > 1:
+                prompt += f"\n\nThe {len(images)} photos show the same place; answer for them together."
+            if audio_text:
+                prompt += f"\n\nThe reporter said: {audio_text}"
+            # No parse retries: asking the screen twice costs more than escalating
+            with metrics.caller("screen_issue"):
+                result, _, _ = complete_structured(
+                    self.groq_client,
+                    ScreenOutput,
+                    retries=0,
+                    model=self.screen_model,
+                    messages=[self._image_message(prompt, images)],
+                    temperature=0.0,
+                    max_tokens=64
+                )
+            return result
+        except Exception as e:
+            logger.warning("Screening failed, escalating: %s", e)
+            return None
+
+    def _detect_images(self, images: List[Tuple[str, bytes]], audio_text: str = None) -> Tuple[Dict[str, Any], int]:
+        """Large-model verdict on one or more photos, and the number of calls it took"""
+        if len(images) == 1 or self.multi_image_mode != "vote":
+            path, data = images[0]
+            result = self.detect_full(path, audio_text, data, extra_images=images[1:])
+            return result, result.pop("model_calls")
+        # Each pool thread gets a copy of the caller's context so LLM metrics keep the node label
+        with ThreadPoolExecutor(max_workers=len(images), thread_name_prefix="civic-vision") as pool:
+            futures = [
+                pool.submit(copy_context().run, self.detect_full, path, audio_text, data)
+                for path, data in images
+            ]
+            results = [future.result() for future in futures]
+        calls = sum(result.pop("model_calls") for result in results)
+        return merge_detections(results), calls
+
+    def detect_full(
+        self,
+        image_path: str,
+        audio_text: str = None,
+        image_bytes: bytes = None,
+        extra_images: List[Tuple[str, bytes]] = None
+    ) -> Dict[str, Any]:
+        """Detection by the large vision model, on all given photos in one request.
+
+        ``model_calls`` in the result counts the answer plus any re-asks
+        for an unparseable response.
+        """
+        images = [
+            self.prepare_image(path, data)
+            for path, data in [(image_path, image_bytes)] + list(extra_images or [])
+        ]
+
         prompt = """Analyze this image and identify any civic issues present. Look for:
 - Water leaks, broken pipes, or unnecessary water flow
 - Garbage, litter, or unpicked waste
@@ -33,42 +243,78 @@ Respond in JSON format with:
     "confidence": 0.0-1.0
 }"""
 
+        if len(images) > 1:
+            prompt += (
+                f"\n\nThese {len(images)} photos show the same incident from different angles. "
+                "Judge them together and give one answer for the incident."
+            )
         if audio_text:
             prompt += f"\n\nAdditional context from audio: {audio_text}"
-        
+
         try:
-            response = self.groq_client.chat.completions.create(
-                model="meta-llama/llama-4-maverick-17b-128e-instruct",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_data}"
-                                }
-                            }
-                        ]
-                    }
-                ],
+            result, _, calls = complete_structured(
+                self.groq_client,
+                DetectionOutput,
+                model=self.model,
+                messages=[self._image_message(prompt, images)],
                 temperature=0.3,
                 max_tokens=1024
             )
-            raw_message = response.choices[0].message.content.strip()
-            print("Vision Agent Response:", raw_message)
-            cleaned = re.sub(r"^```(?:json)?|```$", "", raw_message, flags=re.MULTILINE).strip()
-            result = json.loads(cleaned)
-            print("Vision Agent:", result)
-            return result
-            
+            return {**result, "model_calls": calls}
+
         except Exception as e:
-            print(f"Error in issue detection: {e}")
+            logger.warning("Issue detection failed, using fallback: %s", e)
+            metrics.FALLBACKS.labels("detection").inc()
             return {
                 "issue_detected": False,
                 "issue_type": "none",
                 "severity": "low",
                 "description": "Error in detection",
-                "confidence": 0.0
-            }
\ No newline at end of file
+                "confidence": 0.0,
+                "fallback": True,
+                "model_calls": getattr(e, "attempts", 1)
+            }
+
+    def cascade_stats(self) -> Dict[str, Any]:
+        """Escalation rate and how often the screen agreed with the large model"""
+        with self._lock:
+            counts = dict(self._cascade_counts)
+        return {
+            "enabled": self.cascade,
+            "screen_model": self.screen_model,
+            **counts,
+            "escalation_rate": counts["escalated"] / counts["screened"] if counts["screened"] else None,
+            "detected_agreement": counts["detected_agreed"] / counts["compared"] if counts["compared"] else None,
+            "type_agreement": counts["type_agreed"] / counts["type_compared"] if counts["type_compared"] else None
+        }
+
+    @staticmethod
+    def _image_message(prompt: str, images: List[Tuple[bytes, str]]) -> Dict[str, Any]:
+        """User message with the prompt followed by each ``(payload, mime type)`` image"""
+        content = [{"type": "text", "text": prompt}]
+        for payload, mime_type in images:
+            image_data = base64.b64encode(payload).decode('utf-8')
+            content.append({"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{image_data}"}})
+        return {"role": "user", "content": content}
+
+    def _count_cascade(self, decision: str, screen: Optional[Dict[str, Any]], result: Dict[str, Any] = None):
+        metrics.CASCADE_DECISIONS.labels("screen_failed" if screen is None else decision).inc()
+        with self._lock:
+            counts = self._cascade_counts
+            counts["screened"] += 1
+            counts[decision] += 1
+            if screen is None:
+                counts["screen_failures"] += 1
+                return
+            if result is None or result.get("fallback"):
+                return
+            # Agreement is only measurable when the large model also looked
+            counts["compared"] += 1
+            agreed = screen["issue_detected"] == bool(result.get("issue_detected"))
+            counts["detected_agreed"] += agreed
+            metrics.CASCADE_AGREEMENT.labels("issue_detected", str(agreed).lower()).inc()
+            if screen["issue_detected"] and result.get("issue_detected"):
+                counts["type_compared"] += 1
+                type_agreed = screen["issue_type"] == result.get("issue_type")
+                counts["type_agreed"] += type_agreed
+                metrics.CASCADE_AGREEMENT.labels("issue_type", str(type_agreed).lower()).inc()
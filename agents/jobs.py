@@ -0,0 +1,81 @@
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class JobRegistry:
+    """In-process registry of asynchronous report jobs and their per-node progress"""
+
+    def __init__(self, max_jobs: int = 10000):
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, issue_id: int) -> str:
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._evict_finished()
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "issue_id": issue_id,
+                "status": "queued",
+                "progress": [],
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now
+            }
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {**job, "progress": list(job["progress"])}
+
+    def discard(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def mark_processing(self, job_id: str):
+        self._update(job_id, status="processing")
+
+    def add_progress(self, job_id: str, node: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["progress"].append({"node": node, "at": datetime.utcnow().isoformat()})
+                job["updated_at"] = datetime.utcnow().isoformat()
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        self._update(job_id, status="completed", result=result)
+
+    def fail(self, job_id: str, error: str):
+        self._update(job_id, status="failed", error=error)
+
+    def progress_since(self, job_id: str, index: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return list(job["progress"][index:]) if job else []
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                job["updated_at"] = datetime.utcnow().isoformat()
+
+    def _evict_finished(self):
+        # Keep memory bounded: drop the oldest finished jobs once full.
+        # Their outcome is still on the CivicIssue row.
+        if len(self._jobs) < self.max_jobs:
+            return
+        for job_id in [j for j, job in self._jobs.items() if job["status"] in TERMINAL_STATUSES]:
+            del self._jobs[job_id]
+            if len(self._jobs) < self.max_jobs:
+                break
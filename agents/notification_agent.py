@@ -1,33 +1,107 @@
-from groq import Groq
 import os
 import json
-from typing import Dict, Any
-from database.models import Agency, Notification, SessionLocal
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
+from database.models import Notification, SessionLocal
+from agents.agency_router import get_agency_router
+from agents.notification_templates import NotificationTemplates, template_context
 from dotenv import load_dotenv
+from utils import metrics
+from utils.llm_client import get_llm_client
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# template: render only | hybrid: render, then polish critical ones with the LLM | llm: LLM only
+NOTIFICATION_MODES = ("template", "hybrid", "llm")
+
 class NotificationAgent:
     def __init__(self):
-        self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self.groq_client = get_llm_client()
+        self.router = get_agency_router()
+        self.templates = NotificationTemplates()
+        self.mode = os.getenv("NOTIFICATION_MODE", "hybrid").lower()
+        if self.mode not in NOTIFICATION_MODES:
+            raise ValueError(f"Unknown NOTIFICATION_MODE: {self.mode}")
+        self.polish_workers = int(os.getenv("NOTIFICATION_POLISH_WORKERS", "2"))
+        # Seconds a critical notification waits in the outbox for its LLM polish. By
+        # default it is due at once and the polish only applies if it lands before delivery
+        self.polish_hold = float(os.getenv("NOTIFICATION_POLISH_HOLD", "0"))
+        self._polisher = None
         
     def route_to_agency(self, issue_type: str) -> Dict[str, Any]:
-        """Route issue to appropriate agency"""
-        db = SessionLocal()
-        
-        agencies = db.query(Agency).all()
-        
-        for agency in agencies:
-            if issue_type in agency.issue_types:
-                db.close()
-                return {
-                    "agency_id": agency.id,
-                    "agency_name": agency.name,
-                    "email": agency.email,
-                    "phone": agency.phone
-                }
+        """Route issue to appropriate agency (falls back to the default agency)"""
+        return self.router.route(issue_type)
+    
+    def route_to_agencies(self, issue_type: str) -> List[Dict[str, Any]]:
+        """All agencies handling the issue type, highest priority first"""
+        return self.router.route_all(issue_type)
+    
+    def compose(self, issue_data: Dict, agency_data: Dict = None) -> Tuple[str, bool]:
+        """Message for the agency, and whether composing it called the LLM"""
+        if self.mode == "llm":
+            return self.generate_notification(issue_data), True
+        return self.templates.render(issue_data, agency_data), False
+    
+    def compose_escalation(self, incident_id: int, issue_data: Dict, report_count: int) -> str:
+        """Update for the agency when repeat reports raise an incident's priority"""
+        context = template_context(issue_data)
+        return (
+            f"[ESCALATED TO {context['severity_label']}] {context['issue_label']} at {context['location']}"
+            f"{context['coordinates']} (incident #{incident_id}) has now been reported {report_count} times. "
+            f"Action required: {context['action_required']}"
+        )
+    
+    def should_polish(self, severity: str) -> bool:
+        return self.mode == "hybrid" and (severity or "").lower() == "critical"
+    
+    def polish_async(self, issue_id: int, issue_data: Dict, draft: str) -> Future:
+        """Rewrite a stored template notification with the LLM in the background"""
+        if self._polisher is None:
+            self._polisher = ThreadPoolExecutor(
+                max_workers=self.polish_workers,
+                thread_name_prefix="notification-polish"
+            )
+        return self._polisher.submit(self.polish, issue_id, issue_data, draft)
+    
+    def polish(self, issue_id: int, issue_data: Dict, draft: str) -> bool:
+        """Replace the template message of ``issue_id`` with an LLM rewrite; keeps the draft on failure"""
+        prompt = f"""Rewrite this civic issue notification for the receiving agency.
+Keep every fact (location, severity, reporter, action required), make it clear and
+urgent without being alarmist, and stay under 200 words. Return only the message.
+
+{draft}"""
+        try:
+            with metrics.caller("polish_notification"):
+                response = self.groq_client.chat.completions.create(
+                    model="llama-3.3-70b-versatile",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.3,
+                    max_tokens=512
+                )
+            polished = response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.warning("Polishing notification for issue %s failed, keeping the template: %s", issue_id, e)
+            metrics.FALLBACKS.labels("notification_polish").inc()
+            polished = None
         
-        db.close()
-        return None
+        # Only rows still waiting in the outbox are rewritten; either way they are released for delivery
+        values = {"next_attempt_at": None}
+        if polished:
+            values["message"] = polished
+        db = SessionLocal()
+        try:
+            updated = db.query(Notification).filter(
+                Notification.issue_id == issue_id,
+                Notification.message == draft,
+                Notification.status == "pending"
+            ).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        return bool(polished and updated)
     
     def generate_notification(self, issue_data: Dict) -> str:
         """Generate professional notification message for agency"""
@@ -59,30 +133,35 @@ Make it actionable and urgent without being alarmist."""
             return response.choices[0].message.content.strip()
             
         except Exception as e:
-            print(f"Error generating notification: {e}")
+            logger.warning("Generating notification failed, using fallback: %s", e)
+            metrics.FALLBACKS.labels("notification").inc()
             return f"URGENT: {issue_data['issue_type'].upper()} reported at {issue_data['location']} by {issue_data['reporter_name']}. {issue_data['description']}"
     
-    def send_notification(self, issue_id: int, agency_data: Dict, message: str) -> bool:
-        """Send notification to agency (simulate email/SMS)"""
-        db = SessionLocal()
+    def send_notification(self, issue_id: int, agency_data: Dict, message: str, db=None,
+                          hold_seconds: float = 0) -> bool:
+        """Queue a notification for the agency in the outbox.
+
+        The row is written with status ``pending`` and delivered later by
+        ``agents.delivery.OutboxDispatcher``. When ``db`` is given the row
+        joins the caller's transaction and is committed with the issue;
+        otherwise a short-lived session is used. ``hold_seconds`` delays
+        delivery (used while a critical notification is being polished).
+        """
+        owns_session = db is None
+        if owns_session:
+            db = SessionLocal()
         
         notification = Notification(
             issue_id=issue_id,
             agency_id=agency_data['agency_id'],
             message=message,
-            status="sent"
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow() + timedelta(seconds=hold_seconds) if hold_seconds else None
         )
         
         db.add(notification)
-        db.commit()
-        
-        # In production, integrate with email/SMS service
-        print(f"\n{'='*60}")
-        print(f"NOTIFICATION SENT TO: {agency_data['agency_name']}")
-        print(f"Email: {agency_data['email']}")
-        print(f"Phone: {agency_data['phone']}")
-        print(f"\nMessage:\n{message}")
-        print(f"{'='*60}\n")
-        
-        db.close()
-        return True
\ No newline at end of file
+        if owns_session:
+            db.commit()
+            db.close()
+        return True
@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from dotenv import load_dotenv
+from database.models import NotificationTemplate, SessionLocal
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATES_PATH = Path(__file__).resolve().parent.parent / "templates" / "notifications.json"
+
+FALLBACK_TEMPLATE = (
+    "[{severity_label}] {issue_label} reported at {location} by {reporter_name}. "
+    "{description} Action required: {action_required}"
+)
+
+ACTION_REQUIRED = {
+    "critical": "Immediate dispatch required",
+    "high": "Respond within 24 hours",
+    "medium": "Schedule an inspection within 3 days",
+    "low": "Add to the routine maintenance schedule"
+}
+
+
+class _Blank(dict):
+    def __missing__(self, key):
+        return ""
+
+
+def template_context(issue_data: Dict[str, Any], agency_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Values available to templates, derived from the issue and its agency"""
+    severity = (issue_data.get("severity") or "medium").lower()
+    issue_type = issue_data.get("issue_type") or "other"
+    latitude, longitude = issue_data.get("latitude"), issue_data.get("longitude")
+    return {
+        **{key: value for key, value in issue_data.items() if value is not None},
+        "severity": severity,
+        "severity_label": severity.upper(),
+        "issue_type": issue_type,
+        "issue_label": issue_type.replace("_", " ").capitalize(),
+        "action_required": ACTION_REQUIRED.get(severity, ACTION_REQUIRED["medium"]),
+        "coordinates": f" ({latitude:.5f}, {longitude:.5f})" if latitude is not None and longitude is not None else "",
+        "agency_name": (agency_data or {}).get("agency_name", "")
+    }
+
+
+class NotificationTemplates:
+    """Per-agency / per-issue-type message templates with ``str.format`` placeholders.
+
+    Templates come from a JSON file (``{"default", "issue_types", "agencies"}``)
+    overlaid with rows of the ``notification_templates`` table, and are
+    re-read every ``ttl`` seconds. The most specific template wins:
+    agency + issue type, agency default, issue type, then the global default.
+    Unknown placeholders render as empty strings.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, session_factory=SessionLocal):
+        self.path = Path(path or os.getenv("NOTIFICATION_TEMPLATES_PATH") or DEFAULT_TEMPLATES_PATH)
+        self.ttl = ttl if ttl is not None else float(os.getenv("NOTIFICATION_TEMPLATE_TTL", "300"))
+        self.session_factory = session_factory
+        self._templates: Optional[Dict[Tuple[Optional[str], Optional[str]], str]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def render(self, issue_data: Dict[str, Any], agency_data: Optional[Dict[str, Any]] = None) -> str:
+        template = self.resolve((agency_data or {}).get("agency_name"), issue_data.get("issue_type"))
+        return template.format_map(_Blank(template_context(issue_data, agency_data))).strip()
+
+    def resolve(self, agency_name: Optional[str], issue_type: Optional[str]) -> str:
+        templates = self._current()
+        for key in ((agency_name, issue_type), (agency_name, None), (None, issue_type), (None, None)):
+            if key in templates:
+                return templates[key]
+        return FALLBACK_TEMPLATE
+
+    def reload(self):
+        self._loaded_at = 0.0
+
+    def _current(self) -> Dict[Tuple[Optional[str], Optional[str]], str]:
+        templates = self._templates
+        if templates is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return templates
+        with self._lock:
+            if self._templates is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._templates = self._load()
+                self._loaded_at = time.monotonic()
+            return self._templates
+
+    def _load(self) -> Dict[Tuple[Optional[str], Optional[str]], str]:
+        templates = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning("Loading notification templates from %s failed: %s", self.path, e)
+                data = {}
+            if data.get("default"):
+                templates[(None, None)] = data["default"]
+            for issue_type, template in (data.get("issue_types") or {}).items():
+                templates[(None, issue_type)] = template
+            for agency_name, by_type in (data.get("agencies") or {}).items():
+                for issue_type, template in by_type.items():
+                    templates[(agency_name, None if issue_type == "default" else issue_type)] = template
+
+        if self.session_factory is not None:
+            db = self.session_factory()
+            try:
+                for row in db.query(NotificationTemplate).all():
+                    templates[(row.agency_name or None, row.issue_type or None)] = row.template
+            except Exception as e:
+                logger.warning("Loading notification templates from the database failed: %s", e)
+            finally:
+                db.close()
+
+        # Drop templates that can't be rendered instead of failing every notification
+        sample = template_context({"issue_type": "pothole", "severity": "high"})
+        for key, template in list(templates.items()):
+            try:
+                template.format_map(_Blank(sample))
+            except (ValueError, IndexError, AttributeError) as e:
+                logger.warning("Skipping invalid notification template %s: %s", key, e)
+                del templates[key]
+        return templates
@@ -1,12 +1,36 @@
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, Annotated
+from typing import TypedDict, Annotated, Callable
+from langchain_core.runnables import RunnableConfig
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+import inspect
 import operator
+import os
+import time
 from agents.issue_detector import IssueDetectorAgent
 from agents.action_planner import ActionPlannerAgent
 from agents.notification_agent import NotificationAgent
+from agents.detection_cache import build_detection_cache
+from agents.incident_clusterer import build_clusterer
+from database.models import CivicIssue, IssueImage, SessionLocal
+from utils import metrics
+load_dotenv()
+
+def merge_counts(left: dict, right: dict) -> dict:
+    """Reducer that sums per-node counters coming from different graph nodes"""
+    merged = dict(left or {})
+    for key, value in (right or {}).items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+def merge_timings(left: dict, right: dict) -> dict:
+    """Reducer that collects per-node durations written by parallel branches"""
+    return {**(left or {}), **(right or {})}
 
 class AgentState(TypedDict):
     image_path: str
+    image_bytes: bytes
+    extra_images: list  # further {"path", "bytes", "sha256"} photos of the same report
     audio_text: str
     reporter_name: str
     location: str
@@ -19,89 +43,396 @@ class AgentState(TypedDict):
     confidence: float
     suggested_actions: dict
     agency_data: dict
+    notification_message: str
     notification_sent: bool
+    issue_id: int
+    image_hash: str
+    duplicate_of: int
+    detection_cached: bool
+    detection_fallback: bool
+    actions_cached: bool
+    incident: dict
+    report_count: int
+    escalated: bool
+    llm_calls: Annotated[dict, merge_counts]
+    node_timings: Annotated[dict, merge_timings]
     error: str
 
 class CivicAgentOrchestrator:
-    def __init__(self):
+    def __init__(self, parallel: bool = None):
         self.detector = IssueDetectorAgent()
         self.planner = ActionPlannerAgent()
         self.notifier = NotificationAgent()
+        self.detection_cache = build_detection_cache()
+        self.clusterer = build_clusterer()
+        if parallel is None:
+            parallel = os.getenv("AGENT_PARALLEL_BRANCHES", "true").lower() == "true"
+        self.parallel = parallel
         self.workflow = self._build_workflow()
         
     def _build_workflow(self):
+        """Wire the graph.
+
+        Planning, routing and notification drafting only need the detection
+        result, so after detection they run as one parallel superstep and
+        join at ``persist_issue``. With ``parallel=False`` the original
+        sequential chain is built instead. When clustering is enabled,
+        ``cluster_incident`` runs between detection and those branches and
+        sends reports of an already open incident straight to persistence.
+        """
         workflow = StateGraph(AgentState)
+        branches = ["plan_actions", "route_notification", "send_notification"]
         
-        workflow.add_node("detect_issue", self.detect_issue_node)
-        workflow.add_node("plan_actions", self.plan_actions_node)
-        workflow.add_node("route_notification", self.route_notification_node)
-        workflow.add_node("send_notification", self.send_notification_node)
+        workflow.add_node("detect_issue", self._timed("detect_issue", self.detect_issue_node))
+        if self.clusterer is not None:
+            workflow.add_node("cluster_incident", self._timed("cluster_incident", self.cluster_incident_node))
+        workflow.add_node("plan_actions", self._timed("plan_actions", self.plan_actions_node))
+        workflow.add_node("route_notification", self._timed("route_notification", self.route_notification_node))
+        workflow.add_node("send_notification", self._timed("send_notification", self.send_notification_node))
+        workflow.add_node("persist_issue", self._timed("persist_issue", self.persist_issue_node))
         
         workflow.set_entry_point("detect_issue")
         
-        workflow.add_conditional_edges(
-            "detect_issue",
-            self.should_continue_after_detection,
-            {
-                "continue": "plan_actions",
-                "end": END
-            }
-        )
+        if self.clusterer is not None:
+            workflow.add_conditional_edges(
+                "detect_issue",
+                self.should_continue_after_detection,
+                {
+                    "continue": "cluster_incident",
+                    "end": "persist_issue"
+                }
+            )
+            fan_out_from = "cluster_incident"
+        else:
+            fan_out_from = "detect_issue"
         
-        workflow.add_edge("plan_actions", "route_notification")
-        workflow.add_edge("route_notification", "send_notification")
-        workflow.add_edge("send_notification", END)
+        if self.parallel:
+            workflow.add_conditional_edges(
+                fan_out_from,
+                self._branches_after_detection,
+                branches + ["persist_issue"]
+            )
+            # persist_issue waits for every branch before it runs
+            workflow.add_edge(branches, "persist_issue")
+        else:
+            workflow.add_conditional_edges(
+                fan_out_from,
+                lambda state: "end" if self._skip_branches(state) else "continue",
+                {
+                    "continue": "plan_actions",
+                    "end": "persist_issue"
+                }
+            )
+            workflow.add_edge("plan_actions", "route_notification")
+            workflow.add_edge("route_notification", "send_notification")
+            workflow.add_edge("send_notification", "persist_issue")
+        
+        workflow.add_edge("persist_issue", END)
         
         return workflow.compile()
     
-    def detect_issue_node(self, state: AgentState) -> AgentState:
-        result = self.detector.detect_issue(state["image_path"], state.get("audio_text"))
+    def _timed(self, name: str, node: Callable) -> Callable:
+        """Wrap ``node`` so its wall-clock duration lands in ``node_timings`` and the node metrics.
+
+        LLM calls made inside the node are labelled with its name.
+        """
+        takes_config = "config" in inspect.signature(node).parameters
         
-        state["issue_detected"] = result["issue_detected"]
-        state["issue_type"] = result["issue_type"]
-        state["severity"] = result["severity"]
-        state["description"] = result["description"]
-        state["confidence"] = result["confidence"]
+        def run(state: AgentState, config: RunnableConfig = None) -> dict:
+            start = time.perf_counter()
+            try:
+                with metrics.caller(name):
+                    update = node(state, config) if takes_config else node(state)
+            except Exception:
+                metrics.NODE_ERRORS.labels(name).inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                metrics.NODE_LATENCY.labels(name).observe(elapsed)
+            return {**(update or {}), "node_timings": {name: round(elapsed * 1000, 2)}}
         
-        return state
+        return run
+    
+    def _skip_branches(self, state: AgentState) -> bool:
+        """No issue, or a new report of an open incident: nothing to plan or notify"""
+        return self.should_continue_after_detection(state) == "end" or bool(state.get("incident"))
     
-    def plan_actions_node(self, state: AgentState) -> AgentState:
-        actions = self.planner.suggest_actions(
+    def _branches_after_detection(self, state: AgentState):
+        if self._skip_branches(state):
+            return "persist_issue"
+        return ["plan_actions", "route_notification", "send_notification"]
+    
+    def detect_issue_node(self, state: AgentState) -> dict:
+        image_bytes = state.get("image_bytes")
+        extra_images = [(image["path"], image.get("bytes")) for image in state.get("extra_images") or []]
+        # The cache is keyed by a single photo alone, so multi-photo reports and
+        # reports whose audio adds context the photo lacks always ask the model
+        if self.detection_cache is None or extra_images or state.get("audio_text"):
+            result = self.detector.detect_issue(
+                state["image_path"], state.get("audio_text"), image_bytes=image_bytes, extra_images=extra_images
+            )
+            return self._detection_update(result, llm_calls={"detect_issue": result.get("model_calls", 1)})
+        
+        if image_bytes is None:
+            with open(state["image_path"], "rb") as image_file:
+                image_bytes = image_file.read()
+        
+        # Identical (or near-identical) photos reuse the earlier vision result
+        # and are linked to the issue that result produced.
+        cached = self.detection_cache.lookup(image_bytes, image_hash=state.get("image_hash"))
+        entry = cached["entry"]
+        if entry is not None:
+            return self._detection_update(
+                entry["result"],
+                image_hash=cached["image_hash"],
+                duplicate_of=entry.get("issue_id"),
+                detection_cached=True
+            )
+        
+        result = self.detector.detect_issue(
+            state["image_path"], state.get("audio_text"), image_bytes=image_bytes
+        )
+        if not result.get("fallback"):
+            self.detection_cache.store(cached["image_hash"], cached["perceptual_hash"], result)
+        
+        return self._detection_update(
+            result,
+            image_hash=cached["image_hash"],
+            llm_calls={"detect_issue": result.get("model_calls", 1)}
+        )
+    
+    def _detection_update(self, result: dict, **extra) -> dict:
+        return {
+            "issue_detected": result["issue_detected"],
+            "issue_type": result["issue_type"],
+            "severity": result["severity"],
+            "description": result["description"],
+            "confidence": result["confidence"],
+            "detection_cached": False,
+            "detection_fallback": bool(result.get("fallback")),
+            **extra
+        }
+    
+    def cluster_incident_node(self, state: AgentState, config: RunnableConfig = None) -> dict:
+        """Look for an open incident this report duplicates (same type, nearby, recent)"""
+        db = (config or {}).get("configurable", {}).get("db")
+        incident = self.clusterer.match(state, db=db)
+        if incident is None:
+            return {"incident": None}
+        # The reporter still gets the incident's action plan, without a new completion
+        return {
+            "incident": incident,
+            "duplicate_of": incident["id"],
+            "suggested_actions": incident["suggested_actions"]
+        }
+    
+    def plan_actions_node(self, state: AgentState) -> dict:
+        actions, cached, calls = self.planner.plan(
             state["issue_type"],
             state["description"],
             state["severity"]
         )
         
-        state["suggested_actions"] = actions
-        return state
+        update = {"suggested_actions": actions, "actions_cached": cached}
+        if calls:
+            update["llm_calls"] = {"plan_actions": calls}
+        return update
     
-    def route_notification_node(self, state: AgentState) -> AgentState:
+    def route_notification_node(self, state: AgentState) -> dict:
         agency = self.notifier.route_to_agency(state["issue_type"])
-        state["agency_data"] = agency
-        return state
-    
-    def send_notification_node(self, state: AgentState) -> AgentState:
-        if state["agency_data"]:
-            issue_data = {
-                "reporter_name": state["reporter_name"],
-                "location": state["location"],
+        return {"agency_data": agency}
+    
+    def send_notification_node(self, state: AgentState) -> dict:
+        """Draft the agency message; it is persisted together with the issue"""
+        # In the parallel graph routing runs alongside this node, so check the
+        # (in-memory) route directly rather than waiting for agency_data.
+        agency = state.get("agency_data") or self.notifier.route_to_agency(state["issue_type"])
+        if not agency:
+            return {}
+        
+        message, used_llm = self.notifier.compose(self.issue_data(state), agency)
+        if not used_llm:
+            return {"notification_message": message}
+        return {"notification_message": message, "llm_calls": {"send_notification": 1}}
+    
+    def persist_issue_node(self, state: AgentState, config: RunnableConfig = None) -> dict:
+        """Save the issue and its notification in one transaction.
+
+        The issue row is flushed first so its primary key exists before the
+        notification referencing it is written; both commit together. When
+        the caller already created a placeholder row (async mode) its
+        ``issue_id`` is reused instead of inserting a new one.
+        """
+        configurable = config.get("configurable", {}) if config else {}
+        if not configurable.get("persist", True):
+            # The caller (e.g. a batch import) writes the results itself
+            return {}
+        # Reuse the caller's unit-of-work session when one is threaded through
+        db = configurable.get("db")
+        owns_session = db is None
+        if owns_session:
+            db = SessionLocal()
+        try:
+            issue = None
+            if state.get("issue_id"):
+                issue = db.query(CivicIssue).filter(CivicIssue.id == state["issue_id"]).first()
+            
+            if not state["issue_detected"]:
+                if issue is not None:
+                    issue.status = "no_issue"
+                    issue.description = state["description"]
+                    db.commit()
+                return {}
+            
+            if issue is None:
+                issue = CivicIssue(
+                    reporter_name=state["reporter_name"],
+                    location=state["location"],
+                    latitude=state["latitude"],
+                    longitude=state["longitude"],
+                    image_path=state["image_path"],
+                    audio_path=state.get("audio_text")
+                )
+                db.add(issue)
+            
+            for name, value in self.issue_fields(state).items():
+                setattr(issue, name, value)
+            db.flush()
+            # Read the key now: after commit the instance is expired and
+            # touching it would check out another connection to reload it.
+            issue_id = issue.id
+            # A placeholder row (async mode) may already have its photos from an earlier attempt
+            if state.get("extra_images") and not (
+                state.get("issue_id") and db.query(IssueImage.id).filter(IssueImage.issue_id == issue_id).first()
+            ):
+                self.add_issue_images(db, issue_id, state)
+            
+            if state.get("incident"):
+                attached = self.attach_to_incident(db, state)
+                db.commit()
+                return {
+                    "issue_id": issue_id,
+                    "report_count": attached["report_count"],
+                    "escalated": attached["escalated"]
+                }
+            
+            agency = state.get("agency_data")
+            notification_sent = False
+            if agency and state.get("notification_message"):
+                hold = self.notifier.polish_hold if self.notifier.should_polish(state["severity"]) else 0
+                notification_sent = self.notifier.send_notification(
+                    issue_id, agency, state["notification_message"], db=db, hold_seconds=hold
+                )
+            
+            db.commit()
+            
+            if self.detection_cache is not None and state.get("image_hash") and not state.get("duplicate_of"):
+                self.detection_cache.link_issue(state["image_hash"], issue_id)
+            if notification_sent and self.notifier.should_polish(state["severity"]):
+                self.notifier.polish_async(issue_id, self.issue_data(state), state["notification_message"])
+            return {"issue_id": issue_id, "notification_sent": notification_sent}
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if owns_session:
+                db.close()
+    
+    @staticmethod
+    def add_issue_images(db: Session, issue_id: int, state: AgentState):
+        """Record every photo of a multi-image report, the issue's own image_path first"""
+        images = [{"path": state["image_path"], "sha256": state.get("image_hash")}] + state["extra_images"]
+        db.add_all([
+            IssueImage(issue_id=issue_id, position=position, image_path=image["path"], image_hash=image.get("sha256"))
+            for position, image in enumerate(images)
+        ])
+    
+    def attach_to_incident(self, db: Session, state: AgentState) -> dict:
+        """Count a clustered report on its incident, queueing an agency update if it escalated"""
+        incident_id = state["incident"]["id"]
+        attached = self.clusterer.attach(db, incident_id, state["severity"])
+        if attached["escalated"]:
+            agency = self.notifier.route_to_agency(attached["issue_type"])
+            if agency:
+                message = self.notifier.compose_escalation(
+                    incident_id, {**attached, "severity": attached["priority"]}, attached["report_count"]
+                )
+                self.notifier.send_notification(incident_id, agency, message, db=db)
+        return attached
+    
+    @staticmethod
+    def issue_data(state: AgentState) -> dict:
+        """Issue details used to compose the agency notification"""
+        return {
+            "reporter_name": state["reporter_name"],
+            "location": state["location"],
+            "latitude": state.get("latitude"),
+            "longitude": state.get("longitude"),
+            "issue_type": state["issue_type"],
+            "description": state["description"],
+            "severity": state["severity"]
+        }
+    
+    @staticmethod
+    def issue_fields(state: AgentState) -> dict:
+        """CivicIssue column values for a detected issue"""
+        incident = state.get("incident")
+        if incident:
+            return {
                 "issue_type": state["issue_type"],
                 "description": state["description"],
-                "severity": state["severity"]
+                "status": "duplicate",
+                "priority": state["severity"],
+                "assigned_agency": incident["assigned_agency"],
+                "suggested_actions": {},
+                "image_hash": state.get("image_hash"),
+                "duplicate_of": incident["id"]
             }
-            
-            message = self.notifier.generate_notification(issue_data)
-            # Note: issue_id would be set after DB save in FastAPI
-            state["notification_sent"] = True
-        
-        return state
+        agency = state.get("agency_data")
+        return {
+            "issue_type": state["issue_type"],
+            "description": state["description"],
+            "status": "reported",
+            "priority": state["severity"],
+            "assigned_agency": agency.get("agency_name") if agency else None,
+            "suggested_actions": state.get("suggested_actions") or {},
+            "image_hash": state.get("image_hash"),
+            "duplicate_of": state.get("duplicate_of")
+        }
     
     def should_continue_after_detection(self, state: AgentState) -> str:
         if state["issue_detected"] and state["confidence"] > 0.5:
             return "continue"
         return "end"
     
-    def process(self, initial_state: AgentState) -> AgentState:
-        """Execute the full workflow"""
-        result = self.workflow.invoke(initial_state)
-        return result
\ No newline at end of file
+    def process(
+        self,
+        initial_state: AgentState,
+        on_progress: Callable[[str], None] = None,
+        db: Session = None,
+        persist: bool = True
+    ) -> AgentState:
+        """Execute the full workflow, reporting each finished node to ``on_progress``.
+
+        When ``db`` is given, the issue and its notification are written and
+        committed on that session instead of a new one, so a request uses a
+        single connection end to end. ``persist=False`` skips the write
+        entirely for callers that store results in bulk.
+        """
+        configurable = {}
+        if db is not None:
+            configurable["db"] = db
+        if not persist:
+            configurable["persist"] = False
+        config = {"configurable": configurable} if configurable else None
+        if on_progress is None:
+            return self.workflow.invoke(initial_state, config=config)
+
+        result = initial_state
+        for mode, chunk in self.workflow.stream(initial_state, config=config, stream_mode=["updates", "values"]):
+            if mode == "updates":
+                for node in chunk:
+                    on_progress(node)
+            else:
+                result = chunk
+        return result
@@ -0,0 +1,50 @@
+import re
+from typing import Optional
+
+# Highest first; the executor schedules by these classes
+PRIORITY_CLASSES = ("critical", "high", "normal", "low")
+
+# Words in the reporter's audio transcript that predict the severity the
+# vision model will assign. Checked in class order, so "fire near the
+# garbage dump" is critical, not low. Common Hindi words are included as
+# most Jaipur reports are dictated. Keywords match whole words only
+# ("fire" must not match "firewood", "aag" not "aage"), so inflections are
+# listed separately.
+PRIORITY_KEYWORDS = {
+    "critical": (
+        "accident", "accidents", "crash", "crashed", "collision", "injured", "injury", "injuries",
+        "bleeding", "unconscious", "dead", "death", "died", "fire", "smoke", "explosion", "exploded",
+        "gas leak", "electrocuted", "electrocution", "live wire", "sparking", "collapse", "collapsed",
+        "weapon", "weapons", "gun", "guns", "knife", "robbery", "robbed", "assault", "assaulted",
+        "attack", "attacked", "fight", "fighting", "kidnap", "kidnapped", "kidnapping", "theft", "stolen",
+        "aag", "durghatna", "chori", "ghayal"
+    ),
+    "high": (
+        "burst", "flood", "flooded", "flooding", "overflow", "overflowing", "sewage", "open manhole",
+        "manhole", "manholes", "fallen tree", "blocked road", "road blocked", "deep pothole", "sinkhole",
+        "traffic jam", "suspicious", "pipeline", "gaddha", "paani bhar"
+    ),
+    "low": (
+        "garbage", "litter", "littered", "trash", "waste", "dirt", "dirty", "dust", "debris", "graffiti",
+        "poster", "posters", "kachra"
+    )
+}
+
+_PATTERNS = {
+    priority: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + r")\b", re.IGNORECASE)
+    for priority, words in PRIORITY_KEYWORDS.items()
+}
+
+
+def triage_priority(audio_text: Optional[str] = None) -> str:
+    """Priority class of a report from its transcript alone, before any model call.
+
+    Reports without a transcript, or whose transcript names nothing in
+    ``PRIORITY_KEYWORDS``, are ``normal``.
+    """
+    if not audio_text:
+        return "normal"
+    for priority in ("critical", "high", "low"):
+        if _PATTERNS[priority].search(audio_text):
+            return priority
+    return "normal"
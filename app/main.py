@@ -1,16 +1,42 @@
-from fastapi import FastAPI, File, UploadFile, Form, Depends, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database.models import CivicIssue, get_db, init_db
+from database.models import CivicIssue, IssueImage, SessionLocal, get_db, init_db
+from database.queries import MAX_PAGE_SIZE, InvalidQueryError, list_issues, parse_fields
+from database.stats import read_issue_stats, rebuild_issue_stats, stats_is_empty
+from database.spatial import backfill_geohashes, issues_in_bbox, nearby_issues
+from database.grid import grid_is_empty, read_tile, rebuild_issue_grid
 from agents.orchestrator import CivicAgentOrchestrator, AgentState
-import shutil
+from agents.executor import AgentExecutor, ExecutorSaturatedError
+from agents.triage import triage_priority
+from agents.jobs import JobRegistry, TERMINAL_STATUSES
+from agents.delivery import OutboxDispatcher, outbox_stats
+from agents.batch import (
+    BatchBusyError, BatchNotFoundError, BatchProcessor, BatchSource, ManifestError,
+    batch_summary, create_batch
+)
+from utils.uploads import InvalidImageError, UploadTooLargeError, save_upload
+from utils import metrics
+from utils.cache import TTLCache
+from utils.llm_client import get_llm_client
+from utils.validators import validate_coordinates
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from pathlib import Path
+from typing import List, Optional
 import uvicorn
-from datetime import datetime
 
+logger = logging.getLogger(__name__)
 app = FastAPI(title="Civic Issue Detection API")
 
 app.add_middleware(
@@ -20,39 +46,113 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+metrics.instrument_app(app, "api")
 
 # Initialize
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(500 * 1024 * 1024)))
+MAX_IMAGES_PER_REPORT = int(os.getenv("MAX_IMAGES_PER_REPORT", "5"))
+# Allowance for the other form fields and multipart framing
+FORM_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_LIMITS = {
+    "/api/report-issue": MAX_UPLOAD_BYTES * MAX_IMAGES_PER_REPORT,
+    "/api/batches": MAX_BATCH_BYTES
+}
 
 orchestrator = CivicAgentOrchestrator()
+executor = AgentExecutor()
+jobs = JobRegistry()
+batches = BatchProcessor(orchestrator)
+dispatcher = OutboxDispatcher()
+stats_cache = TTLCache(max_size=1, ttl=float(os.getenv("STATS_CACHE_TTL", "5")))
+TILE_MAX_AGE = int(os.getenv("TILE_MAX_AGE", "30"))
 
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    db = SessionLocal()
+    try:
+        # The write hooks keep issue_stats current; a full recount is only for a
+        # new table or when asked for after bulk SQL
+        if os.getenv("ISSUE_STATS_REBUILD", "false").lower() == "true" or stats_is_empty(db):
+            rebuild_issue_stats(db)
+        # Rows that only now got a geohash were never counted in the map grid
+        if backfill_geohashes(db) or grid_is_empty(db):
+            rebuild_issue_grid(db)
+    finally:
+        db.close()
+    if os.getenv("ACTION_CACHE_WARM", "false").lower() == "true":
+        # One completion per (issue_type, severity) pair; don't hold up startup
+        threading.Thread(target=orchestrator.planner.warm_cache, daemon=True).start()
+    # NOTIFICATION_WORKERS=0 leaves delivery to a separate process (scripts/deliver_notifications.py)
+    dispatcher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    executor.shutdown(wait=False)
+    dispatcher.stop()
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse oversized uploads from Content-Length before the body is read"""
+    limit = UPLOAD_LIMITS.get(request.url.path.rstrip("/"))
+    if request.method == "POST" and limit is not None:
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit + FORM_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Upload exceeds the {limit} byte limit"}
+            )
+    return await call_next(request)
 
 @app.post("/api/report-issue")
 async def report_issue(
-    image: UploadFile = File(...),
+    image: List[UploadFile] = File(...),
     reporter_name: str = Form(...),
     location: str = Form(...),
     latitude: float = Form(None),
     longitude: float = Form(None),
     audio_text: str = Form(None),
+    mode: str = Query("sync", pattern="^(sync|async)$"),
     db: Session = Depends(get_db)
 ):
-    """Main endpoint to report civic issues"""
-    
-    # Save uploaded image
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    image_path = UPLOAD_DIR / f"{timestamp}_{image.filename}"
+    """Main endpoint to report civic issues.
+
+    With ``?mode=async`` the report is accepted immediately and processed in
+    the background; poll ``/api/jobs/{job_id}`` for the outcome. Reports are
+    scheduled by a priority triaged from ``audio_text``, so an accident is
+    not queued behind a surge of litter reports.
+
+    Up to ``MAX_IMAGES_PER_REPORT`` photos of the same incident may be sent
+    as repeated ``image`` fields; they are judged together in one vision
+    call and stored in ``issue_images``.
+    """
+    if not validate_coordinates(latitude, longitude):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    if len(image) > MAX_IMAGES_PER_REPORT:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IMAGES_PER_REPORT} images per report")
     
-    with open(image_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    # Stream each upload to a content-addressed file, hashing it on the way
+    uploads = []
+    for upload in image:
+        try:
+            uploads.append(await save_upload(upload, UPLOAD_DIR, MAX_UPLOAD_BYTES, MAX_IMAGE_PIXELS))
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except InvalidImageError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    saved = uploads[0]
     
     # Process through agent workflow
     initial_state: AgentState = {
-        "image_path": str(image_path),
+        "image_path": str(saved.path),
+        "image_bytes": saved.data,
+        "extra_images": [
+            {"path": str(extra.path), "bytes": extra.data, "sha256": extra.sha256} for extra in uploads[1:]
+        ],
         "audio_text": audio_text,
         "reporter_name": reporter_name,
         "location": location,
@@ -65,75 +165,429 @@ async def report_issue(
         "confidence": 0.0,
         "suggested_actions": {},
         "agency_data": {},
+        "notification_message": "",
         "notification_sent": False,
+        "issue_id": None,
+        "image_hash": saved.sha256,
+        "duplicate_of": None,
+        "detection_cached": False,
+        "llm_calls": {},
+        "node_timings": {},
         "error": ""
     }
     
-    result = orchestrator.process(initial_state)
-    print("Agents Results:",result)
-    if not result["issue_detected"]:
-        return {
-            "status": "no_issue",
-            "message": "No significant civic issue detected in the image",
-            "confidence": result["confidence"]
-        }
+    priority = triage_priority(audio_text)
+    if mode == "async":
+        return _enqueue_report(initial_state, db, priority)
     
-    # Save to database
+    try:
+        response = await executor.run(_process_report, initial_state, priority=priority)
+    except ExecutorSaturatedError as e:
+        raise _saturated(e)
+    response["metadata"]["priority"] = priority
+    return response
+
+def _saturated(error: ExecutorSaturatedError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": "5"}
+    )
+
+def _enqueue_report(initial_state: AgentState, db: Session, priority: str = "normal") -> JSONResponse:
+    """Create a placeholder issue row and hand the workflow to a background worker"""
     issue = CivicIssue(
-        reporter_name=reporter_name,
-        location=location,
-        latitude=latitude,
-        longitude=longitude,
-        issue_type=result["issue_type"],
-        description=result["description"],
-        image_path=str(image_path),
-        audio_path=audio_text,
-        status="reported",
-        priority=result["severity"],
-        assigned_agency=result["agency_data"].get("agency_name") if result["agency_data"] else None,
-        suggested_actions=result["suggested_actions"]
+        reporter_name=initial_state["reporter_name"],
+        location=initial_state["location"],
+        latitude=initial_state["latitude"],
+        longitude=initial_state["longitude"],
+        image_path=initial_state["image_path"],
+        audio_path=initial_state["audio_text"],
+        status="processing"
     )
-    
     db.add(issue)
     db.commit()
     db.refresh(issue)
     
-    # Send notification with correct issue_id
-    if result["agency_data"]:
-        issue_data = {
-            "reporter_name": reporter_name,
-            "location": location,
-            "issue_type": result["issue_type"],
-            "description": result["description"],
-            "severity": result["severity"]
+    job_id = jobs.create(issue.id)
+    try:
+        executor.submit(_run_job, job_id, issue.id, initial_state, priority=priority)
+    except ExecutorSaturatedError as e:
+        jobs.discard(job_id)
+        db.delete(issue)
+        db.commit()
+        raise _saturated(e)
+    
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "accepted",
+            "job_id": job_id,
+            "issue_id": issue.id,
+            "priority": priority,
+            "status_url": f"/api/jobs/{job_id}"
+        }
+    )
+
+def _run_job(job_id: str, issue_id: int, initial_state: AgentState):
+    """Background worker body for an async report"""
+    jobs.mark_processing(job_id)
+    db = SessionLocal()
+    try:
+        result = orchestrator.process(
+            {**initial_state, "issue_id": issue_id},
+            on_progress=lambda node: jobs.add_progress(job_id, node),
+            db=db
+        )
+        jobs.complete(job_id, _build_response(result))
+    except Exception as e:
+        logger.exception("Error processing job %s", job_id)
+        db.rollback()
+        issue = db.query(CivicIssue).filter(CivicIssue.id == issue_id).first()
+        if issue is not None:
+            issue.status = "failed"
+            db.commit()
+        jobs.fail(job_id, str(e))
+    finally:
+        db.close()
+
+def _process_report(initial_state: AgentState) -> dict:
+    """Run the agent workflow, which also persists the issue (blocking, runs on the executor).
+
+    The worker opens its own session: the job may outlive the request, whose
+    session is closed by the dependency teardown when the client goes away.
+    """
+    db = SessionLocal()
+    try:
+        return _build_response(orchestrator.process(initial_state, db=db))
+    finally:
+        db.close()
+
+def _build_response(result: AgentState) -> dict:
+    metadata = {
+        "images": 1 + len(result.get("extra_images") or []),
+        "llm_calls": result.get("llm_calls", {}),
+        "detection_cache": "hit" if result.get("detection_cached") else "miss",
+        "action_cache": "hit" if result.get("actions_cached") else "miss",
+        "incident_match": result["incident"]["matched_by"] if result.get("incident") else None,
+        "node_timings_ms": result.get("node_timings", {})
+    }
+    if not result["issue_detected"]:
+        return {
+            "status": "no_issue",
+            "message": "No significant civic issue detected in the image",
+            "confidence": result["confidence"],
+            "metadata": metadata
         }
-        message = orchestrator.notifier.generate_notification(issue_data)
-        orchestrator.notifier.send_notification(issue.id, result["agency_data"], message)
     
     return {
         "status": "success",
-        "issue_id": issue.id,
+        "issue_id": result["issue_id"],
         "issue_type": result["issue_type"],
         "severity": result["severity"],
         "description": result["description"],
         "suggested_actions": result["suggested_actions"],
         "agency_notified": result["agency_data"].get("agency_name") if result["agency_data"] else None,
-        "confidence": result["confidence"]
+        "confidence": result["confidence"],
+        "duplicate_of": result.get("duplicate_of"),
+        "report_count": result.get("report_count"),
+        "metadata": metadata
+    }
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    """Hit/miss counters of the detection and action plan caches"""
+    cache = orchestrator.detection_cache
+    action_cache = orchestrator.planner.cache
+    return {
+        "detection": cache.stats() if cache else None,
+        "action_plan": action_cache.stats() if action_cache else None
     }
 
+@app.get("/api/detection/stats")
+def get_detection_stats():
+    """Screening cascade: how many images skipped the large vision model and how often the two agreed"""
+    return orchestrator.detector.cascade_stats()
+
+@app.get("/api/clustering/stats")
+def get_clustering_stats():
+    """How many reports joined an open incident (spatially or by photo) vs started a new one"""
+    clusterer = orchestrator.clusterer
+    return clusterer.stats() if clusterer else {"enabled": False}
+
+@app.get("/api/notifications/outbox")
+def get_outbox_stats(db: Session = Depends(get_db)):
+    """Notification counts per delivery status and the oldest undelivered one"""
+    return outbox_stats(db)
+
+@app.get("/api/scheduler/stats")
+def get_scheduler_stats():
+    """Queue depth, running reports and recent queue wait per priority class"""
+    return executor.stats()
+
+@app.get("/api/llm/stats")
+def get_llm_stats():
+    """Call, retry and rate-limit counters of the shared LLM client, plus circuit state"""
+    return get_llm_client().stats()
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """Get the status, per-node progress and result of an async report"""
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream per-node progress of an async report as Server-Sent Events"""
+    if not jobs.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        sent = 0
+        while True:
+            for event in jobs.progress_since(job_id, sent):
+                sent += 1
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            job = jobs.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES:
+                break
+            await asyncio.sleep(0.25)
+        if job is not None:
+            for event in jobs.progress_since(job_id, sent):
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            payload = {"status": job["status"], "result": job["result"], "error": job["error"]}
+            yield f"event: {job['status']}\ndata: {json.dumps(payload)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/api/batches")
+def create_batch_import(
+    archive: UploadFile = File(..., description="Zip of images, optionally with manifest.csv / manifest.jsonl"),
+    manifest: UploadFile = File(None, description="CSV or JSONL manifest (overrides one inside the zip)"),
+    reporter_name: str = Form("Batch import"),
+    location: str = Form(""),
+    db: Session = Depends(get_db)
+):
+    """Import a zip of images and stream one NDJSON result per image.
+
+    The first line carries the ``batch_id``; if the stream is cut off, the
+    remaining images can be processed with ``POST /api/batches/{batch_id}/resume``.
+    """
+    manifest_file = None
+    if manifest is not None and manifest.filename:
+        manifest_file = (manifest.filename, manifest.file.read())
+    
+    try:
+        source = BatchSource(archive.file)
+        try:
+            batch_id = create_batch(
+                db,
+                source,
+                UPLOAD_DIR,
+                MAX_UPLOAD_BYTES,
+                MAX_IMAGE_PIXELS,
+                manifest=manifest_file,
+                defaults={"reporter_name": reporter_name, "location": location},
+                label=archive.filename
+            )
+        finally:
+            source.close()
+    except ManifestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return _stream_batch(batch_id)
+
+@app.post("/api/batches/{batch_id}/resume")
+def resume_batch_import(batch_id: str, retry_failed: bool = False, db: Session = Depends(get_db)):
+    """Continue a batch, skipping items that were already processed"""
+    try:
+        batch_summary(db, batch_id)
+    except BatchNotFoundError:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if batches.is_active(batch_id):
+        raise HTTPException(status_code=409, detail="Batch is already running")
+    return _stream_batch(batch_id, retry_failed)
+
+@app.get("/api/batches/{batch_id}")
+def get_batch_import(batch_id: str, db: Session = Depends(get_db)):
+    """Progress of a batch: item counts per status"""
+    try:
+        return batch_summary(db, batch_id)
+    except BatchNotFoundError:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+def _stream_batch(batch_id: str, retry_failed: bool = False) -> StreamingResponse:
+    def lines():
+        try:
+            for record in batches.run(batch_id, retry_failed=retry_failed):
+                yield json.dumps(record) + "\n"
+        except BatchBusyError as e:
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.get("/api/issues")
-async def get_issues(db: Session = Depends(get_db)):
-    """Get all reported issues"""
-    issues = db.query(CivicIssue).order_by(CivicIssue.created_at.desc()).all()
-    return {"issues": issues}
+def get_issues(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    issue_type: Optional[str] = None,
+    assigned_agency: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns, or 'all'"),
+    db: Session = Depends(get_db)
+):
+    """List issues newest first, one page at a time.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` to fetch the next
+    page. Heavy columns such as ``suggested_actions`` are omitted unless
+    requested via ``fields``.
+    """
+    try:
+        return list_issues(
+            db,
+            limit=limit,
+            cursor=cursor,
+            filters={
+                "status": status,
+                "priority": priority,
+                "issue_type": issue_type,
+                "assigned_agency": assigned_agency
+            },
+            created_after=created_after,
+            created_before=created_before,
+            fields=parse_fields(fields)
+        )
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/issues/nearby")
+def get_nearby_issues(
+    lat: float,
+    lon: float,
+    radius_m: float = Query(500, gt=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    issue_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns, or 'all'"),
+    db: Session = Depends(get_db)
+):
+    """Issues within ``radius_m`` meters of (lat, lon), closest first, with ``distance_m``"""
+    if not validate_coordinates(lat, lon):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    try:
+        return nearby_issues(
+            db, lat, lon, radius_m,
+            limit=limit,
+            filters={"status": status, "priority": priority, "issue_type": issue_type},
+            fields=parse_fields(fields)
+        )
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/issues/bbox")
+def get_issues_in_bbox(
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    issue_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns, or 'all'"),
+    db: Session = Depends(get_db)
+):
+    """Newest issues inside a bounding box; ``min_lon > max_lon`` wraps the antimeridian"""
+    if not (validate_coordinates(min_lat, min_lon) and validate_coordinates(max_lat, max_lon)):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    try:
+        return issues_in_bbox(
+            db, min_lat, min_lon, max_lat, max_lon,
+            limit=limit,
+            filters={"status": status, "priority": priority, "issue_type": issue_type},
+            fields=parse_fields(fields)
+        )
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/tiles/{z}/{x}/{y}")
+def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    issue_type: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Heatmap tile: issue counts per grid cell and type inside slippy map tile z/x/y.
+
+    Served from the pre-aggregated issue_grid_counts table. Responses carry
+    an ETag and Last-Modified; a matching If-None-Match (or an
+    If-Modified-Since no older than the tile's last change) gets a 304.
+    """
+    try:
+        tile = read_tile(db, z, x, y, issue_type=issue_type, since=since, until=until)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    last_modified = tile.pop("last_modified")
+    body = json.dumps(tile, separators=(",", ":"))
+    headers = {
+        "ETag": f'W/"{hashlib.sha1(body.encode()).hexdigest()[:20]}"',
+        "Cache-Control": f"public, max-age={TILE_MAX_AGE}"
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    else:
+        not_modified = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and last_modified is not None:
+            try:
+                not_modified = parsedate_to_datetime(if_modified_since) >= last_modified.replace(
+                    microsecond=0, tzinfo=timezone.utc
+                )
+            except (TypeError, ValueError):
+                pass
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/stats")
+def get_stats(db: Session = Depends(get_db)):
+    """Issue counts by status, priority, issue_type and agency for the dashboard"""
+    stats = stats_cache.get("issues")
+    if stats is None:
+        stats = read_issue_stats(db)
+        stats_cache.set("issues", stats)
+    return stats
 
 @app.get("/api/issues/{issue_id}")
-async def get_issue(issue_id: int, db: Session = Depends(get_db)):
+def get_issue(issue_id: int, db: Session = Depends(get_db)):
     """Get specific issue details"""
     issue = db.query(CivicIssue).filter(CivicIssue.id == issue_id).first()
     if not issue:
         raise HTTPException(status_code=404, detail="Issue not found")
-    return issue
+    images = (
+        db.query(IssueImage.image_path)
+        .filter(IssueImage.issue_id == issue_id)
+        .order_by(IssueImage.position)
+        .all()
+    )
+    content = jsonable_encoder(issue)
+    content["images"] = [path for path, in images] or [issue.image_path]
+    return content
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
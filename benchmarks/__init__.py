@@ -0,0 +1,33 @@
+"""
+Offline benchmarks, load tests and the fake Groq provider.
+
+Scripts run as ``python benchmarks/<name>.py``: they put the repository on
+``sys.path`` and call ``bootstrap()`` before importing the app, whose
+modules read their configuration at import time.
+"""
+
+import os
+import tempfile
+
+
+def bootstrap(uploads: bool = False):
+    """Throwaway SQLite database (and upload dir) and a dummy API key, unless the environment sets them"""
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    if uploads:
+        os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp())
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+
+
+def install_client(orchestrator, client):
+    """Point every agent of ``orchestrator`` at ``client`` (a ``FakeGroq`` or an ``LLMClient``)"""
+    for agent in (orchestrator.detector, orchestrator.planner, orchestrator.notifier):
+        agent.groq_client = client
+    return client
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,113 @@
+"""
+Count database connection checkouts per report under concurrency.
+
+Drives ``POST /api/report-issue`` through the FastAPI app in-process with
+a stubbed Groq client, from ``--concurrency`` threads, and counts pool
+checkouts via SQLAlchemy's ``checkout`` event.
+
+    python benchmarks/bench_db_checkouts.py --reports 200 --concurrency 8
+    DATABASE_URL=postgresql://... DB_POOL_SIZE=10 python benchmarks/bench_db_checkouts.py
+
+Without DATABASE_URL a temporary SQLite file is used.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap, install_client, percentile
+bootstrap(uploads=True)
+from benchmarks.fake_groq import FakeGroq
+from PIL import Image
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from database.models import Agency, SessionLocal, engine, init_db
+import app.main as main
+
+
+class CheckoutCounter:
+    def __init__(self):
+        self.checkouts = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+
+def image_bytes(i):
+    # Distinct pixels per report so the detection cache never short-circuits
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), color=(i % 256, (i // 256) % 256, 80)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Seconds per stubbed LLM call")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    if not db.query(Agency).filter(Agency.name == "Bench Works").first():
+        db.add(Agency(name="Bench Works", department="PWD", email="b@x", phone="1", issue_types=["pothole"]))
+        db.commit()
+    db.close()
+
+    install_client(main.orchestrator, FakeGroq(latency={
+        kind: args.llm_latency for kind in ("detection", "actions", "notification")
+    }))
+    main.orchestrator.detection_cache = None
+
+    counter = CheckoutCounter()
+    event.listen(engine, "checkout", counter)
+    client = TestClient(main.app)
+    latencies = []
+
+    def report(i):
+        start = time.perf_counter()
+        response = client.post(
+            "/api/report-issue",
+            files={"image": (f"{i}.jpg", image_bytes(i), "image/jpeg")},
+            data={"reporter_name": f"Bench {i}", "location": "Bench Road"}
+        )
+        latencies.append(time.perf_counter() - start)
+        return response.status_code
+
+    start = time.perf_counter()
+    # The agents print every response; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            statuses = list(pool.map(report, range(args.reports)))
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "checkout", counter)
+
+    results = {
+        "reports": args.reports,
+        "concurrency": args.concurrency,
+        "status_codes": {str(code): statuses.count(code) for code in sorted(set(statuses))},
+        "connection_checkouts": counter.checkouts,
+        "checkouts_per_report": counter.checkouts / args.reports,
+        "throughput_rps": args.reports / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "pool": engine.pool.status()
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,151 @@
+"""
+Benchmark nearby / bounding-box issue queries on a large seeded table.
+
+Seeds ``--rows`` issues (default 1,000,000) spread over a metro area into a
+scratch database and times, for random query points:
+
+- scan:    latitude/longitude range filter (no usable index) + haversine
+- geohash: ``database.spatial.nearby_issues`` / ``issues_in_bbox``, i.e.
+           index range scans on the geohash cells covering the query
+
+Both must return the same issues; the script checks before timing.
+
+    python benchmarks/bench_geo_queries.py
+    python benchmarks/bench_geo_queries.py --rows 200000 --radius 250 --radius 2000
+    DATABASE_URL=postgresql://... python benchmarks/bench_geo_queries.py --reuse
+
+Without DATABASE_URL a temporary SQLite file is used.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap
+bootstrap()
+from database.models import CivicIssue, SessionLocal, engine, init_db
+from database.spatial import issues_in_bbox, nearby_issues
+from utils.geo import encode, haversine_m, radius_bbox
+
+ISSUE_TYPES = ["pothole", "garbage", "water_leak", "dirt_on_road", "criminal_activity", "accident"]
+# Jaipur-sized metro: 0.5 x 0.5 degrees (about 50 km x 55 km)
+AREA = (26.65, 75.55, 27.15, 76.05)
+
+
+def seed(rows: int, batch_size: int = 20000):
+    start_time = datetime(2024, 1, 1)
+    rng = random.Random(7)
+    table = CivicIssue.__table__
+    min_lat, min_lon, max_lat, max_lon = AREA
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for i in range(offset, min(rows, offset + batch_size)):
+                lat, lon = rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+                batch.append({
+                    "reporter_name": f"Reporter {i}",
+                    "location": f"Ward {i % 500}",
+                    "latitude": lat,
+                    "longitude": lon,
+                    "geohash": encode(lat, lon),
+                    "issue_type": rng.choice(ISSUE_TYPES),
+                    "description": "Seeded issue for the geo benchmark",
+                    "image_path": f"uploads/{i}.jpg",
+                    "status": "reported",
+                    "priority": "medium",
+                    "created_at": start_time + timedelta(seconds=i * 30),
+                    "updated_at": start_time + timedelta(seconds=i * 30)
+                })
+            conn.execute(table.insert(), batch)
+
+
+def scan_nearby(db, lat, lon, radius_m):
+    min_lat, min_lon, max_lat, max_lon = radius_bbox(lat, lon, radius_m)
+    rows = db.query(CivicIssue.id, CivicIssue.latitude, CivicIssue.longitude).filter(
+        CivicIssue.latitude.between(min_lat, max_lat),
+        CivicIssue.longitude.between(min_lon, max_lon)
+    ).all()
+    return sorted(row.id for row in rows if haversine_m(lat, lon, row.latitude, row.longitude) <= radius_m)
+
+
+def scan_bbox(db, bbox, limit):
+    min_lat, min_lon, max_lat, max_lon = bbox
+    rows = db.query(CivicIssue.id).filter(
+        CivicIssue.latitude.between(min_lat, max_lat),
+        CivicIssue.longitude.between(min_lon, max_lon)
+    ).order_by(CivicIssue.created_at.desc(), CivicIssue.id.desc()).limit(limit).all()
+    return [row.id for row in rows]
+
+
+def timed(fn, points):
+    samples = []
+    for point in points:
+        start = time.perf_counter()
+        fn(point)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 2),
+        "max_ms": round(samples[-1], 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--radius", type=float, action="append", help="Radius in meters (repeatable)")
+    parser.add_argument("--bbox-km", type=float, default=2.0, help="Side of the bounding box queries")
+    parser.add_argument("--queries", type=int, default=20, help="Random query points per case")
+    parser.add_argument("--reuse", action="store_true", help="Don't seed; use the existing table")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    radii = args.radius or [250, 1000, 5000]
+
+    init_db()
+    if not args.reuse:
+        start = time.perf_counter()
+        seed(args.rows)
+        print(f"Seeded {args.rows} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    db = SessionLocal()
+    rng = random.Random(42)
+    min_lat, min_lon, max_lat, max_lon = AREA
+    points = [(rng.uniform(min_lat + 0.05, max_lat - 0.05), rng.uniform(min_lon + 0.05, max_lon - 0.05))
+              for _ in range(args.queries)]
+    results = {"rows": db.query(CivicIssue).count(), "queries": args.queries, "nearby": {}, "bbox": {}}
+
+    for radius in radii:
+        lat, lon = points[0]
+        indexed = nearby_issues(db, lat, lon, radius, limit=500, fields=["id"])
+        expected = scan_nearby(db, lat, lon, radius)
+        assert indexed["total"] == len(expected), (indexed["total"], len(expected))
+        results["nearby"][f"{int(radius)}m"] = {
+            "matches": indexed["total"],
+            "scan": timed(lambda p: scan_nearby(db, p[0], p[1], radius), points),
+            "geohash": timed(lambda p: nearby_issues(db, p[0], p[1], radius, limit=50, fields=["id"]), points)
+        }
+
+    half = args.bbox_km * 500 / 111320.0
+    boxes = [(lat - half, lon - half, lat + half, lon + half) for lat, lon in points]
+    assert [i["id"] for i in issues_in_bbox(db, *boxes[0], limit=50, fields=["id"])["issues"]] == scan_bbox(db, boxes[0], 50)
+    results["bbox"][f"{args.bbox_km:g}km"] = {
+        "scan": timed(lambda box: scan_bbox(db, box, 50), boxes),
+        "geohash": timed(lambda box: issues_in_bbox(db, *box, limit=50, fields=["id"]), boxes)
+    }
+    db.close()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark issue listing against a large seeded table.
+
+Seeds ``--rows`` issues (default 1,000,000) into a scratch database and
+compares the legacy ``/api/issues`` query (load and serialize every row)
+with keyset pages from ``database.queries.list_issues``: the first page, a
+page deep in the table, a filtered page and an OFFSET page at the same
+depth for contrast.
+
+    python benchmarks/bench_issue_listing.py
+    python benchmarks/bench_issue_listing.py --rows 200000 --skip-legacy
+    DATABASE_URL=postgresql://... python benchmarks/bench_issue_listing.py --reuse
+
+Without DATABASE_URL a temporary SQLite file is used.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap
+bootstrap()
+from database.models import CivicIssue, SessionLocal, engine, init_db
+from database.queries import encode_cursor, list_issues
+
+ISSUE_TYPES = ["pothole", "garbage", "water_leak", "dirt_on_road", "criminal_activity", "accident"]
+STATUSES = ["reported", "resolved", "in_progress"]
+PRIORITIES = ["low", "medium", "high", "critical"]
+AGENCIES = ["Municipal Water Department", "Waste Management Corporation", "Public Works Department", "Police Department"]
+
+
+def seed(rows: int, batch_size: int = 20000):
+    start_time = datetime(2024, 1, 1)
+    rng = random.Random(7)
+    table = CivicIssue.__table__
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for i in range(offset, min(rows, offset + batch_size)):
+                batch.append({
+                    "reporter_name": f"Reporter {i}",
+                    "location": f"Ward {i % 500}",
+                    "latitude": 26.8 + rng.random() * 0.2,
+                    "longitude": 75.7 + rng.random() * 0.2,
+                    "issue_type": rng.choice(ISSUE_TYPES),
+                    "description": "Seeded issue for the listing benchmark",
+                    "image_path": f"uploads/{i}.jpg",
+                    "status": rng.choice(STATUSES),
+                    "priority": rng.choice(PRIORITIES),
+                    "assigned_agency": rng.choice(AGENCIES),
+                    "suggested_actions": {"immediate_actions": ["Inspect the site"] * 5},
+                    "created_at": start_time + timedelta(seconds=i * 30),
+                    "updated_at": start_time + timedelta(seconds=i * 30)
+                })
+            conn.execute(table.insert(), batch)
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples)}, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the full-table legacy query")
+    parser.add_argument("--reuse", action="store_true", help="Don't seed; use the existing table")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    init_db()
+    if not args.reuse:
+        start = time.perf_counter()
+        seed(args.rows)
+        print(f"Seeded {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+    db = SessionLocal()
+    total = db.query(CivicIssue).count()
+    results = {"rows": total, "page_size": args.page_size}
+
+    if not args.skip_legacy:
+        def legacy():
+            issues = db.query(CivicIssue).order_by(CivicIssue.created_at.desc()).all()
+            payload = [{c.name: getattr(i, c.name) for c in CivicIssue.__table__.columns} for i in issues]
+            db.expunge_all()
+            return payload
+        results["legacy_all_rows"], _ = timed(legacy, 1)
+
+    results["keyset_first_page"], first = timed(lambda: list_issues(db, limit=args.page_size), args.repeat)
+
+    middle = db.query(CivicIssue.created_at, CivicIssue.id).order_by(
+        CivicIssue.created_at.desc(), CivicIssue.id.desc()
+    ).offset(total // 2).first()
+    deep_cursor = encode_cursor(middle.created_at, middle.id)
+    results["keyset_deep_page"], _ = timed(
+        lambda: list_issues(db, limit=args.page_size, cursor=deep_cursor), args.repeat
+    )
+    results["keyset_filtered_page"], _ = timed(
+        lambda: list_issues(db, limit=args.page_size, filters={"status": "reported", "issue_type": "pothole"}),
+        args.repeat
+    )
+    results["offset_deep_page"], _ = timed(
+        lambda: db.query(CivicIssue).order_by(CivicIssue.created_at.desc(), CivicIssue.id.desc())
+        .offset(total // 2).limit(args.page_size).all(),
+        args.repeat
+    )
+    db.close()
+
+    print(json.dumps(results, indent=2, default=str))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
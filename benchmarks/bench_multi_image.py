@@ -0,0 +1,117 @@
+"""
+Several photos of one incident: separate reports vs one multi-image report.
+
+Each incident has ``--photos`` photos. The workflow runs over HTTP against
+the local fake Groq server (``persist=False``, caches off) in three modes:
+
+- separate: one report per photo, as citizens had to send them before
+- batch:    one report, all photos judged in a single vision request
+- vote:     one report, one vision request per photo merged by confidence
+
+and reports LLM calls, wall time and estimated cost per incident. The fake
+server's token counts do not grow with the number of images in a request,
+so the batch cost is a lower bound; the call counts are exact.
+
+    python benchmarks/bench_multi_image.py
+    python benchmarks/bench_multi_image.py --incidents 50 --photos 4 --output multi_image.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap, install_client, percentile
+bootstrap()
+from agents.orchestrator import CivicAgentOrchestrator
+from benchmarks.bench_orchestrator import initial_state, write_image
+from benchmarks.eval_cascade import total_cost
+from benchmarks.fake_groq import FakeGroqServer
+from benchmarks.load_test import git_commit
+from database.models import Agency, SessionLocal, init_db
+from utils.llm_client import build_llm_client
+
+MODES = ("separate", "batch", "vote")
+
+
+def run(mode, incidents, fake):
+    orchestrator = CivicAgentOrchestrator()
+    orchestrator.detection_cache = None
+    orchestrator.planner.cache = None
+    orchestrator.detector.multi_image_mode = "vote" if mode == "vote" else "batch"
+    install_client(orchestrator, build_llm_client(base_url=fake.base_url, api_key="bench"))
+
+    latencies, llm_calls = [], 0
+    cost_before = total_cost()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, photos in enumerate(incidents):
+            start = time.perf_counter()
+            if mode == "separate":
+                states = [initial_state(photo, i) for photo in photos]
+            else:
+                state = initial_state(photos[0], i)
+                state["extra_images"] = [{"path": photo} for photo in photos[1:]]
+                states = [state]
+            for state in states:
+                result = orchestrator.process(state, persist=False)
+                llm_calls += sum(result.get("llm_calls", {}).values())
+            latencies.append(time.perf_counter() - start)
+    cost = total_cost() - cost_before
+
+    n = len(incidents)
+    return {
+        "incidents": n,
+        "llm_calls_per_incident": llm_calls / n,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "cost_usd_per_incident": cost / n
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--incidents", type=int, default=20)
+    parser.add_argument("--photos", type=int, default=3, help="Photos per incident")
+    parser.add_argument("--latency", type=float, default=0.2, help="Median fake vision latency in seconds")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    if not db.query(Agency).filter(Agency.name == "Bench Works").first():
+        db.add(Agency(name="Bench Works", department="PWD", email="b@x", phone="1", issue_types=["pothole"]))
+        db.commit()
+    db.close()
+
+    directory = tempfile.mkdtemp()
+    seeds = iter(range(args.incidents * args.photos))
+    incidents = [[write_image(directory, next(seeds)) for _ in range(args.photos)] for _ in range(args.incidents)]
+    fake = FakeGroqServer(latency={
+        "detection": {"dist": "lognormal", "median": args.latency, "sigma": 0.3},
+        "actions": {"dist": "lognormal", "median": args.latency / 2, "sigma": 0.3},
+        "notification": {"dist": "lognormal", "median": args.latency / 4, "sigma": 0.3}
+    }, seed=0)
+    try:
+        results = {
+            "commit": git_commit(),
+            "photos_per_incident": args.photos,
+            "modes": {mode: run(mode, incidents, fake) for mode in args.modes.split(",")}
+        }
+    finally:
+        fake.close()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Throughput and cost of composing agency notifications per mode.
+
+Composes ``--count`` notifications (default 1,000) for a mix of issue types
+and severities:
+
+- template: deterministic rendering only
+- llm:      one llama-3.3-70b completion per notification (stubbed, with
+            ``--llm-latency`` seconds per call, ``--concurrency`` at a time)
+- hybrid:   template for every notification plus an LLM polish for the
+            ``critical`` share
+
+Cost uses ``--prompt-tokens`` / ``--completion-tokens`` per completion and
+the per-million-token prices given (defaults: Groq list prices for
+llama-3.3-70b-versatile).
+
+    python benchmarks/bench_notifications.py
+    python benchmarks/bench_notifications.py --count 5000 --llm-latency 0.8 --concurrency 16
+
+Without DATABASE_URL a temporary SQLite file is used.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap, percentile
+bootstrap()
+from benchmarks.fake_groq import FakeGroq
+from database.models import init_db
+from agents.notification_agent import NotificationAgent
+
+ISSUE_TYPES = ["pothole", "garbage", "water_leak", "dirt_on_road", "criminal_activity", "accident"]
+SEVERITIES = ["low", "medium", "high", "critical"]
+
+
+def make_issues(count, critical_share, seed):
+    rng = random.Random(seed)
+    issues = []
+    for i in range(count):
+        severity = "critical" if rng.random() < critical_share else rng.choice(SEVERITIES[:3])
+        issues.append({
+            "reporter_name": f"Reporter {i}",
+            "location": f"Ward {i % 120}, Main Road",
+            "latitude": 26.8 + rng.random() * 0.2,
+            "longitude": 75.7 + rng.random() * 0.2,
+            "issue_type": rng.choice(ISSUE_TYPES),
+            "description": "Citizen report with photo evidence attached",
+            "severity": severity
+        })
+    return issues
+
+
+def run_mode(agent, mode, issues, concurrency):
+    agent.mode = mode
+    agency = {"agency_id": 1, "agency_name": "Public Works Department", "email": "pwd@example.gov", "phone": "1"}
+    latencies = []
+
+    def compose(issue):
+        start = time.perf_counter()
+        message, _ = agent.compose(issue, agency)
+        if agent.should_polish(issue["severity"]):
+            # Measure the polish inline; in the API it runs in the background
+            agent.groq_client.chat.completions.create(
+                model="llama-3.3-70b-versatile",
+                messages=[{"role": "user", "content": message}]
+            )
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "template":
+            for issue in issues:
+                compose(issue)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(compose, issues))
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--critical-share", type=float, default=0.1, help="Fraction of critical issues")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per stubbed completion")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel LLM calls in llm/hybrid mode")
+    parser.add_argument("--prompt-tokens", type=int, default=220)
+    parser.add_argument("--completion-tokens", type=int, default=260)
+    parser.add_argument("--input-price", type=float, default=0.59, help="USD per 1M prompt tokens")
+    parser.add_argument("--output-price", type=float, default=0.79, help="USD per 1M completion tokens")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    init_db()
+    issues = make_issues(args.count, args.critical_share, args.seed)
+    agent = NotificationAgent()
+    completion_cost = (args.prompt_tokens * args.input_price + args.completion_tokens * args.output_price) / 1_000_000
+
+    results = {"count": args.count, "critical_share": args.critical_share, "modes": {}}
+    for mode in ("template", "hybrid", "llm"):
+        fake = FakeGroq(latency={"notification": args.llm_latency}, seed=args.seed)
+        agent.groq_client = fake
+        elapsed, latencies = run_mode(agent, mode, issues, args.concurrency)
+        llm_calls = fake.requests
+        results["modes"][mode] = {
+            "seconds": round(elapsed, 4),
+            "notifications_per_s": round(args.count / elapsed, 1),
+            "p50_us": round(percentile(latencies, 50) * 1e6, 1),
+            "p95_us": round(percentile(latencies, 95) * 1e6, 1),
+            "llm_calls": llm_calls,
+            "tokens": llm_calls * (args.prompt_tokens + args.completion_tokens),
+            "usd_per_1000": round(llm_calls * completion_cost * 1000 / args.count, 4)
+        }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Micro-benchmarks of ``CivicAgentOrchestrator.process`` in isolation.
+
+Every scenario answers the LLM calls instantly, so the numbers are the
+workflow's own overhead (graph, agents, caches, database writes) per
+report rather than model latency:
+
+- stub:         in-process FakeGroq, caches off, issue persisted
+- no_persist:   as stub with ``persist=False`` (graph and agents only)
+- http:         LLMClient over HTTP to the local fake Groq server
+- warm_cache:   the same image every run, so detection and plan come from cache
+
+    python benchmarks/bench_orchestrator.py
+    python benchmarks/bench_orchestrator.py --runs 500 --scenarios stub,http --output orchestrator.json
+
+Without DATABASE_URL a temporary SQLite file is used.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap, install_client, percentile
+bootstrap()
+from PIL import Image
+from agents.action_cache import ActionPlanCache, InMemoryActionBackend
+from agents.detection_cache import DetectionCache, InMemoryDetectionBackend
+from agents.orchestrator import CivicAgentOrchestrator
+from benchmarks.fake_groq import FakeGroq, FakeGroqServer
+from benchmarks.load_test import git_commit
+from database.models import Agency, SessionLocal, init_db
+from utils.llm_client import build_llm_client
+
+SCENARIOS = ("stub", "no_persist", "http", "warm_cache")
+
+
+def write_image(directory, seed):
+    rng = random.Random(seed)
+    path = os.path.join(directory, f"bench-{seed}.jpg")
+    Image.frombytes("RGB", (96, 96), rng.randbytes(96 * 96 * 3)).save(path, format="JPEG")
+    return path
+
+
+def initial_state(image_path, i):
+    return {
+        "image_path": image_path,
+        "audio_text": None,
+        "reporter_name": f"Bench {i}",
+        "location": "Bench Road",
+        "latitude": None,
+        "longitude": None,
+        "issue_id": None,
+        "llm_calls": {},
+        "node_timings": {}
+    }
+
+
+def build(scenario, fake):
+    orchestrator = CivicAgentOrchestrator()
+    if scenario == "warm_cache":
+        orchestrator.detection_cache = DetectionCache(InMemoryDetectionBackend())
+        orchestrator.planner.cache = ActionPlanCache(InMemoryActionBackend())
+    else:
+        orchestrator.detection_cache = None
+        orchestrator.planner.cache = None
+    if scenario == "http":
+        install_client(orchestrator, build_llm_client(base_url=fake.base_url, api_key="bench"))
+    else:
+        install_client(orchestrator, FakeGroq())
+    return orchestrator
+
+
+def run(scenario, runs, warmup, images, fake):
+    orchestrator = build(scenario, fake)
+    persist = scenario != "no_persist"
+    latencies = []
+    timings = {}
+    llm_calls = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(warmup + runs):
+            image = images[0] if scenario == "warm_cache" else images[i % len(images)]
+            start = time.perf_counter()
+            result = orchestrator.process(initial_state(image, i), persist=persist)
+            elapsed = time.perf_counter() - start
+            if i < warmup:
+                continue
+            latencies.append(elapsed)
+            llm_calls += sum(result.get("llm_calls", {}).values())
+            for node, ms in result["node_timings"].items():
+                timings.setdefault(node, []).append(ms)
+
+    return {
+        "runs": runs,
+        "ops_per_s": runs / sum(latencies),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "llm_calls_per_run": llm_calls / runs,
+        "node_median_ms": {node: statistics.median(values) for node, values in timings.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    if not db.query(Agency).filter(Agency.name == "Bench Works").first():
+        db.add(Agency(name="Bench Works", department="PWD", email="b@x", phone="1", issue_types=["pothole"]))
+        db.commit()
+    db.close()
+
+    directory = tempfile.mkdtemp()
+    images = [write_image(directory, seed) for seed in range(50)]
+    fake = FakeGroqServer(seed=0)
+    try:
+        results = {
+            "commit": git_commit(),
+            "scenarios": {
+                scenario: run(scenario, args.runs, args.warmup, images, fake)
+                for scenario in args.scenarios.split(",")
+            }
+        }
+    finally:
+        fake.close()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare end-to-end report latency of the sequential and parallel agent graphs.
+
+Runs ``--runs`` reports through ``CivicAgentOrchestrator.process`` twice,
+once with ``parallel=False`` (detect -> plan -> route -> notify -> persist)
+and once with the fan-out graph, using the in-process ``FakeGroq`` client with injected
+per-call latencies, and reports p50/p95 latency plus the median time spent
+in each node.
+
+    python benchmarks/bench_orchestrator_parallel.py
+    python benchmarks/bench_orchestrator_parallel.py --runs 50 --actions-latency 1.2 0.3
+
+Latencies are ``MEAN JITTER`` in seconds. Without DATABASE_URL a temporary
+SQLite file is used.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap, install_client, percentile
+bootstrap()
+from benchmarks.fake_groq import FakeGroq
+from PIL import Image
+from database.models import Agency, SessionLocal, init_db
+from agents.orchestrator import CivicAgentOrchestrator
+
+
+def run(parallel, latency, runs, image_path, seed):
+    orchestrator = CivicAgentOrchestrator(parallel=parallel)
+    orchestrator.detection_cache = None
+    install_client(orchestrator, FakeGroq(latency=latency, seed=seed))
+
+    latencies = []
+    timings = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(runs):
+            state = {
+                "image_path": image_path,
+                "audio_text": None,
+                "reporter_name": f"Bench {i}",
+                "location": "Bench Road",
+                "latitude": None,
+                "longitude": None,
+                "issue_id": None,
+                "llm_calls": {},
+                "node_timings": {}
+            }
+            start = time.perf_counter()
+            result = orchestrator.process(state)
+            latencies.append(time.perf_counter() - start)
+            for node, ms in result["node_timings"].items():
+                timings.setdefault(node, []).append(ms)
+
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "node_median_ms": {node: statistics.median(values) for node, values in timings.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--detection-latency", type=float, nargs=2, default=(0.8, 0.2), metavar=("MEAN", "JITTER"))
+    parser.add_argument("--actions-latency", type=float, nargs=2, default=(0.7, 0.2), metavar=("MEAN", "JITTER"))
+    parser.add_argument("--notification-latency", type=float, nargs=2, default=(0.5, 0.15), metavar=("MEAN", "JITTER"))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    if not db.query(Agency).filter(Agency.name == "Bench Works").first():
+        db.add(Agency(name="Bench Works", department="PWD", email="b@x", phone="1", issue_types=["pothole"]))
+        db.commit()
+    db.close()
+
+    image_path = os.path.join(tempfile.mkdtemp(), "bench.jpg")
+    Image.new("RGB", (64, 64), color="gray").save(image_path, format="JPEG")
+
+    latency = {
+        kind: {"dist": "uniform", "low": max(0.0, mean - jitter), "high": mean + jitter}
+        for kind, (mean, jitter) in (
+            ("detection", args.detection_latency),
+            ("actions", args.actions_latency),
+            ("notification", args.notification_latency)
+        )
+    }
+    results = {
+        "runs": args.runs,
+        "latency_s": latency,
+        "sequential": run(False, latency, args.runs, image_path, args.seed),
+        "parallel": run(True, latency, args.runs, image_path, args.seed)
+    }
+    results["p50_speedup"] = results["sequential"]["p50_ms"] / results["parallel"]["p50_ms"]
+    results["p95_speedup"] = results["sequential"]["p95_ms"] / results["parallel"]["p95_ms"]
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
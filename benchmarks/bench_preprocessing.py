@@ -0,0 +1,144 @@
+"""
+Benchmark the vision preprocessing stage.
+
+Compares the payload that IssueDetectorAgent sends to Groq before
+(base64 of the raw upload) and after preprocessing (EXIF-oriented,
+downscaled, re-encoded), plus the time spent preprocessing and the
+estimated upload time on a given uplink.
+
+    python benchmarks/bench_preprocessing.py                    # uploads/ + images.jpeg
+    python benchmarks/bench_preprocessing.py --synthetic 10     # add 12 MP phone-sized photos
+    python benchmarks/bench_preprocessing.py --live             # also time real Groq calls
+
+``--live`` needs GROQ_API_KEY and measures end-to-end detect_issue latency
+with preprocessing disabled and enabled.
+"""
+
+import argparse
+import base64
+import glob
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PIL import Image
+from utils.image_processing import preprocess_image
+
+
+def synthetic_photo(width=4000, height=3000) -> bytes:
+    img = Image.effect_noise((width // 4, height // 4), 48).convert("RGB").resize((width, height))
+    exif = img.getexif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=95, exif=exif)
+    return buffer.getvalue()
+
+
+def load_corpus(paths, synthetic):
+    corpus = []
+    for path in paths:
+        with open(path, "rb") as f:
+            corpus.append((os.path.basename(path), f.read()))
+    for i in range(synthetic):
+        corpus.append((f"synthetic_{i}.jpg", synthetic_photo()))
+    return corpus
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_live(corpus):
+    from agents.issue_detector import IssueDetectorAgent
+    import tempfile
+
+    detector = IssueDetectorAgent()
+    timings = {"raw": [], "preprocessed": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, data in corpus:
+            path = os.path.join(tmp, name)
+            with open(path, "wb") as f:
+                f.write(data)
+            for label, enabled in (("raw", False), ("preprocessed", True)):
+                detector.preprocess = enabled
+                start = time.perf_counter()
+                detector.detect_issue(path, image_bytes=data)
+                timings[label].append(time.perf_counter() - start)
+    return {
+        label: {"p50_s": statistics.median(v), "p95_s": percentile(v, 95)}
+        for label, v in timings.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="Image files (default: uploads/*.jpg and images.jpeg)")
+    parser.add_argument("--synthetic", type=int, default=3, help="Number of synthetic 12 MP photos to add")
+    parser.add_argument("--max-dimension", type=int, default=1024)
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--format", default="JPEG", choices=["JPEG", "WEBP"])
+    parser.add_argument("--uplink-mbps", type=float, default=10.0, help="Uplink used to estimate upload time")
+    parser.add_argument("--live", action="store_true", help="Also time real Groq detect_issue calls")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    paths = args.images or sorted(glob.glob("uploads/*.jpg") + glob.glob("images.jpeg"))
+    paths = [p for p in paths if ".vision" not in p]
+    corpus = load_corpus(paths, args.synthetic)
+    if not corpus:
+        parser.error("No images to benchmark")
+
+    rows = []
+    for name, data in corpus:
+        start = time.perf_counter()
+        processed, mime = preprocess_image(data, args.max_dimension, args.quality, args.format)
+        elapsed = time.perf_counter() - start
+        raw_b64 = len(base64.b64encode(data))
+        new_b64 = len(base64.b64encode(processed))
+        rows.append({
+            "image": name,
+            "raw_payload_bytes": raw_b64,
+            "processed_payload_bytes": new_b64,
+            "mime_type": mime,
+            "preprocess_ms": elapsed * 1000,
+            "raw_upload_ms": raw_b64 * 8 / (args.uplink_mbps * 1e6) * 1000,
+            "processed_upload_ms": new_b64 * 8 / (args.uplink_mbps * 1e6) * 1000
+        })
+
+    print(f"{'image':<32} {'raw KB':>9} {'new KB':>9} {'ratio':>6} {'prep ms':>8} {'upload ms before/after':>24}")
+    for r in rows:
+        print(
+            f"{r['image'][:32]:<32} {r['raw_payload_bytes'] / 1024:>9.1f} "
+            f"{r['processed_payload_bytes'] / 1024:>9.1f} "
+            f"{r['processed_payload_bytes'] / r['raw_payload_bytes']:>6.2f} "
+            f"{r['preprocess_ms']:>8.1f} "
+            f"{r['raw_upload_ms']:>11.1f} / {r['processed_upload_ms']:<10.1f}"
+        )
+
+    total_raw = sum(r["raw_payload_bytes"] for r in rows)
+    total_new = sum(r["processed_payload_bytes"] for r in rows)
+    summary = {
+        "images": len(rows),
+        "total_raw_payload_bytes": total_raw,
+        "total_processed_payload_bytes": total_new,
+        "payload_reduction": 1 - total_new / total_raw,
+        "mean_preprocess_ms": statistics.mean(r["preprocess_ms"] for r in rows),
+        "mean_upload_ms_before": statistics.mean(r["raw_upload_ms"] for r in rows),
+        "mean_upload_ms_after": statistics.mean(r["processed_upload_ms"] + r["preprocess_ms"] for r in rows)
+    }
+    if args.live:
+        summary["live_detect_latency"] = run_live(corpus)
+
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"summary": summary, "images": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
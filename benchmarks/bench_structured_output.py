@@ -0,0 +1,121 @@
+"""
+Wasted LLM calls from malformed JSON: strict parsing vs local repair.
+
+The fake Groq server garbles ``--malformed-rate`` of its detection and
+action-plan answers (markdown fences, prose, trailing commas, truncation,
+refusals). The workflow runs over HTTP (``persist=False``, caches off) with:
+
+- strict:        plain ``json.loads``, no re-ask (a bad answer means a fallback)
+- strict_retry:  plain ``json.loads``, re-ask once
+- repair_retry:  local repair first, re-ask once only when it fails (the default)
+
+and reports LLM requests, wasted calls (answers thrown away), fallbacks and
+the parse failure rate per report.
+
+    python benchmarks/bench_structured_output.py
+    python benchmarks/bench_structured_output.py --reports 200 --malformed-rate 0.3 --output structured.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap, install_client, percentile
+bootstrap()
+from agents.orchestrator import CivicAgentOrchestrator
+from benchmarks.bench_orchestrator import initial_state, write_image
+from benchmarks.fake_groq import FakeGroqServer
+from benchmarks.load_test import git_commit, metric_delta
+from database.models import Agency, SessionLocal, init_db
+from utils import metrics, structured_output
+from utils.llm_client import build_llm_client
+
+MODES = {
+    "strict": {"repair": False, "retries": 0},
+    "strict_retry": {"repair": False, "retries": 1},
+    "repair_retry": {"repair": True, "retries": 1}
+}
+
+
+def scrape():
+    return metrics.parse_metrics(metrics.generate_latest().decode())
+
+
+def run(mode, images, fake):
+    structured_output.JSON_REPAIR = MODES[mode]["repair"]
+    structured_output.PARSE_RETRIES = MODES[mode]["retries"]
+    orchestrator = CivicAgentOrchestrator()
+    orchestrator.detection_cache = None
+    orchestrator.planner.cache = None
+    install_client(orchestrator, build_llm_client(base_url=fake.base_url, api_key="bench"))
+
+    before, requests_before = scrape(), fake.requests
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, image in enumerate(images):
+            start = time.perf_counter()
+            orchestrator.process(initial_state(image, i), persist=False)
+            latencies.append(time.perf_counter() - start)
+    after, requests = scrape(), fake.requests - requests_before
+
+    outcomes = metric_delta(before, after, "civic_llm_structured_outputs_total", "outcome")
+    fallbacks = metric_delta(before, after, "civic_fallbacks_total", "agent")
+
+    def outcome(name):
+        return outcomes.get(name, 0.0)
+
+    parsed = outcome("valid") + outcome("repaired") + outcome("invalid")
+    n = len(images)
+    return {
+        "reports": n,
+        "llm_requests_per_report": requests / n,
+        "wasted_calls_per_report": outcome("invalid") / n,
+        "repaired_per_report": outcome("repaired") / n,
+        "fallbacks_per_report": (fallbacks.get("detection", 0.0) + fallbacks.get("action_plan", 0.0)) / n,
+        "parse_failure_rate": outcome("invalid") / parsed if parsed else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=100)
+    parser.add_argument("--malformed-rate", type=float, default=0.15)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    if not db.query(Agency).filter(Agency.name == "Bench Works").first():
+        db.add(Agency(name="Bench Works", department="PWD", email="b@x", phone="1", issue_types=["pothole"]))
+        db.commit()
+    db.close()
+
+    directory = tempfile.mkdtemp()
+    images = [write_image(directory, seed) for seed in range(args.reports)]
+    results = {"commit": git_commit(), "malformed_rate": args.malformed_rate, "modes": {}}
+    for mode in args.modes.split(","):
+        # Same seed per mode, so every mode sees the same sequence of garbled answers
+        fake = FakeGroqServer(malformed_rate=args.malformed_rate, seed=0)
+        try:
+            results["modes"][mode] = run(mode, images, fake)
+        finally:
+            fake.close()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
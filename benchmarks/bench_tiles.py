@@ -0,0 +1,140 @@
+"""
+Benchmark heatmap tiles as the issue table grows.
+
+Seeds issues over a metro area in steps (default 10k, 100k, 1M rows) into a
+scratch database and, after each step, times the tiles covering the area at
+a few zoom levels:
+
+- raw:  GROUP BY geohash prefix over the issues inside the tile
+- grid: ``database.grid.read_tile``, i.e. summing issue_grid_counts rows
+
+Both must agree on every cell of the tile; the script checks before timing. The
+grid is rebuilt after seeding because the rows are bulk inserted.
+
+    python benchmarks/bench_tiles.py
+    python benchmarks/bench_tiles.py --sizes 50000,500000 --zoom 12
+
+Without DATABASE_URL a temporary SQLite file is used.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap
+bootstrap()
+from sqlalchemy import and_, func, or_
+from database.grid import read_tile, rebuild_issue_grid, tile_precision
+from database.models import CivicIssue, SessionLocal, engine, init_db
+from utils.geo import GEOHASH_END, covering_cells, encode, lat_lon_to_tile, tile_bbox
+
+ISSUE_TYPES = ["pothole", "garbage", "water_leak", "dirt_on_road", "criminal_activity", "accident"]
+AREA = (26.65, 75.55, 27.15, 76.05)
+
+
+def seed(start: int, stop: int, batch_size: int = 20000):
+    """Issues ``start`` .. ``stop`` over AREA, spread across 90 days"""
+    first_day = datetime(2024, 1, 1)
+    rng = random.Random(start)
+    min_lat, min_lon, max_lat, max_lon = AREA
+    with engine.begin() as conn:
+        for offset in range(start, stop, batch_size):
+            batch = []
+            for i in range(offset, min(stop, offset + batch_size)):
+                lat, lon = rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+                created = first_day + timedelta(minutes=rng.randrange(90 * 24 * 60))
+                batch.append({
+                    "reporter_name": f"Reporter {i}",
+                    "location": f"Ward {i % 500}",
+                    "latitude": lat,
+                    "longitude": lon,
+                    "geohash": encode(lat, lon),
+                    "issue_type": rng.choice(ISSUE_TYPES),
+                    "image_path": f"uploads/{i}.jpg",
+                    "status": "reported",
+                    "priority": "medium",
+                    "created_at": created,
+                    "updated_at": created
+                })
+            conn.execute(CivicIssue.__table__.insert(), batch)
+
+
+def raw_tile(db, z, x, y):
+    """Per-cell counts straight from the issues table"""
+    bbox = tile_bbox(z, x, y)
+    precision = tile_precision(z)
+    cell = func.substr(CivicIssue.geohash, 1, precision)
+    covers = covering_cells(bbox, max_cells=16, max_precision=precision)
+    rows = db.query(cell, func.count(CivicIssue.id)).filter(
+        or_(*[and_(CivicIssue.geohash >= c, CivicIssue.geohash < c + GEOHASH_END) for c in covers])
+    ).group_by(cell).all()
+    return rows
+
+
+def tiles_for(z):
+    min_lat, min_lon, max_lat, max_lon = AREA
+    x0, y0 = lat_lon_to_tile(max_lat, min_lon, z)
+    x1, y1 = lat_lon_to_tile(min_lat, max_lon, z)
+    return [(z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def timed(fn, tiles, limit=30):
+    samples = []
+    for z, x, y in tiles[:limit]:
+        start = time.perf_counter()
+        fn(z, x, y)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 2), "max_ms": round(samples[-1], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated table sizes")
+    parser.add_argument("--zoom", type=int, action="append", help="Zoom level (repeatable)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    zooms = args.zoom or [10, 12, 14]
+
+    init_db()
+    results = {"zooms": zooms, "runs": []}
+    seeded = 0
+    db = SessionLocal()
+    for size in sizes:
+        start = time.perf_counter()
+        seed(seeded, size)
+        seeded = size
+        rebuild_issue_grid(db)
+        print(f"Seeded {size} rows and rebuilt the grid in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+        run = {"rows": size, "tiles": {}}
+        for z in zooms:
+            tiles = tiles_for(z)
+            sample = tiles[len(tiles) // 2]
+            raw = dict(raw_tile(db, *sample))
+            grid = read_tile(db, *sample)
+            # The raw query also returns cells whose centre lies in a neighbouring tile
+            assert all(raw.get(cell["geohash"]) == cell["count"] for cell in grid["cells"])
+            run["tiles"][f"z{z}"] = {
+                "tiles": len(tiles),
+                "raw": timed(lambda *tile: raw_tile(db, *tile), tiles),
+                "grid": timed(lambda *tile: read_tile(db, *tile), tiles)
+            }
+        results["runs"].append(run)
+    db.close()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Evaluate cascaded vision detection on a labeled local image set.
+
+Images are read from ``--images DIR/<label>/*`` where ``<label>`` is an
+issue type (``pothole``, ``garbage``, ``water_leak``, ``dirt_on_road``,
+``criminal_activity``, ``accident``) or ``none``. Each image is run
+through ``IssueDetectorAgent`` with the large model only and then with the
+screening cascade at every ``--thresholds`` value of
+VISION_SCREEN_NEGATIVE_CONFIDENCE, reporting per mode:
+
+- detection accuracy (issue vs no issue) and issue type accuracy
+- missed issues: labeled issues the mode called "no issue"
+- escalation rate and vision calls per image
+- mean / p95 latency and mean estimated cost per image (civic_llm_cost_usd)
+
+    GROQ_API_KEY=... python benchmarks/eval_cascade.py --images data/labeled
+    python benchmarks/eval_cascade.py --images data/labeled --thresholds 0.7,0.85,0.95 --output cascade.json
+    python benchmarks/eval_cascade.py --images data/labeled --fake   # plumbing check, canned answers
+
+``--fake`` answers from ``benchmarks/fake_groq.py`` (with a faster
+screening model), so accuracy is meaningless there; use it to check the
+script and the cascade wiring without a key.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap, percentile
+bootstrap()
+from benchmarks.fake_groq import FakeGroqServer
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def load_labeled_images(directory):
+    samples = []
+    for label_dir in sorted(Path(directory).iterdir()):
+        if not label_dir.is_dir():
+            continue
+        for path in sorted(label_dir.iterdir()):
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                samples.append((str(path), label_dir.name))
+    return samples
+
+
+def total_cost():
+    from utils import metrics
+
+    samples = metrics.parse_metrics(metrics.generate_latest().decode())
+    return sum(value for _, value in samples.get("civic_llm_cost_usd_total", []))
+
+
+def evaluate(detector, samples, concurrency):
+    def detect(sample):
+        path, _ = sample
+        with open(path, "rb") as f:
+            data = f.read()
+        start = time.perf_counter()
+        result = detector.detect_issue(path, image_bytes=data)
+        return result, time.perf_counter() - start
+
+    cost_before = total_cost()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(detect, samples))
+    cost = total_cost() - cost_before
+
+    n = len(samples)
+    latencies = [seconds for _, seconds in outcomes]
+    detected_correct = type_correct = missed = escalated = calls = 0
+    issues = sum(1 for _, label in samples if label != "none")
+    for (_, label), (result, _) in zip(samples, outcomes):
+        predicted = bool(result.get("issue_detected"))
+        predicted_type = result.get("issue_type") if predicted else "none"
+        detected_correct += predicted == (label != "none")
+        type_correct += predicted_type == label
+        missed += label != "none" and not predicted
+        escalated += result.get("cascade") == "escalated"
+        calls += result.get("model_calls", 1)
+
+    return {
+        "images": n,
+        "detection_accuracy": detected_correct / n,
+        "type_accuracy": type_correct / n,
+        "missed_issue_rate": missed / issues if issues else None,
+        "escalation_rate": escalated / n if detector.cascade else None,
+        "vision_calls_per_image": calls / n,
+        "mean_latency_ms": statistics.mean(latencies) * 1000,
+        "p95_latency_ms": percentile(latencies, 95) * 1000,
+        "mean_cost_usd": cost / n,
+        "fallbacks": sum(1 for result, _ in outcomes if result.get("fallback"))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="Directory with one sub-directory per label")
+    parser.add_argument("--thresholds", default="0.85", help="Screen negative confidence values to try")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--fake", action="store_true", help="Answer from the local fake Groq server")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    samples = load_labeled_images(args.images)
+    if not samples:
+        parser.error(f"No labeled images under {args.images}")
+
+    fake = None
+    if args.fake:
+        fake = FakeGroqServer(latency={
+            "meta-llama/llama-4-scout-17b-16e-instruct": {"dist": "lognormal", "median": 0.25, "sigma": 0.3},
+            "detection": {"dist": "lognormal", "median": 0.9, "sigma": 0.3}
+        }, responses={
+            # Half the screens come back confidently negative
+            "meta-llama/llama-4-scout-17b-16e-instruct": [
+                {"issue_detected": False, "issue_type": "none", "confidence": 0.95},
+                {"issue_detected": True, "issue_type": "pothole", "confidence": 0.8}
+            ]
+        }, seed=7)
+        os.environ["GROQ_BASE_URL"] = fake.base_url
+
+    from agents.issue_detector import IssueDetectorAgent
+
+    detector = IssueDetectorAgent()
+    # The derived-image cache would hide preprocessing cost after the first mode
+    detector.preprocess = False
+    results = {"labels": sorted({label for _, label in samples}), "modes": {}}
+
+    detector.cascade = False
+    results["modes"]["large_only"] = evaluate(detector, samples, args.concurrency)
+    detector.cascade = True
+    for threshold in (float(value) for value in args.thresholds.split(",")):
+        detector.screen_negative_confidence = threshold
+        results["modes"][f"cascade@{threshold:g}"] = evaluate(detector, samples, args.concurrency)
+    results["cascade_stats"] = detector.cascade_stats()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if fake is not None:
+        fake.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Local OpenAI / Groq compatible chat completions server for offline runs.
+
+Answers ``POST /openai/v1/chat/completions`` (and ``/v1/chat/completions``)
+with canned detection / action-plan / notification content after a
+sampled latency, failing a configurable share of calls, so the API, the
+load test and the benchmarks run without a GROQ_API_KEY. Point the app at
+it with ``GROQ_BASE_URL``. ``FakeGroq`` gives the same answers in process,
+without a socket, for tests and benchmarks that swap an agent's client.
+
+    python benchmarks/fake_groq.py --port 8787
+    python benchmarks/fake_groq.py --port 8787 --config fake_groq.json
+
+The config file (or the constructor keywords) may set:
+
+    {
+      "latency": {"detection": {"dist": "lognormal", "median": 0.8, "sigma": 0.35},
+                  "actions": {"dist": "uniform", "low": 0.4, "high": 0.9},
+                  "notification": 0.3},
+      "error_rate": 0.02,
+      "error_status": 503,
+      "retry_after": 1,
+      "responses": {"detection": {...} or "raw text" or [choices...]},
+      "malformed_rate": 0.1,
+      "seed": 7
+    }
+
+Latency (and responses) may also be keyed by the requested model name,
+which wins over the request kind; that is how a screening model can be
+made faster than the large one.
+
+Latency specs are a number of seconds or ``{"dist": ...}`` with
+``constant`` (seconds), ``uniform`` (low, high), ``normal`` (mean, sd),
+``lognormal`` (median, sigma) or ``exponential`` (mean). A list of
+responses is sampled uniformly. ``script()`` queues exact responses ahead
+of the random ones, which the tests use to force retries.
+
+``malformed_rate`` garbles that share of the JSON answers (detection and
+action plans) the way models do: wrapped in a markdown fence or prose,
+with a trailing comma, cut off mid-object, or replaced by a refusal.
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+KINDS = ("detection", "actions", "notification")
+
+DETECTION = {
+    "issue_detected": True,
+    "issue_type": "pothole",
+    "severity": "high",
+    "description": "Large pothole in the middle of the road",
+    "confidence": 0.92
+}
+
+ACTIONS = {
+    "immediate_actions": ["Barricade the pothole"],
+    "citizen_actions": ["Avoid the lane"],
+    "authority_actions": ["Fill the pothole"],
+    "preventive_measures": ["Resurface the road"]
+}
+
+NOTIFICATION = "Pothole reported on the main road, please inspect."
+
+USAGE = {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150}
+
+MALFORMATIONS = ("fenced", "prose", "trailing_comma", "truncated", "refusal")
+
+
+def malform(text: str, rng: random.Random, kind: str = None) -> str:
+    """``text`` (a JSON object) garbled by one of ``MALFORMATIONS``, picked at random unless ``kind`` is given"""
+    kind = kind or rng.choice(MALFORMATIONS)
+    if kind == "fenced":
+        return f"```json\n{text}\n```"
+    if kind == "prose":
+        return f"Here is my analysis of the report:\n{text}\nLet me know if you need anything else."
+    if kind == "trailing_comma":
+        return text[:text.rindex("}")].rstrip() + ",\n}"
+    if kind == "truncated":
+        return text[:int(len(text) * rng.uniform(0.6, 0.9))]
+    return "I'm sorry, I can't provide an assessment of this image."
+
+
+def request_kind(messages) -> str:
+    """Which agent sent the chat request: images mean detection, the planner prompt means actions"""
+    content = messages[0].get("content") if messages else ""
+    if isinstance(content, list):
+        return "detection"
+    if "actionable suggestions" in (content or ""):
+        return "actions"
+    return "notification"
+
+
+def sample_latency(spec, rng: random.Random) -> float:
+    """Seconds to wait for one call under a latency ``spec`` (see module docstring)"""
+    if not spec:
+        return 0.0
+    if isinstance(spec, (int, float)):
+        return max(0.0, float(spec))
+    dist = spec.get("dist", "constant")
+    if dist == "constant":
+        value = spec.get("seconds", spec.get("mean", 0.0))
+    elif dist == "uniform":
+        value = rng.uniform(spec["low"], spec["high"])
+    elif dist == "normal":
+        value = rng.gauss(spec["mean"], spec.get("sd", 0.0))
+    elif dist == "lognormal":
+        value = rng.lognormvariate(math.log(spec["median"]), spec.get("sigma", 0.0))
+    elif dist == "exponential":
+        value = rng.expovariate(1.0 / spec["mean"])
+    else:
+        raise ValueError(f"Unknown latency distribution: {dist}")
+    return max(0.0, value)
+
+
+class FakeGroqError(Exception):
+    """Injected provider failure raised by the in-process ``FakeGroq``, shaped like a groq ``APIStatusError``"""
+
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"injected {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={name.lower(): value for name, value in (headers or {}).items()})
+
+
+class FakeGroq:
+    """In-process fake of ``groq.Groq().chat.completions.create``.
+
+    Answers with the canned payloads above after a sampled latency,
+    failing or garbling a configurable share of calls; ``FakeGroqServer``
+    serves the same answers over HTTP. ``requests`` counts every call,
+    ``calls`` lists the kind of each call in order, ``errors`` the
+    injected failures and ``malformed`` the garbled answers. Set
+    ``content`` to answer every kind with the same text.
+    """
+
+    def __init__(self, latency=None, error_rate: float = 0.0, error_status: int = 503, retry_after=None,
+                 responses=None, content: str = None, malformed_rate: float = 0.0, seed: int = None):
+        self.latency = latency or {}
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.responses = {"detection": DETECTION, "actions": ACTIONS, "notification": NOTIFICATION}
+        self.responses.update(responses or {})
+        self.content = content
+        self.malformed_rate = malformed_rate
+        self.malformed = 0
+        self.scripted = []
+        self.requests = 0
+        self.errors = 0
+        self.calls = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    # Tests read and swap the canned answer per kind: fake.detection = {...}
+    detection = property(lambda self: self.responses["detection"],
+                         lambda self, value: self.responses.__setitem__("detection", value))
+    actions = property(lambda self: self.responses["actions"],
+                       lambda self, value: self.responses.__setitem__("actions", value))
+    notification = property(lambda self: self.responses["notification"],
+                            lambda self, value: self.responses.__setitem__("notification", value))
+
+    @classmethod
+    def from_config(cls, config: dict, **overrides):
+        options = {
+            key: config[key]
+            for key in (
+                "latency", "error_rate", "error_status", "retry_after", "responses", "content", "malformed_rate", "seed"
+            )
+            if key in config
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def script(self, status, headers=None, delay=0, times=1):
+        """Answer the next ``times`` requests with ``status`` after ``delay`` seconds"""
+        with self._lock:
+            self.scripted.extend([(status, headers, delay)] * times)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "malformed": self.malformed,
+                "calls": {kind: self.calls.count(kind) for kind in KINDS}
+            }
+
+    def create(self, model, messages, **kwargs):
+        status, headers, delay, body = self._respond({"model": model, "messages": messages})
+        if delay:
+            time.sleep(delay)
+        if status != 200:
+            raise FakeGroqError(status, headers)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=body["choices"][0]["message"]["content"]))],
+            usage=SimpleNamespace(**body["usage"])
+        )
+
+    def _respond(self, request: dict):
+        kind = request_kind(request.get("messages") or [])
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+            self.calls.append(kind)
+            if self.scripted:
+                status, headers, delay = self.scripted.pop(0)
+            else:
+                failed = self.error_rate and self._rng.random() < self.error_rate
+                status = self.error_status if failed else 200
+                headers = {"Retry-After": str(self.retry_after)} if failed and self.retry_after is not None else {}
+                model = request.get("model")
+                delay = sample_latency(self.latency.get(model, self.latency.get(kind)), self._rng)
+            if status != 200:
+                self.errors += 1
+                return status, headers, delay, {"error": {"message": f"injected {status}", "type": "fake_groq"}}
+            content = self.content if self.content is not None else self._content(request.get("model"), kind)
+            if kind != "notification" and self.malformed_rate and self._rng.random() < self.malformed_rate:
+                self.malformed += 1
+                content = malform(content, self._rng)
+
+        return status, headers, delay, {
+            "id": f"chatcmpl-fake-{number}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": dict(USAGE)
+        }
+
+    def _content(self, model: str, kind: str) -> str:
+        response = self.responses.get(model, self.responses[kind])
+        if isinstance(response, list):
+            response = self._rng.choice(response)
+        return response if isinstance(response, str) else json.dumps(response)
+
+
+class FakeGroqServer(FakeGroq):
+    """``FakeGroq`` behind a threaded chat completions server; ``base_url`` is ready once constructed.
+
+    ``connections`` holds the distinct client sockets seen.
+    """
+
+    def __init__(self, *args, host: str = "127.0.0.1", port: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        server = self
+        self.connections = set()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("content-length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.connections.add(self.client_address)
+                status, headers, delay, body = server._respond(request)
+                if delay:
+                    time.sleep(delay)
+                payload = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    for name, value in (headers or {}).items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--config", help="JSON file with latency / error / response settings")
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--malformed-rate", type=float)
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    if args.error_rate is not None:
+        config["error_rate"] = args.error_rate
+    if args.malformed_rate is not None:
+        config["malformed_rate"] = args.malformed_rate
+
+    server = FakeGroqServer.from_config(config, host=args.host, port=args.port)
+    print(f"Fake Groq listening on {server.base_url} (set GROQ_BASE_URL={server.base_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
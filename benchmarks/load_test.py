@@ -0,0 +1,299 @@
+"""
+Load test the API against a local fake Groq server.
+
+Starts ``benchmarks/fake_groq.py`` and the FastAPI app (uvicorn, in a
+background thread) on free local ports, then drives a fixed number of
+requests from ``--concurrency`` client threads, each picking
+``POST /api/report-issue`` with probability ``--report-ratio`` and
+``GET /api/issues`` otherwise. Per endpoint it records throughput and
+p50/p95/p99 latency; from ``/metrics`` scraped before and after it
+records SQL statements and LLM calls, in total and per report.
+
+Results are written as JSON together with the git commit, so runs can be
+compared across commits:
+
+    python benchmarks/load_test.py --requests 400 --concurrency 16
+    python benchmarks/load_test.py --fake-groq-config slow.json --output after.json --compare before.json
+    python benchmarks/load_test.py --url http://localhost:8000   # an already running API
+
+Uploads are random-noise JPEGs, unique per request unless ``--image-pool``
+limits them, so the detection cache only hits when asked to. With
+``--critical-ratio`` that share of reports carries an accident transcript,
+which the scheduler triages as critical; they are reported separately as
+``report_critical``. Without
+DATABASE_URL a temporary SQLite file is used.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import bootstrap, percentile
+from benchmarks.fake_groq import FakeGroqServer
+
+ENDPOINTS = ("report", "report_critical", "list")
+CRITICAL_AUDIO = "Accident near the crossing, a rider is injured"
+# Jaipur, so reports get geohashes, grid counts and incident clustering like real ones
+AREA = (26.80, 75.70, 27.00, 75.90)
+LATENCY_DEFAULTS = {
+    "detection": {"dist": "lognormal", "median": 0.8, "sigma": 0.3},
+    "actions": {"dist": "lognormal", "median": 0.6, "sigma": 0.3},
+    "notification": {"dist": "lognormal", "median": 0.4, "sigma": 0.3}
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def noise_jpeg(rng: random.Random, size: int = 96) -> bytes:
+    """Random pixels: neither the exact nor the perceptual detection cache can match them"""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (size, size), rng.randbytes(size * size * 3)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api():
+    """Run the app with uvicorn in a daemon thread; returns (base url, server)"""
+    import uvicorn
+    from app.main import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("API did not start within 30s")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+
+def scrape(client, base_url):
+    from utils.metrics import parse_metrics
+
+    response = client.get(f"{base_url}/metrics")
+    response.raise_for_status()
+    return parse_metrics(response.text)
+
+
+def metric_delta(before, after, name, *keys):
+    """Increase of ``name`` between two scrapes, summed or grouped by the label ``keys``"""
+    totals = {}
+    for samples, sign in ((after, 1), (before, -1)):
+        for labels, value in samples.get(name, []):
+            group = ":".join(labels.get(key, "") for key in keys) if keys else "total"
+            totals[group] = totals.get(group, 0.0) + sign * value
+    return totals if keys else totals.get("total", 0.0)
+
+
+def summarise(samples, elapsed):
+    latencies = [seconds for seconds, _ in samples]
+    errors = sum(1 for _, status in samples if status >= 400)
+    if not latencies:
+        return {"requests": 0}
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "statuses": {str(s): sum(1 for _, status in samples if status == s) for s in sorted({s for _, s in samples})},
+        "throughput_rps": len(samples) / elapsed,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000
+    }
+
+
+def run_load(base_url, requests_total, concurrency, report_ratio, images, seed, mode="sync", critical_ratio=0.0):
+    """Fire ``requests_total`` requests from ``concurrency`` threads; returns ({endpoint: samples}, seconds)"""
+    import httpx
+
+    plan_rng = random.Random(seed)
+    plan = [
+        ("report_critical" if plan_rng.random() < critical_ratio else "report")
+        if plan_rng.random() < report_ratio else "list"
+        for _ in range(requests_total)
+    ]
+    samples = {name: [] for name in ENDPOINTS}
+    lock = threading.Lock()
+    next_index = iter(range(requests_total))
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        with httpx.Client(timeout=120) as client:
+            while True:
+                with lock:
+                    index = next(next_index, None)
+                if index is None:
+                    return
+                kind = plan[index]
+                start = time.perf_counter()
+                try:
+                    if kind != "list":
+                        min_lat, min_lon, max_lat, max_lon = AREA
+                        data = {
+                            "reporter_name": f"Load {worker_id}",
+                            "location": f"Ward {index % 50}",
+                            "latitude": str(rng.uniform(min_lat, max_lat)),
+                            "longitude": str(rng.uniform(min_lon, max_lon))
+                        }
+                        if kind == "report_critical":
+                            data["audio_text"] = CRITICAL_AUDIO
+                        response = client.post(
+                            f"{base_url}/api/report-issue",
+                            params={"mode": mode},
+                            files={"image": (f"load-{index}.jpg", images[index % len(images)], "image/jpeg")},
+                            data=data
+                        )
+                    else:
+                        response = client.get(f"{base_url}/api/issues", params={"limit": 50})
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 599
+                elapsed = time.perf_counter() - start
+                with lock:
+                    samples[kind].append((elapsed, status))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def compare(results, baseline):
+    """Relative change of the headline numbers against an earlier results file"""
+    changes = {}
+    for endpoint, stats in results["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(endpoint, {})
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if old.get(key) and stats.get(key) is not None:
+                changes[f"{endpoint}.{key}"] = f"{(stats[key] - old[key]) / old[key] * 100:+.1f}%"
+    for key in ("db_queries_per_report", "llm_calls_per_report"):
+        if baseline.get(key) and results.get(key) is not None:
+            changes[key] = f"{(results[key] - baseline[key]) / baseline[key] * 100:+.1f}%"
+    return {"baseline_commit": baseline.get("commit"), "changes": changes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--report-ratio", type=float, default=0.3, help="Share of requests that are reports")
+    parser.add_argument("--critical-ratio", type=float, default=0.0, help="Share of reports triaged as critical")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync", help="report-issue ?mode=")
+    parser.add_argument("--image-pool", type=int, default=0, help="Reuse this many images (0: unique per request)")
+    parser.add_argument("--fake-groq-config", help="JSON config for the fake Groq server (see fake_groq.py)")
+    parser.add_argument("--error-rate", type=float, help="Share of fake LLM calls that fail")
+    parser.add_argument("--url", help="Load an already running API instead of starting one")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--compare", help="Earlier results file to report changes against")
+    args = parser.parse_args()
+
+    config = {"latency": LATENCY_DEFAULTS, "seed": args.seed}
+    if args.fake_groq_config:
+        with open(args.fake_groq_config) as f:
+            config.update(json.load(f))
+    if args.error_rate is not None:
+        config["error_rate"] = args.error_rate
+
+    fake = None
+    base_url = args.url
+    if base_url is None:
+        # Configure the app before it is imported: scratch database, uploads and the fake provider
+        bootstrap(uploads=True)
+        fake = FakeGroqServer.from_config(config)
+        os.environ["GROQ_BASE_URL"] = fake.base_url
+        base_url, _ = start_api()
+
+    rng = random.Random(args.seed)
+    images = [noise_jpeg(rng) for _ in range(args.image_pool or args.requests)]
+
+    import httpx
+
+    with httpx.Client(timeout=30) as client:
+        before = scrape(client, base_url)
+        samples, elapsed = run_load(
+            base_url, args.requests, args.concurrency, args.report_ratio, images, args.seed, args.mode,
+            args.critical_ratio
+        )
+        after = scrape(client, base_url)
+
+    reports = len(samples["report"]) + len(samples["report_critical"])
+    db_queries = metric_delta(before, after, "civic_db_query_duration_seconds_count", "operation")
+    llm_calls = metric_delta(before, after, "civic_llm_requests_total", "outcome")
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "report_ratio": args.report_ratio,
+            "critical_ratio": args.critical_ratio,
+            "mode": args.mode,
+            "image_pool": args.image_pool,
+            "url": args.url,
+            "fake_groq": None if args.url else config
+        },
+        "elapsed_s": elapsed,
+        "throughput_rps": args.requests / elapsed,
+        "endpoints": {name: summarise(values, elapsed) for name, values in samples.items()},
+        "db_queries": db_queries,
+        "db_queries_per_report": sum(db_queries.values()) / reports if reports else None,
+        "llm_calls": llm_calls,
+        "llm_calls_per_report": sum(llm_calls.values()) / reports if reports else None,
+        "llm_fallbacks": metric_delta(before, after, "civic_fallbacks_total", "agent"),
+        "cache_lookups": metric_delta(before, after, "civic_cache_lookups_total", "cache", "result"),
+        "scheduler_wait_s": {
+            priority: (
+                metric_delta(before, after, "civic_scheduler_wait_seconds_sum", "priority").get(priority, 0.0)
+                / count if count else None
+            )
+            for priority, count in metric_delta(
+                before, after, "civic_scheduler_wait_seconds_count", "priority"
+            ).items()
+        }
+    }
+    if fake is not None:
+        results["fake_groq"] = fake.stats()
+    if args.compare:
+        with open(args.compare) as f:
+            results["comparison"] = compare(results, json.load(f))
+
+    print(json.dumps(results, indent=2))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    if fake is not None:
+        fake.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from database.models import ALL_DAYS, CivicIssue, GRID_EXCLUDED_STATUSES, GRID_PRECISIONS, IssueGridCount
+from database.queries import InvalidQueryError
+from utils.geo import GEOHASH_END, cell_size, covering_cells, decode_bbox, split_antimeridian, tile_bbox
+
+MAX_TILE_ZOOM = 22
+
+# Aim for cells of at least this many pixels on a 256 px tile
+MIN_CELL_PIXELS = 16
+
+
+def tile_precision(z: int) -> int:
+    """Finest grid precision whose cells are still at least MIN_CELL_PIXELS wide at zoom ``z``"""
+    tile_width = 360.0 / 2 ** z
+    best = GRID_PRECISIONS[0]
+    for precision in GRID_PRECISIONS:
+        if cell_size(precision)[1] * 256 / tile_width >= MIN_CELL_PIXELS:
+            best = precision
+    return best
+
+
+def _inside(lat: float, lon: float, bbox) -> bool:
+    return any(
+        min_lat <= lat < max_lat and min_lon <= lon < max_lon
+        for min_lat, min_lon, max_lat, max_lon in split_antimeridian(bbox)
+    )
+
+
+def read_tile(
+    db: Session,
+    z: int,
+    x: int,
+    y: int,
+    issue_type: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None
+) -> Dict[str, Any]:
+    """Issue counts per grid cell inside a slippy map tile, from issue_grid_counts.
+
+    Cells belong to the tile their centre falls in, so neighbouring tiles
+    never count a cell twice. The work is bounded by the number of cells in
+    the tile times issue types (times days, for a ``since``/``until``
+    range), not by the number of issues.
+    """
+    if not 0 <= z <= MAX_TILE_ZOOM:
+        raise InvalidQueryError(f"z must be between 0 and {MAX_TILE_ZOOM}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise InvalidQueryError(f"Tile {x}/{y} does not exist at zoom {z}")
+    if since and until and since > until:
+        raise InvalidQueryError("since must not be after until")
+
+    bbox = tile_bbox(z, x, y)
+    precision = tile_precision(z)
+    criteria = [IssueGridCount.precision == precision]
+    if issue_type:
+        criteria.append(IssueGridCount.issue_type == issue_type)
+    if since or until:
+        criteria.append(IssueGridCount.day > ALL_DAYS)
+        if since:
+            criteria.append(IssueGridCount.day >= since)
+        if until:
+            criteria.append(IssueGridCount.day <= until)
+    else:
+        criteria.append(IssueGridCount.day == ALL_DAYS)
+    # One index range scan per covering cell; an OR of the ranges makes
+    # SQLite scan the whole precision instead
+    ranges = union_all(*[
+        select(IssueGridCount.cell, IssueGridCount.issue_type, IssueGridCount.count, IssueGridCount.updated_at)
+        .where(*criteria, IssueGridCount.cell >= cover, IssueGridCount.cell < cover + GEOHASH_END)
+        for cover in covering_cells(bbox, max_cells=16, max_precision=precision)
+    ]).subquery()
+    rows = db.execute(
+        select(ranges.c.cell, ranges.c.issue_type, func.sum(ranges.c.count), func.max(ranges.c.updated_at))
+        .group_by(ranges.c.cell, ranges.c.issue_type)
+    ).all()
+
+    cells = defaultdict(dict)
+    last_modified = None
+    for cell, cell_type, count, updated_at in rows:
+        # Deleted issues leave their bucket behind at zero; it still dates the tile
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+        if count:
+            cells[cell][cell_type] = int(count)
+
+    features, total = [], 0
+    for cell in sorted(cells):
+        min_lat, min_lon, max_lat, max_lon = decode_bbox(cell)
+        lat, lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+        if not _inside(lat, lon, bbox):
+            continue
+        count = sum(cells[cell].values())
+        total += count
+        features.append({
+            "geohash": cell,
+            "lat": round(lat, 6),
+            "lon": round(lon, 6),
+            "count": count,
+            "by_type": cells[cell]
+        })
+    return {
+        "z": z,
+        "x": x,
+        "y": y,
+        "bbox": [round(value, 6) for value in bbox],
+        "precision": precision,
+        "cells": features,
+        "total": total,
+        "last_modified": last_modified
+    }
+
+
+def rebuild_issue_grid(db: Session):
+    """Recompute issue_grid_counts from scratch with GROUP BY queries.
+
+    Like ``rebuild_issue_stats``: the grid is kept current by the ORM write
+    hooks on CivicIssue, this repairs rows written by bulk SQL.
+    """
+    now = datetime.utcnow()
+    day = func.date(CivicIssue.created_at)
+    counted = (
+        CivicIssue.issue_type.isnot(None),
+        CivicIssue.geohash.isnot(None),
+        or_(CivicIssue.status.is_(None), CivicIssue.status.notin_(GRID_EXCLUDED_STATUSES))
+    )
+    db.query(IssueGridCount).delete()
+    for precision in GRID_PRECISIONS:
+        cell = func.substr(CivicIssue.geohash, 1, precision)
+        rows = (
+            db.query(cell, CivicIssue.issue_type, day, func.count(CivicIssue.id))
+            .filter(*counted)
+            .group_by(cell, CivicIssue.issue_type, day)
+            .all()
+        )
+        totals = defaultdict(int)
+        mappings = []
+        for cell_value, issue_type, day_value, count in rows:
+            if day_value is None:
+                continue
+            totals[(cell_value, issue_type)] += count
+            mappings.append({
+                "precision": precision,
+                "cell": cell_value,
+                "issue_type": issue_type,
+                # SQLite returns the day as text
+                "day": day_value if isinstance(day_value, date) else date.fromisoformat(str(day_value)[:10]),
+                "count": count,
+                "updated_at": now
+            })
+        mappings.extend(
+            {"precision": precision, "cell": cell_value, "issue_type": issue_type, "day": ALL_DAYS,
+             "count": count, "updated_at": now}
+            for (cell_value, issue_type), count in totals.items()
+        )
+        db.bulk_insert_mappings(IssueGridCount, mappings)
+    db.commit()
+
+
+def grid_is_empty(db: Session) -> bool:
+    return db.query(IssueGridCount.precision).first() is None
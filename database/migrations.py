@@ -0,0 +1,43 @@
+"""
+Lightweight, idempotent schema migrations.
+
+``Base.metadata.create_all`` only creates missing tables, so databases
+created by an older release never pick up new columns or indexes. This
+brings existing tables in line with the models: missing nullable columns
+are added with ``ALTER TABLE`` and missing indexes are created.
+"""
+
+from sqlalchemy import inspect, text
+
+
+def run_migrations(engine, metadata=None):
+    if metadata is None:
+        from database.models import Base
+        metadata = Base.metadata
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            default = ""
+            if column.server_default is not None:
+                default = f" DEFAULT {column.server_default.arg}"
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}"
+                ))
+            print(f"Migrated: added column {table.name}.{column.name}")
+
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine, checkfirst=True)
+                print(f"Migrated: created index {index.name}")
@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, JSON
+from sqlalchemy import create_engine, event, inspect, Column, Integer, String, Date, DateTime, Text, Float, JSON, Index, Boolean, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import date, datetime
+import itertools
 import os
+import time
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -24,9 +26,37 @@ class CivicIssue(Base):
     priority = Column(String(20), default="medium")
     assigned_agency = Column(String(255))
     suggested_actions = Column(JSON)
+    image_hash = Column(String(64), nullable=True, index=True)
+    duplicate_of = Column(Integer, nullable=True, index=True)
+    report_count = Column(Integer, default=1)  # reports clustered into this incident, itself included
+    geohash = Column(String(12), nullable=True)  # derived from latitude/longitude on write
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Keyset pagination walks (created_at, id) newest first; each filter
+    # column gets its own composite index so filtered pages are index scans too.
+    __table_args__ = (
+        Index("ix_civic_issues_created_id", "created_at", "id"),
+        Index("ix_civic_issues_status_created", "status", "created_at", "id"),
+        Index("ix_civic_issues_priority_created", "priority", "created_at", "id"),
+        Index("ix_civic_issues_type_created", "issue_type", "created_at", "id"),
+        Index("ix_civic_issues_agency_created", "assigned_agency", "created_at", "id"),
+        # Nearby / bounding box queries are prefix range scans on the geohash;
+        # carrying the coordinates and sort keys makes them index-only
+        Index("ix_civic_issues_geohash", "geohash", "latitude", "longitude", "created_at", "id"),
+    )
+    
+class IssueImage(Base):
+    """Every photo of a multi-image report, in upload order; single-photo issues only use image_path"""
+    __tablename__ = "issue_images"
+    
+    id = Column(Integer, primary_key=True)
+    issue_id = Column(Integer, nullable=False, index=True)
+    position = Column(Integer, default=0)  # 0 is the issue's own image_path
+    image_path = Column(String(500))
+    image_hash = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
 class Agency(Base):
     __tablename__ = "agencies"
     
@@ -36,24 +66,360 @@ class Agency(Base):
     email = Column(String(255))
     phone = Column(String(50))
     issue_types = Column(JSON)
+    routing_priority = Column(Integer, default=100)  # lower routes first
+    is_default = Column(Boolean, default=False)  # receives issue types nobody handles
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
 class Notification(Base):
+    """Outbox row: written with the issue, delivered later by agents.delivery workers"""
     __tablename__ = "notifications"
     
     id = Column(Integer, primary_key=True, index=True)
     issue_id = Column(Integer)
     agency_id = Column(Integer)
     message = Column(Text)
-    status = Column(String(50), default="sent")
+    status = Column(String(50), default="pending")  # pending | sending | sent | failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)  # not claimable before this
+    claimed_at = Column(DateTime, nullable=True)
+    claim_token = Column(String(32), nullable=True)
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_notifications_status_due", "status", "next_attempt_at"),
+    )
+
+class NotificationTemplate(Base):
+    """Message template overriding templates/notifications.json; NULL columns act as wildcards"""
+    __tablename__ = "notification_templates"
+    
+    id = Column(Integer, primary_key=True)
+    agency_name = Column(String(255), nullable=True)
+    issue_type = Column(String(100), nullable=True)
+    template = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("agency_name", "issue_type", name="uq_notification_templates_scope"),
+    )
+
+class DetectionCacheEntry(Base):
+    __tablename__ = "detection_cache"
+    
+    image_hash = Column(String(64), primary_key=True)
+    perceptual_hash = Column(String(16), nullable=True, index=True)
+    # 16-bit quarters of perceptual_hash: near-duplicate lookups only read rows sharing one
+    phash_band_0 = Column(String(4), nullable=True, index=True)
+    phash_band_1 = Column(String(4), nullable=True, index=True)
+    phash_band_2 = Column(String(4), nullable=True, index=True)
+    phash_band_3 = Column(String(4), nullable=True, index=True)
+    result = Column(JSON)
+    issue_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class ActionPlanCacheEntry(Base):
+    __tablename__ = "action_plan_cache"
+    
+    key = Column(String(64), primary_key=True)
+    issue_type = Column(String(100))
+    severity = Column(String(20))
+    tokens = Column(JSON)  # normalized description words
+    actions = Column(JSON)
+    total_tokens = Column(Integer, default=0)  # cost of the completion that produced it
+    generic = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_action_plan_cache_pair", "issue_type", "severity", "created_at"),
+    )
+
+class BatchJob(Base):
+    """A bulk import; its items live in ``batch_items``"""
+    __tablename__ = "batch_jobs"
+    
+    id = Column(String(32), primary_key=True)
+    source = Column(String(500))
+    status = Column(String(50), default="pending")  # pending | running | completed | interrupted
+    total_items = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BatchItem(Base):
+    """One image of a batch; its status is committed together with the issue it produced"""
+    __tablename__ = "batch_items"
+    
+    id = Column(Integer, primary_key=True)
+    batch_id = Column(String(32), nullable=False)
+    item_key = Column(String(500), nullable=False)  # path inside the archive / directory
+    image_path = Column(String(500), nullable=True)
+    image_hash = Column(String(64), nullable=True)
+    reporter_name = Column(String(255))
+    location = Column(String(500))
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    audio_text = Column(Text, nullable=True)
+    status = Column(String(50), default="pending")  # pending | done | no_issue | failed
+    issue_id = Column(Integer, nullable=True)
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("batch_id", "item_key", name="uq_batch_items_key"),
+        Index("ix_batch_items_batch_status", "batch_id", "status"),
+    )
+
+class IssueStat(Base):
+    """Running issue counts per (dimension, value), maintained on every write"""
+    __tablename__ = "issue_stats"
+    
+    dimension = Column(String(50), primary_key=True)
+    value = Column(String(255), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+# CivicIssue column -> issue_stats dimension
+STAT_DIMENSIONS = {
+    "status": "status",
+    "priority": "priority",
+    "issue_type": "issue_type",
+    "assigned_agency": "agency"
+}
+
+def _stat_value(value) -> str:
+    return "none" if value is None else str(value)
+
+def _bump_stats(connection, deltas):
+    """Apply ``{(dimension, value): delta}`` to issue_stats atomically"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = IssueStat.__table__
+    dialect = connection.dialect.name
+    for (dimension, value), delta in deltas.items():
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table).values(dimension=dimension, value=value, count=delta)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["dimension", "value"],
+                set_={"count": table.c.count + delta}
+            )
+            connection.execute(stmt)
+        else:
+            result = connection.execute(
+                table.update()
+                .where(table.c.dimension == dimension, table.c.value == value)
+                .values(count=table.c.count + delta)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(dimension=dimension, value=value, count=delta))
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+# Assigning to an expired instance would otherwise leave no "old value" in
+# the attribute history and the previous bucket would never be decremented.
+for _column in STAT_DIMENSIONS:
+    event.listen(getattr(CivicIssue, _column), "set", _load_previous_value, active_history=True, retval=True)
+
+@event.listens_for(CivicIssue, "after_insert")
+def _stats_after_insert(mapper, connection, target):
+    deltas = {}
+    for column, dimension in STAT_DIMENSIONS.items():
+        deltas[(dimension, _stat_value(getattr(target, column)))] = 1
+    _bump_stats(connection, deltas)
+
+@event.listens_for(CivicIssue, "after_update")
+def _stats_after_update(mapper, connection, target):
+    deltas = {}
+    state = inspect(target)
+    for column, dimension in STAT_DIMENSIONS.items():
+        history = state.attrs[column].history
+        if not history.has_changes():
+            continue
+        for old in history.deleted:
+            key = (dimension, _stat_value(old))
+            deltas[key] = deltas.get(key, 0) - 1
+        for new in history.added:
+            key = (dimension, _stat_value(new))
+            deltas[key] = deltas.get(key, 0) + 1
+    _bump_stats(connection, deltas)
+
+@event.listens_for(CivicIssue, "after_delete")
+def _stats_after_delete(mapper, connection, target):
+    deltas = {}
+    for column, dimension in STAT_DIMENSIONS.items():
+        deltas[(dimension, _stat_value(getattr(target, column)))] = -1
+    _bump_stats(connection, deltas)
+
+class IssueGridCount(Base):
+    """Issues per (geohash cell, issue_type, day) at several cell sizes, maintained on every write.
+
+    Map tiles sum these rows instead of the issues themselves, so a tile
+    costs the same however many issues fall inside it.
+    """
+    __tablename__ = "issue_grid_counts"
+    
+    precision = Column(Integer, primary_key=True)  # geohash length of ``cell``
+    cell = Column(String(12), primary_key=True)
+    issue_type = Column(String(100), primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# One grid per precision: 3 (~156 km cells) for country views .. 7 (~150 m) for streets
+GRID_PRECISIONS = (3, 4, 5, 6, 7)
+
+# ``day`` of the running all-time total kept next to the daily counts, so
+# tiles without a date range read one row per cell and type
+ALL_DAYS = date(1970, 1, 1)
+
+# Rows that are not issues of their own on the map
+GRID_EXCLUDED_STATUSES = ("duplicate", "no_issue")
+
+def _grid_key(issue_type, geohash, status, created_at):
+    """(issue_type, geohash, day) bucket an issue is counted in, or None"""
+    if not issue_type or not geohash or status in GRID_EXCLUDED_STATUSES:
+        return None
+    return issue_type, geohash, (created_at or datetime.utcnow()).date()
+
+def _bump_grid(connection, deltas):
+    """Apply ``{(issue_type, geohash, day): delta}`` to every grid precision"""
+    table = IssueGridCount.__table__
+    dialect = connection.dialect.name
+    now = datetime.utcnow()
+    for (issue_type, geohash, day), delta in deltas.items():
+        if not delta:
+            continue
+        for precision, bucket in itertools.product(GRID_PRECISIONS, (day, ALL_DAYS)):
+            key = {"precision": precision, "cell": geohash[:precision], "issue_type": issue_type, "day": bucket}
+            if dialect in ("postgresql", "sqlite"):
+                if dialect == "postgresql":
+                    from sqlalchemy.dialects.postgresql import insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert
+                stmt = insert(table).values(**key, count=delta, updated_at=now)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=list(key),
+                    set_={"count": table.c.count + delta, "updated_at": now}
+                )
+                connection.execute(stmt)
+            else:
+                result = connection.execute(
+                    table.update()
+                    .where(*[table.c[name] == value for name, value in key.items()])
+                    .values(count=table.c.count + delta, updated_at=now)
+                )
+                if result.rowcount == 0:
+                    connection.execute(table.insert().values(**key, count=delta, updated_at=now))
+
+GRID_COLUMNS = ("issue_type", "geohash", "status", "created_at")
+
+for _column in ("geohash", "created_at"):
+    event.listen(getattr(CivicIssue, _column), "set", _load_previous_value, active_history=True, retval=True)
+
+@event.listens_for(CivicIssue, "after_insert")
+def _grid_after_insert(mapper, connection, target):
+    key = _grid_key(*[getattr(target, column) for column in GRID_COLUMNS])
+    if key:
+        _bump_grid(connection, {key: 1})
+
+@event.listens_for(CivicIssue, "after_update")
+def _grid_after_update(mapper, connection, target):
+    state = inspect(target)
+    histories = [state.attrs[column].history for column in GRID_COLUMNS]
+    if not any(history.has_changes() for history in histories):
+        return
+    old_values, new_values = [], []
+    for column, history in zip(GRID_COLUMNS, histories):
+        new_values.append(getattr(target, column))
+        if history.deleted:
+            old_values.append(history.deleted[0])
+        elif history.unchanged:
+            old_values.append(history.unchanged[0])
+        else:
+            # Assigned without a previous value loaded: the row had none
+            old_values.append(None if history.added else new_values[-1])
+    old_key, new_key = _grid_key(*old_values), _grid_key(*new_values)
+    if old_key != new_key:
+        deltas = {}
+        if old_key:
+            deltas[old_key] = -1
+        if new_key:
+            deltas[new_key] = deltas.get(new_key, 0) + 1
+        _bump_grid(connection, deltas)
+
+@event.listens_for(CivicIssue, "after_delete")
+def _grid_after_delete(mapper, connection, target):
+    key = _grid_key(*[getattr(target, column) for column in GRID_COLUMNS])
+    if key:
+        _bump_grid(connection, {key: -1})
+
+@event.listens_for(CivicIssue, "before_insert")
+@event.listens_for(CivicIssue, "before_update")
+def _set_geohash(mapper, connection, target):
+    from utils.geo import GEOHASH_PRECISION, encode
+    from utils.validators import validate_coordinates
+    lat, lon = target.latitude, target.longitude
+    if lat is None or lon is None or not validate_coordinates(lat, lon):
+        target.geohash = None
+    else:
+        target.geohash = encode(lat, lon, GEOHASH_PRECISION)
 
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL", "") ## can provide the url directly 
-engine = create_engine(DATABASE_URL)
+
+def engine_options(url: str) -> dict:
+    """Connection pool settings from DB_POOL_* env vars"""
+    options = {"pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"}
+    if url.startswith("sqlite"):
+        # SQLite connections are shared with the agent worker threads
+        options["connect_args"] = {"check_same_thread": False}
+        return options
+    options.update(
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    )
+    return options
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement and statement.strip() else ""
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+def instrument_engine(engine):
+    """Time every SQL statement of ``engine`` into the civic_db_* metrics"""
+    from utils import metrics
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_started")
+        if started:
+            metrics.DB_QUERY_LATENCY.labels(_operation(statement)).observe(time.perf_counter() - started.pop())
+    
+    @event.listens_for(engine, "handle_error")
+    def _query_failed(context):
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
+        metrics.DB_ERRORS.labels(_operation(context.statement)).inc()
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def init_db():
+    from database.migrations import run_migrations
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     
 def get_db():
     db = SessionLocal()
@@ -1,4 +1,7 @@
-from models import Agency, SessionLocal, init_db
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import Agency, SessionLocal, init_db
 
 def seed_agencies():
     db = SessionLocal()
@@ -30,7 +33,17 @@ def seed_agencies():
             "department": "Law Enforcement",
             "email": "police@municipality.gov",
             "phone": "100",
-            "issue_types": ["criminal_activity", "violence", "suspicious_activity"]
+            "issue_types": ["criminal_activity", "violence", "suspicious_activity", "accident"],
+            "routing_priority": 10
+        },
+        {
+            "name": "Municipal Control Room",
+            "department": "Emergency Coordination",
+            "email": "control@municipality.gov",
+            "phone": "+91-141-2345600",
+            "issue_types": ["accident"],
+            "routing_priority": 50,
+            "is_default": True
         }
     ]
     
@@ -0,0 +1,191 @@
+import heapq
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+
+from database.models import CivicIssue
+from database.queries import DEFAULT_LIST_FIELDS, FILTERABLE_FIELDS, MAX_PAGE_SIZE, InvalidQueryError
+from utils.geo import (
+    GEOHASH_END, GEOHASH_PRECISION, BBox, covering_cells, encode, haversine_m, radius_bbox, split_antimeridian
+)
+from utils.validators import validate_coordinates
+
+MAX_RADIUS_M = 50_000
+
+# More cells means a tighter cover but a longer OR of index range scans
+MAX_COVER_CELLS = 16
+
+
+def _check(lat: float, lon: float):
+    if lat is None or lon is None or not validate_coordinates(lat, lon):
+        raise InvalidQueryError(f"Invalid coordinates: {lat}, {lon}")
+
+
+def _candidates(db: Session, bbox: BBox, filters: Optional[Dict[str, Any]], *columns, criteria=()):
+    """``columns`` of the issues inside ``bbox`` (and matching any extra SQL ``criteria``).
+
+    The geohash cells covering the box become index range scans; the
+    coordinates and sort keys are read from the same covering index, so
+    unfiltered queries never touch the table itself.
+    """
+    query = db.query(*columns)
+
+    cells = covering_cells(bbox, max_cells=MAX_COVER_CELLS)
+    query = query.filter(or_(*[
+        and_(CivicIssue.geohash >= cell, CivicIssue.geohash < cell + GEOHASH_END) for cell in cells
+    ]))
+    query = query.filter(or_(*[
+        and_(
+            CivicIssue.latitude.between(min_lat, max_lat),
+            CivicIssue.longitude.between(min_lon, max_lon)
+        )
+        for min_lat, min_lon, max_lat, max_lon in split_antimeridian(bbox)
+    ]))
+
+    for name, value in (filters or {}).items():
+        if name not in FILTERABLE_FIELDS:
+            raise InvalidQueryError(f"Cannot filter on {name}")
+        if value is not None:
+            query = query.filter(getattr(CivicIssue, name) == value)
+    if criteria:
+        query = query.filter(*criteria)
+    return query.all()
+
+
+def _fetch(db: Session, ids: List[int], fields: Sequence[str]) -> Dict[int, Dict[str, Any]]:
+    """Requested columns of the final page, by primary key"""
+    if not ids:
+        return {}
+    selected = list(dict.fromkeys(list(fields) + ["id"]))
+    rows = db.query(*[getattr(CivicIssue, name) for name in selected]).filter(CivicIssue.id.in_(ids)).all()
+    return {row.id: {name: getattr(row, name) for name in fields} for row in rows}
+
+
+def nearby_issues(
+    db: Session,
+    lat: float,
+    lon: float,
+    radius_m: float,
+    limit: int = 50,
+    filters: Optional[Dict[str, Any]] = None,
+    fields: Sequence[str] = None
+) -> Dict[str, Any]:
+    """Issues within ``radius_m`` meters of a point, closest first.
+
+    The circle's bounding box is covered by a handful of geohash cells,
+    each an index range scan on ``ix_civic_issues_geohash``; only the
+    candidates in those cells are measured with the haversine formula,
+    and only the returned page is read from the table.
+    """
+    _check(lat, lon)
+    if not 0 < radius_m <= MAX_RADIUS_M:
+        raise InvalidQueryError(f"radius_m must be between 0 and {MAX_RADIUS_M}")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidQueryError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    hits = []
+    candidates = _candidates(
+        db, radius_bbox(lat, lon, radius_m), filters, CivicIssue.id, CivicIssue.latitude, CivicIssue.longitude
+    )
+    for row in candidates:
+        distance = haversine_m(lat, lon, row.latitude, row.longitude)
+        if distance <= radius_m:
+            hits.append((distance, row.id))
+    page = heapq.nsmallest(limit, hits)
+
+    rows = _fetch(db, [issue_id for _, issue_id in page], list(fields or DEFAULT_LIST_FIELDS))
+    issues = [{**rows[issue_id], "distance_m": round(distance, 1)} for distance, issue_id in page if issue_id in rows]
+    return {"issues": issues, "total": len(hits), "limit": limit}
+
+
+def issues_in_bbox(
+    db: Session,
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    limit: int = 50,
+    filters: Optional[Dict[str, Any]] = None,
+    fields: Sequence[str] = None
+) -> Dict[str, Any]:
+    """Newest issues inside a bounding box (``min_lon > max_lon`` crosses the antimeridian)"""
+    _check(min_lat, min_lon)
+    _check(max_lat, max_lon)
+    if min_lat > max_lat:
+        raise InvalidQueryError("min_lat must not be greater than max_lat")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidQueryError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    candidates = _candidates(db, (min_lat, min_lon, max_lat, max_lon), filters, CivicIssue.id, CivicIssue.created_at)
+    page = heapq.nlargest(limit, ((row.created_at or datetime.min, row.id) for row in candidates))
+
+    rows = _fetch(db, [issue_id for _, issue_id in page], list(fields or DEFAULT_LIST_FIELDS))
+    return {
+        "issues": [rows[issue_id] for _, issue_id in page if issue_id in rows],
+        "truncated": len(candidates) > limit,
+        "limit": limit
+    }
+
+
+def open_incidents_near(
+    db: Session,
+    lat: float,
+    lon: float,
+    radius_m: float,
+    issue_type: str,
+    statuses: Sequence[str],
+    since: datetime = None,
+    exclude_id: int = None
+) -> List[Dict[str, Any]]:
+    """Root issues (not themselves duplicates) of ``issue_type`` near a point, closest first"""
+    _check(lat, lon)
+    criteria = [CivicIssue.status.in_(list(statuses)), CivicIssue.duplicate_of.is_(None)]
+    if since is not None:
+        criteria.append(CivicIssue.created_at >= since)
+    if exclude_id is not None:
+        criteria.append(CivicIssue.id != exclude_id)
+    candidates = _candidates(
+        db, radius_bbox(lat, lon, radius_m), {"issue_type": issue_type},
+        CivicIssue.id, CivicIssue.latitude, CivicIssue.longitude, CivicIssue.created_at,
+        criteria=criteria
+    )
+    matches = []
+    for row in candidates:
+        distance = haversine_m(lat, lon, row.latitude, row.longitude)
+        if distance <= radius_m:
+            matches.append({"id": row.id, "distance_m": round(distance, 1), "created_at": row.created_at})
+    matches.sort(key=lambda match: (match["distance_m"], match["id"]))
+    return matches
+
+
+def backfill_geohashes(db: Session, batch_size: int = 5000) -> int:
+    """Fill ``geohash`` for issues written before the column existed (or by bulk SQL)"""
+    filled, last_id = 0, 0
+    while True:
+        rows = (
+            db.query(CivicIssue.id, CivicIssue.latitude, CivicIssue.longitude, CivicIssue.updated_at)
+            .filter(
+                CivicIssue.id > last_id,
+                CivicIssue.geohash.is_(None),
+                CivicIssue.latitude.isnot(None),
+                CivicIssue.longitude.isnot(None)
+            )
+            .order_by(CivicIssue.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return filled
+        last_id = rows[-1].id
+        # updated_at is passed through so the backfill doesn't look like an edit
+        updates: List[Dict[str, Any]] = [
+            {"id": row.id, "geohash": encode(row.latitude, row.longitude, GEOHASH_PRECISION),
+             "updated_at": row.updated_at}
+            for row in rows if validate_coordinates(row.latitude, row.longitude)
+        ]
+        if updates:
+            db.execute(update(CivicIssue), updates)
+            db.commit()
+            filled += len(updates)
@@ -0,0 +1,43 @@
+from typing import Any, Dict
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database.models import CivicIssue, IssueStat, STAT_DIMENSIONS, _stat_value
+
+
+def read_issue_stats(db: Session) -> Dict[str, Any]:
+    """Dashboard counts from the issue_stats summary table (size independent of issue count).
+
+    Every issue sits in exactly one status bucket, so the total is the sum
+    of the status rows; there is no separate total row for every write to
+    contend on.
+    """
+    stats = {"total": 0, **{f"by_{dimension}": {} for dimension in STAT_DIMENSIONS.values()}}
+    for row in db.query(IssueStat).filter(IssueStat.dimension.in_(STAT_DIMENSIONS.values())):
+        if row.count:
+            stats[f"by_{row.dimension}"][row.value] = row.count
+    stats["total"] = sum(stats["by_status"].values())
+    return stats
+
+
+def stats_is_empty(db: Session) -> bool:
+    return db.query(IssueStat.dimension).first() is None
+
+
+def rebuild_issue_stats(db: Session):
+    """Recompute issue_stats from scratch with GROUP BY queries.
+
+    The summary is kept current by the ORM write hooks on CivicIssue; this
+    repairs drift from bulk SQL that bypasses them (imports, manual fixes).
+    Startup only runs it on an empty table or with ``ISSUE_STATS_REBUILD=true``.
+    """
+    rows = []
+    for column, dimension in STAT_DIMENSIONS.items():
+        attr = getattr(CivicIssue, column)
+        for value, count in db.query(attr, func.count(CivicIssue.id)).group_by(attr).all():
+            rows.append(IssueStat(dimension=dimension, value=_stat_value(value), count=count))
+
+    db.query(IssueStat).delete()
+    db.add_all(rows)
+    db.commit()
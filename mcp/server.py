@@ -1,9 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import Dict, Any
+import os
+import sys
 import uvicorn
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import metrics
 
 app = FastAPI(title="MCP Server - Model Context Protocol")
+metrics.instrument_app(app, "mcp")
 
 class MCPRequest(BaseModel):
     context_type: str
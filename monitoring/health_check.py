@@ -1,12 +1,31 @@
 """
 Health monitoring script for all services
 Run as cron job: */5 * * * * /path/to/health_check.py
+
+Besides the up/down probe, the API's /metrics scrape is checked against
+service level objectives. Counters are compared with the previous run's
+scrape (saved in HEALTH_STATE_FILE), so each check covers the interval
+since the last one:
+
+- http_error_ratio: share of API responses that were 5xx
+- report_p95_seconds: p95 latency of POST /api/report-issue
+- llm_error_ratio: share of LLM attempts that failed, were throttled or short-circuited
+- fallback_ratio: canned fallback results per detection run
+- llm_circuit_open: the LLM circuit breaker is open right now
+
+Ratios are only judged once SLO_MIN_REQUESTS requests were seen.
 """
 
+import json
+import math
+import os
+import sys
 import requests
 import smtplib
 from email.mime.text import MIMEText
 from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.metrics import parse_metrics
 
 SERVICES = {
     "MCP Server": "http://localhost:8001/mcp/health",
@@ -14,6 +33,18 @@ SERVICES = {
     "Streamlit": "http://localhost:8501"
 }
 
+METRICS_URL = os.getenv("HEALTH_METRICS_URL", "http://localhost:8000/metrics")
+STATE_FILE = os.getenv("HEALTH_STATE_FILE", "logs/health_state.json")
+
+SLOS = {
+    "http_error_ratio": float(os.getenv("SLO_ERROR_RATIO", "0.01")),
+    "report_p95_seconds": float(os.getenv("SLO_REPORT_P95_SECONDS", "15")),
+    "llm_error_ratio": float(os.getenv("SLO_LLM_ERROR_RATIO", "0.05")),
+    "fallback_ratio": float(os.getenv("SLO_FALLBACK_RATIO", "0.05")),
+    "llm_circuit_open": 0
+}
+MIN_REQUESTS = int(os.getenv("SLO_MIN_REQUESTS", "20"))
+
 ALERT_EMAIL = "admin@example.com"
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
@@ -27,12 +58,13 @@ def check_service(name, url):
     except:
         return False
 
-def send_alert(service_name):
-    msg = MIMEText(f"ALERT: {service_name} is down!\nTime: {datetime.now()}")
-    msg['Subject'] = f'Service Down: {service_name}'
+def send_alert(service_name, details=None):
+    body = details or f"ALERT: {service_name} is down!"
+    msg = MIMEText(f"{body}\nTime: {datetime.now()}")
+    msg['Subject'] = f'Service Down: {service_name}' if details is None else f'SLO breach: {service_name}'
     msg['From'] = SMTP_USER
     msg['To'] = ALERT_EMAIL
-    
+
     try:
         with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
             server.starttls()
@@ -41,6 +73,117 @@ def send_alert(service_name):
     except Exception as e:
         print(f"Failed to send alert: {e}")
 
+def _series(samples, name, **labels):
+    """``{label tuple: value}`` of the samples of ``name`` matching ``labels``"""
+    series = {}
+    for sample_labels, value in samples.get(name, []):
+        if all(sample_labels.get(key) == wanted for key, wanted in labels.items()):
+            series[tuple(sorted(sample_labels.items()))] = value
+    return series
+
+def _delta(current, previous, name, **labels):
+    """Increase of a counter since the previous scrape (a restart starts from zero)"""
+    now = _series(current, name, **labels)
+    before = _series(previous, name, **labels) if previous else {}
+    total = 0.0
+    for key, value in now.items():
+        old = before.get(key, 0.0)
+        total += value - old if value >= old else value
+    return total
+
+def histogram_quantile(quantile, buckets):
+    """Prometheus-style quantile from ``[(upper bound, cumulative count), ...]``"""
+    buckets = sorted(buckets)
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+    rank = quantile * buckets[-1][1]
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if math.isinf(bound):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return buckets[-1][0]
+
+def _quantile_delta(current, previous, quantile, name, **labels):
+    counts = {}
+    for bucket_name, source, sign in ((name, current, 1), (name, previous or {}, -1)):
+        for sample_labels, value in source.get(f"{bucket_name}_bucket", []):
+            if all(sample_labels.get(key) == wanted for key, wanted in labels.items()):
+                bound = float(sample_labels["le"])
+                counts[bound] = counts.get(bound, 0.0) + sign * value
+    if any(count < 0 for count in counts.values()):
+        # Restarted since the last scrape: use this process's totals only
+        return _quantile_delta(current, None, quantile, name, **labels)
+    return histogram_quantile(quantile, list(counts.items()))
+
+def evaluate_slos(current, previous=None):
+    """``{slo: (value or None, objective, ok)}`` over the interval between two scrapes"""
+    results = {}
+
+    requests_seen = _delta(current, previous, "civic_http_requests_total", service="api")
+    errors = sum(
+        _delta(current, previous, "civic_http_requests_total", service="api", status=str(status))
+        for status in range(500, 600)
+    )
+    results["http_error_ratio"] = errors / requests_seen if requests_seen >= MIN_REQUESTS else None
+    results["report_p95_seconds"] = _quantile_delta(
+        current, previous, 0.95, "civic_http_request_duration_seconds",
+        service="api", method="POST", route="/api/report-issue"
+    )
+
+    attempts = _delta(current, previous, "civic_llm_requests_total")
+    failed = attempts - _delta(current, previous, "civic_llm_requests_total", outcome="ok")
+    results["llm_error_ratio"] = failed / attempts if attempts >= MIN_REQUESTS else None
+
+    detections = _delta(current, previous, "civic_node_duration_seconds_count", node="detect_issue")
+    fallbacks = _delta(current, previous, "civic_fallbacks_total")
+    results["fallback_ratio"] = fallbacks / detections if detections >= MIN_REQUESTS else None
+
+    circuit = _series(current, "civic_llm_circuit_open")
+    results["llm_circuit_open"] = max(circuit.values()) if circuit else None
+
+    return {
+        name: (value, SLOS[name], value is None or value <= SLOS[name])
+        for name, value in results.items()
+    }
+
+def check_slos():
+    """Scrape the API metrics, compare with the last scrape and alert on breached objectives"""
+    try:
+        response = requests.get(METRICS_URL, timeout=10)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"❌ Could not scrape {METRICS_URL}: {e}")
+        return False
+    current = parse_metrics(response.text)
+
+    previous = None
+    if os.path.exists(STATE_FILE):
+        try:
+            with open(STATE_FILE) as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = None
+    os.makedirs(os.path.dirname(STATE_FILE) or ".", exist_ok=True)
+    with open(STATE_FILE, "w") as f:
+        json.dump(current, f)
+
+    healthy = True
+    breaches = []
+    for name, (value, objective, ok) in evaluate_slos(current, previous).items():
+        shown = "n/a" if value is None else f"{value:.3f}"
+        print(f"{'✅' if ok else '❌'} SLO {name}: {shown} (objective <= {objective})")
+        if not ok:
+            healthy = False
+            breaches.append(f"{name} = {shown}, objective <= {objective}")
+    if breaches:
+        send_alert("FastAPI", "SLO breach:\n" + "\n".join(breaches))
+    return healthy
+
 def main():
     for service_name, url in SERVICES.items():
         if not check_service(service_name, url):
@@ -48,6 +191,7 @@ def main():
             send_alert(service_name)
         else:
             print(f"✅ {service_name} is UP")
+    check_slos()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,95 @@
+"""
+Bulk-import images from a directory or zip archive.
+
+Each image goes through the full agent workflow (detection, action plan,
+agency notification) with bounded concurrency, rate limiting and retries.
+One NDJSON result per image is written to stdout (or ``--output``) as soon
+as it is committed to the database.
+
+    python scripts/batch_import.py field_sweep/ --manifest field_sweep.csv
+    python scripts/batch_import.py drone.zip --reporter "Drone team" --rate 30
+    python scripts/batch_import.py --resume <batch_id> --retry-failed
+
+The manifest (CSV with a header row, or JSONL) has one row per image with a
+``filename`` column plus any of reporter_name, location, latitude,
+longitude and audio_text. A ``manifest.csv`` / ``manifest.jsonl`` at the root
+of the source is picked up automatically. If the import stops part-way,
+re-run it with ``--resume`` and the batch id printed on the first line.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import SessionLocal, init_db
+from agents.batch import BatchProcessor, BatchSource, ManifestError, create_batch
+from agents.orchestrator import CivicAgentOrchestrator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", help="Directory or zip archive of images")
+    parser.add_argument("--manifest", help="CSV or JSONL manifest")
+    parser.add_argument("--reporter", default="Batch import", help="Reporter for images the manifest doesn't cover")
+    parser.add_argument("--location", default="", help="Location for images the manifest doesn't cover")
+    parser.add_argument("--resume", metavar="BATCH_ID", help="Continue an interrupted batch")
+    parser.add_argument("--retry-failed", action="store_true", help="With --resume, also retry failed items")
+    parser.add_argument("--concurrency", type=int, help="Images processed at once (BATCH_CONCURRENCY)")
+    parser.add_argument("--rate", type=float, help="Images started per minute (BATCH_RATE_PER_MINUTE)")
+    parser.add_argument("--retries", type=int, help="Retries per image (BATCH_MAX_RETRIES)")
+    parser.add_argument("--output", help="Write NDJSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    if not args.source and not args.resume:
+        parser.error("a source or --resume BATCH_ID is required")
+
+    init_db()
+    upload_dir = Path(os.getenv("UPLOAD_DIR", "uploads"))
+    out = open(args.output, "a") if args.output else sys.stdout
+
+    # The agents print as they go; keep stdout for the NDJSON results
+    with contextlib.redirect_stdout(sys.stderr):
+        batch_id = args.resume
+        if batch_id is None:
+            manifest = None
+            if args.manifest:
+                manifest = (args.manifest, Path(args.manifest).read_bytes())
+            db = SessionLocal()
+            source = BatchSource(args.source)
+            try:
+                batch_id = create_batch(
+                    db,
+                    source,
+                    upload_dir,
+                    int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024))),
+                    int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000))),
+                    manifest=manifest,
+                    defaults={"reporter_name": args.reporter, "location": args.location},
+                    label=str(args.source)
+                )
+            except ManifestError as e:
+                sys.exit(f"Invalid batch: {e}")
+            finally:
+                source.close()
+                db.close()
+
+        processor = BatchProcessor(
+            CivicAgentOrchestrator(),
+            concurrency=args.concurrency,
+            rate_per_minute=args.rate,
+            max_retries=args.retries
+        )
+        for record in processor.run(batch_id, retry_failed=args.retry_failed):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+    if out is not sys.stdout:
+        out.close()
+
+
+if __name__ == "__main__":
+    main()
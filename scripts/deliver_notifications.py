@@ -0,0 +1,53 @@
+"""
+Run notification delivery workers outside the API process.
+
+Claims ``pending`` rows from the notifications outbox and delivers them
+with the configured transport until interrupted. Any number of these can
+run next to each other and next to API workers: rows are claimed with
+``SELECT ... FOR UPDATE SKIP LOCKED`` so each one is sent once.
+
+    NOTIFICATION_TRANSPORT=smtp SMTP_HOST=mail.internal python scripts/deliver_notifications.py
+    python scripts/deliver_notifications.py --workers 4 --once
+
+Start the API with ``NOTIFICATION_WORKERS=0`` when delivery runs here only.
+"""
+
+import argparse
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.models import init_db
+from agents.delivery import OutboxDispatcher, build_transport
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("NOTIFICATION_WORKERS", "2")) or 1)
+    parser.add_argument("--transport", help="Overrides NOTIFICATION_TRANSPORT")
+    parser.add_argument("--once", action="store_true", help="Deliver everything due, then exit")
+    args = parser.parse_args()
+
+    init_db()
+    dispatcher = OutboxDispatcher(transport=build_transport(args.transport), workers=args.workers)
+    if args.once:
+        total = 0
+        while True:
+            processed = dispatcher.dispatch_once()
+            if not processed:
+                break
+            total += processed
+        print(f"Processed {total} notifications")
+        return
+
+    dispatcher.start()
+    print(f"Delivering notifications with {args.workers} workers (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        dispatcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,11 @@ import requests
 from PIL import Image
 import io
 import json
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import pandas as pd
+import pydeck as pdk
 from dotenv import load_dotenv
+from utils.geo import lat_lon_to_tile
 load_dotenv()
 
 st.set_page_config(page_title="Civic Issue Reporter", page_icon="🏙️", layout="wide")
@@ -14,26 +17,46 @@ API_URL = "http://localhost:8000"
 st.title("🏙️ Civic Issue Detection & Reporting System")
 st.markdown("---")
 
+@st.cache_data(ttl=10, show_spinner=False)
+def fetch_stats():
+    response = requests.get(f"{API_URL}/api/stats", timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=10, show_spinner=False)
+def fetch_recent_issues(limit=10):
+    response = requests.get(f"{API_URL}/api/issues", params={"limit": limit}, timeout=5)
+    response.raise_for_status()
+    return response.json()["issues"]
+
+ISSUE_TYPES = ["pothole", "garbage", "water_leak", "dirt_on_road", "criminal_activity", "accident"]
+
+def fetch_tile(z, x, y, params):
+    """A heatmap tile, revalidated with its ETag so unchanged tiles come back as empty 304s"""
+    tiles = st.session_state.setdefault("tiles", {})
+    key = (z, x, y, tuple(sorted(params.items())))
+    headers = {"If-None-Match": tiles[key][0]} if key in tiles else {}
+    response = requests.get(f"{API_URL}/api/tiles/{z}/{x}/{y}", params=params, headers=headers, timeout=5)
+    if response.status_code == 304:
+        return tiles[key][1]
+    response.raise_for_status()
+    tiles[key] = (response.headers.get("ETag"), response.json())
+    return tiles[key][1]
+
 # Sidebar
 with st.sidebar:
     st.header("📊 Dashboard")
     
     try:
-        response = requests.get(f"{API_URL}/api/issues")
-        if response.status_code == 200:
-            issues = response.json()["issues"]
-            st.metric("Total Reports", len(issues))
-            
-            pending = len([i for i in issues if i["status"] == "reported"])
-            st.metric("Pending Issues", pending)
-            
-            high_priority = len([i for i in issues if i["priority"] == "high"])
-            st.metric("High Priority", high_priority)
+        stats = fetch_stats()
+        st.metric("Total Reports", stats["total"])
+        st.metric("Pending Issues", stats["by_status"].get("reported", 0))
+        st.metric("High Priority", stats["by_priority"].get("high", 0))
     except:
         st.warning("API not connected")
 
 # Main content
-tab1, tab2 = st.tabs(["📝 Report Issue", "📋 View Reports"])
+tab1, tab2, tab3 = st.tabs(["📝 Report Issue", "📋 View Reports", "🗺️ Heatmap"])
 
 with tab1:
     st.header("Report a Civic Issue")
@@ -57,24 +80,24 @@ with tab1:
         )
     
     with col2:
-        uploaded_file = st.file_uploader(
-            "Upload Image *",
+        uploaded_files = st.file_uploader(
+            "Upload Images *",
             type=["jpg", "jpeg", "png"],
-            help="Upload a clear image of the civic issue"
+            accept_multiple_files=True,
+            help="Upload one or more clear images of the same civic issue"
         )
         
-        if uploaded_file:
+        for uploaded_file in uploaded_files or []:
             image = Image.open(uploaded_file)
-            st.image(image, caption="Uploaded Image", use_column_width=True)
+            st.image(image, caption=uploaded_file.name, use_column_width=True)
     
     st.markdown("---")
     
     if st.button("🚀 Submit Report", type="primary", use_container_width=True):
-        if not reporter_name or not location or not uploaded_file:
+        if not reporter_name or not location or not uploaded_files:
             st.error("Please fill in all required fields (*)")
         else:
             with st.spinner("🔍 Analyzing image and detecting issues..."):
-                files = {"image": uploaded_file.getvalue()}
                 data = {
                     "reporter_name": reporter_name,
                     "location": location,
@@ -86,7 +109,10 @@ with tab1:
                 try:
                     response = requests.post(
                         f"{API_URL}/api/report-issue",
-                        files={"image": ("image.jpg", uploaded_file.getvalue(), "image/jpeg")},
+                        files=[
+                            ("image", (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type or "image/jpeg"))
+                            for uploaded_file in uploaded_files
+                        ],
                         data=data
                     )
                     
@@ -136,6 +162,8 @@ with tab1:
                             if result.get('agency_notified'):
                                 st.success(f"🔔 Notification sent to: **{result['agency_notified']}**")
                             
+                            fetch_stats.clear()
+                            fetch_recent_issues.clear()
                             st.balloons()
                     else:
                         st.error(f"Error: {response.text}")
@@ -149,31 +177,81 @@ with tab2:
     st.header("Recent Reports")
     
     try:
-        response = requests.get(f"{API_URL}/api/issues")
-        if response.status_code == 200:
-            issues = response.json()["issues"]
-            
-            if not issues:
-                st.info("No issues reported yet.")
-            else:
-                for issue in issues[:10]:  # Show latest 10
-                    with st.expander(f"#{issue['id']} - {issue['issue_type'].replace('_', ' ').title()} | {issue['location']}"):
-                        col1, col2, col3 = st.columns(3)
-                        
-                        with col1:
-                            st.write(f"**Reporter:** {issue['reporter_name']}")
-                            st.write(f"**Status:** {issue['status'].title()}")
-                        with col2:
-                            st.write(f"**Priority:** {issue['priority'].title()}")
-                            st.write(f"**Agency:** {issue['assigned_agency'] or 'N/A'}")
-                        with col3:
-                            created = datetime.fromisoformat(issue['created_at'].replace('Z', '+00:00'))
-                            st.write(f"**Reported:** {created.strftime('%Y-%m-%d %H:%M')}")
-                        
-                        st.write(f"**Description:** {issue['description']}")
+        issues = fetch_recent_issues()
+        
+        if not issues:
+            st.info("No issues reported yet.")
+        else:
+            for issue in issues:  # Latest 10
+                with st.expander(f"#{issue['id']} - {(issue['issue_type'] or issue['status']).replace('_', ' ').title()} | {issue['location']}"):
+                    col1, col2, col3 = st.columns(3)
+                    
+                    with col1:
+                        st.write(f"**Reporter:** {issue['reporter_name']}")
+                        st.write(f"**Status:** {issue['status'].title()}")
+                    with col2:
+                        st.write(f"**Priority:** {issue['priority'].title()}")
+                        st.write(f"**Agency:** {issue['assigned_agency'] or 'N/A'}")
+                    with col3:
+                        created = datetime.fromisoformat(issue['created_at'].replace('Z', '+00:00'))
+                        st.write(f"**Reported:** {created.strftime('%Y-%m-%d %H:%M')}")
+                    
+                    st.write(f"**Description:** {issue['description']}")
     except:
         st.error("Failed to load reports. Please check API connection.")
 
+with tab3:
+    st.header("Issue Heatmap")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        map_lat = st.number_input("Center latitude", value=26.9124, format="%.4f")
+    with col2:
+        map_lon = st.number_input("Center longitude", value=75.7873, format="%.4f")
+    with col3:
+        map_type = st.selectbox("Issue type", ["All"] + ISSUE_TYPES,
+                                format_func=lambda value: value.replace("_", " ").title())
+    with col4:
+        map_days = st.selectbox("Period", [7, 30, 90, 0], index=1,
+                                format_func=lambda days: f"Last {days} days" if days else "All time")
+    zoom = st.slider("Zoom", min_value=8, max_value=16, value=12)
+    
+    params = {}
+    if map_type != "All":
+        params["issue_type"] = map_type
+    if map_days:
+        params["since"] = (date.today() - timedelta(days=map_days)).isoformat()
+    
+    try:
+        # The tile under the center and its eight neighbours
+        center_x, center_y = lat_lon_to_tile(map_lat, map_lon, zoom)
+        cells = []
+        for x in range(center_x - 1, center_x + 2):
+            for y in range(center_y - 1, center_y + 2):
+                if 0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom:
+                    cells.extend(fetch_tile(zoom, x, y, params)["cells"])
+        
+        if not cells:
+            st.info("No issues reported in this area yet.")
+        else:
+            frame = pd.DataFrame(cells)[["lat", "lon", "count"]]
+            st.pydeck_chart(pdk.Deck(
+                map_style=None,
+                initial_view_state=pdk.ViewState(latitude=map_lat, longitude=map_lon, zoom=zoom),
+                layers=[pdk.Layer(
+                    "HeatmapLayer",
+                    data=frame,
+                    get_position=["lon", "lat"],
+                    get_weight="count",
+                    radius_pixels=40
+                )]
+            ))
+            st.caption(f"{int(frame['count'].sum())} issues in {len(cells)} grid cells")
+    except requests.exceptions.ConnectionError:
+        st.error("❌ Cannot connect to API server. Please ensure the FastAPI server is running.")
+    except Exception as e:
+        st.error(f"❌ Failed to load the heatmap: {str(e)}")
+
 # Footer
 st.markdown("---")
 st.markdown("""
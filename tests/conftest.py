@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The models module builds its engine at import time, so point it at a
+# throwaway SQLite database (and upload dir) before any test module imports it.
+TEST_DIR = tempfile.mkdtemp(prefix='civic-tests-')
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(TEST_DIR, "uploads"))
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import pytest
+
+from benchmarks.fake_groq import FakeGroq, FakeGroqServer
+
+# Agents that are not given a FakeGroq talk to a local fake endpoint, never the real service
+FAKE_GROQ = FakeGroqServer(seed=0)
+os.environ.setdefault("GROQ_BASE_URL", FAKE_GROQ.base_url)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_schema():
+    """Create the tables once for the throwaway test database"""
+    from database.models import init_db
+    init_db()
+
+
+@pytest.fixture
+def fake_groq(monkeypatch):
+    """Swap the Groq client of the API's orchestrator agents for an in-process FakeGroq"""
+    from app.main import orchestrator
+
+    from agents.action_cache import ActionPlanCache, InMemoryActionBackend
+    from agents.detection_cache import DetectionCache, InMemoryDetectionBackend
+
+    fake = FakeGroq()
+    for agent in (orchestrator.detector, orchestrator.planner, orchestrator.notifier):
+        monkeypatch.setattr(agent, "groq_client", fake)
+    # Every test starts with a cold cache so repeat test images still hit the model
+    monkeypatch.setattr(orchestrator, "detection_cache", DetectionCache(InMemoryDetectionBackend()))
+    monkeypatch.setattr(orchestrator.planner, "cache", ActionPlanCache(InMemoryActionBackend()))
+    return fake
+
+
+@pytest.fixture
+def llm_server():
+    """Local chat completions endpoint answering "ok"; ``script()`` queues failures"""
+    server = FakeGroqServer(content="ok")
+    yield server
+    server.close()
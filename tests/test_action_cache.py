@@ -0,0 +1,98 @@
+import pytest
+
+from agents.action_cache import (
+    ActionPlanCache, InMemoryActionBackend, SQLActionBackend, jaccard, normalize_description
+)
+from agents.action_planner import ActionPlannerAgent
+from benchmarks.fake_groq import ACTIONS, FakeGroq
+
+
+@pytest.fixture
+def planner():
+    agent = ActionPlannerAgent()
+    agent.groq_client = FakeGroq()
+    agent.cache = ActionPlanCache(InMemoryActionBackend(), threshold=0.5)
+    return agent
+
+
+def test_normalize_description():
+    tokens = normalize_description("Large potholes in the middle of the road!")
+    assert tokens == {"large", "pothole", "middle", "road"}
+    assert jaccard(tokens, normalize_description("Large pothole in middle of road")) == 1.0
+
+
+def test_similar_description_is_served_from_cache(planner):
+    actions, cached, _ = planner.plan("pothole", "Large pothole in the middle of the road", "high")
+    assert actions == ACTIONS and not cached
+
+    actions, cached, calls = planner.plan("pothole", "A large pothole in the middle of a busy road", "high")
+    assert cached and actions == ACTIONS and calls == 0
+    assert planner.groq_client.calls == ["actions"]
+
+    stats = planner.cache.stats()
+    assert stats["similar_hits"] == 1
+    assert stats["hit_ratio"] == 0.5
+    assert stats["tokens_saved"] == 150
+
+
+def test_different_severity_or_text_misses(planner):
+    planner.plan("pothole", "Large pothole in the middle of the road", "high")
+    planner.plan("pothole", "Large pothole in the middle of the road", "low")
+    planner.plan("pothole", "Tiny crack near the footpath edge", "high")
+    assert planner.groq_client.calls == ["actions"] * 3
+
+
+def test_failed_plans_are_not_cached(planner):
+    def broken(**kwargs):
+        raise RuntimeError("provider down")
+
+    planner.groq_client.chat.completions.create = broken
+    actions, cached, _ = planner.plan("garbage", "Overflowing bin", "medium")
+    assert not cached and actions["immediate_actions"][0] == "Report to authorities"
+    assert planner.cache.lookup("garbage", "medium", "Overflowing bin") is None
+
+
+def test_warm_cache_serves_every_pair(planner):
+    assert planner.warm_cache(["pothole", "garbage"], ["low", "high"]) == 4
+    assert planner.warm_cache(["pothole", "garbage"], ["low", "high"]) == 0
+
+    assert planner.cache.lookup("garbage", "low", "Heap of plastic waste beside the market") is None
+    actions, cached, _ = planner.plan("garbage", "Heap of plastic waste beside the market", "low")
+    assert not cached
+    assert planner.cache.stats()["generic_hits"] == 0
+    assert planner.groq_client.calls == ["actions"] * 5
+
+
+def test_generic_plan_is_the_fallback_when_generation_fails(planner):
+    planner.warm_cache(["garbage"], ["low"])
+
+    def broken(**kwargs):
+        raise RuntimeError("provider down")
+
+    planner.groq_client.chat.completions.create = broken
+    actions, cached, calls = planner.plan("garbage", "Overflowing bin", "low")
+    assert cached and actions == ACTIONS
+    # The failed attempt still cost a model call
+    assert calls == 1
+    assert planner.cache.stats()["generic_hits"] == 1
+
+    actions, cached, calls = planner.plan("garbage", "Overflowing bin", "high")
+    assert not cached and actions["immediate_actions"][0] == "Report to authorities" and calls == 1
+
+
+def test_lru_eviction():
+    cache = ActionPlanCache(InMemoryActionBackend(max_size=2))
+    for i, description in enumerate(["broken pipe", "garbage pile", "open manhole"]):
+        cache.store("other", "low", description, {"n": i})
+    assert cache.lookup("other", "low", "broken pipe") is None
+    assert cache.lookup("other", "low", "open manhole") == {"n": 2}
+
+
+def test_sql_backend_persists_entries():
+    backend = SQLActionBackend()
+    backend.clear()
+    ActionPlanCache(backend).store("water_leak", "high", "Burst water main flooding the street", ACTIONS, 150)
+
+    fresh = ActionPlanCache(SQLActionBackend())
+    assert fresh.lookup("water_leak", "high", "Burst water main flooding street") == ACTIONS
+    assert fresh.stats()["tokens_saved"] == 150
@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import event
+from agents.agency_router import AgencyRouter, get_agency_router
+from database.models import Agency, SessionLocal, engine
+
+AGENCIES = [
+    {"name": "Router Flood Primary", "issue_types": ["router_flood"], "routing_priority": 10},
+    {"name": "Router Flood Backup", "issue_types": ["router_flood", "router_drain"], "routing_priority": 20},
+    {"name": "Router Catch All", "issue_types": [], "routing_priority": 90, "is_default": True},
+]
+
+@pytest.fixture(scope="module", autouse=True)
+def router_agencies():
+    db = SessionLocal()
+    for data in AGENCIES:
+        if not db.query(Agency).filter(Agency.name == data["name"]).first():
+            db.add(Agency(email="router@test.gov", phone="100", department="Test", **data))
+    db.commit()
+    db.close()
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+    
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+def test_routes_in_priority_order():
+    router = AgencyRouter(ttl=60)
+    names = [a["agency_name"] for a in router.route_all("router_flood")]
+    assert names == ["Router Flood Primary", "Router Flood Backup"]
+    assert router.route("router_drain")["agency_name"] == "Router Flood Backup"
+
+def test_unknown_type_falls_back_to_default():
+    router = AgencyRouter(ttl=60)
+    assert router.route("router_unheard_of")["agency_name"] == "Router Catch All"
+
+def test_lookups_do_not_hit_the_database():
+    router = AgencyRouter(ttl=60)
+    router.route("router_flood")
+    
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        for _ in range(100):
+            router.route("router_flood")
+            router.route("router_unheard_of")
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+    assert counter.count == 0
+
+def test_agency_changes_invalidate_shared_router():
+    router = get_agency_router()
+    assert router.route("router_storm")["agency_name"] == "Router Catch All"
+    
+    db = SessionLocal()
+    backup = db.query(Agency).filter(Agency.name == "Router Flood Backup").first()
+    backup.issue_types = ["router_flood", "router_drain", "router_storm"]
+    db.commit()
+    db.close()
+    
+    assert router.route("router_storm")["agency_name"] == "Router Flood Backup"
+
+def test_ttl_expiry_picks_up_external_changes():
+    router = AgencyRouter(ttl=0)
+    assert router.route("router_hail")["agency_name"] == "Router Catch All"
+    
+    # A write that bypasses the ORM hooks, as another process would
+    with engine.begin() as conn:
+        conn.execute(Agency.__table__.insert().values(
+            name="Router Hail Desk", issue_types=["router_hail"], routing_priority=5
+        ))
+    assert router.route("router_hail")["agency_name"] == "Router Hail Desk"
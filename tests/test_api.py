@@ -1,8 +1,10 @@
 import pytest
 from fastapi.testclient import TestClient
-from api.main import app
-from database.models import init_db
+from app.main import app, orchestrator
+from database.models import Agency, Notification, SessionLocal, engine, init_db
+from sqlalchemy import event
 import io
+import time
 from PIL import Image
 
 client = TestClient(app)
@@ -77,4 +79,135 @@ def test_missing_required_fields():
         data={"reporter_name": "Test User"}
     )
     
-    assert response.status_code == 422  # Validation error
\ No newline at end of file
+    assert response.status_code == 422  # Validation error
+
+def wait_for_job(job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+def test_report_issue_async_mode(fake_groq):
+    """Async mode returns a job ID immediately and the job completes in the background"""
+    response = client.post(
+        "/api/report-issue?mode=async",
+        files={"image": ("test.jpg", create_test_image(), "image/jpeg")},
+        data={"reporter_name": "Test User", "location": "Test Location"}
+    )
+    
+    assert response.status_code == 202
+    accepted = response.json()
+    assert accepted["status"] == "accepted"
+    
+    job = wait_for_job(accepted["job_id"])
+    assert job["status"] == "completed"
+    assert job["issue_id"] == accepted["issue_id"]
+    assert job["result"]["issue_type"] == "pothole"
+    assert [p["node"] for p in job["progress"]][0] == "detect_issue"
+    
+    issue = client.get(f"/api/issues/{accepted['issue_id']}").json()
+    assert issue["status"] == "reported"
+    assert issue["priority"] == "high"
+
+def test_async_job_events_stream(fake_groq):
+    """The SSE endpoint replays per-node progress and ends with the outcome"""
+    response = client.post(
+        "/api/report-issue?mode=async",
+        files={"image": ("test.jpg", create_test_image(), "image/jpeg")},
+        data={"reporter_name": "Test User", "location": "Test Location"}
+    )
+    job_id = response.json()["job_id"]
+    
+    events = client.get(f"/api/jobs/{job_id}/events").text
+    assert "event: progress" in events
+    assert "detect_issue" in events
+    assert "event: completed" in events
+
+def test_async_no_issue_marks_row(fake_groq):
+    """A report with no detected issue leaves its placeholder row as no_issue"""
+    fake_groq.detection = {**fake_groq.detection, "issue_detected": False, "issue_type": "none"}
+    response = client.post(
+        "/api/report-issue?mode=async",
+        files={"image": ("test.jpg", create_test_image(), "image/jpeg")},
+        data={"reporter_name": "Test User", "location": "Test Location"}
+    )
+    accepted = response.json()
+    
+    job = wait_for_job(accepted["job_id"])
+    assert job["result"]["status"] == "no_issue"
+    issue = client.get(f"/api/issues/{accepted['issue_id']}").json()
+    assert issue["status"] == "no_issue"
+
+def test_unknown_job_returns_404():
+    response = client.get("/api/jobs/does-not-exist")
+    assert response.status_code == 404
+
+@pytest.fixture
+def pothole_agency():
+    db = SessionLocal()
+    agency = db.query(Agency).filter(Agency.name == "Test Works Department").first()
+    if not agency:
+        agency = Agency(
+            name="Test Works Department",
+            department="Infrastructure",
+            email="works@test.gov",
+            phone="+91-141-0000000",
+            issue_types=["pothole"]
+        )
+        db.add(agency)
+        db.commit()
+    db.close()
+
+def test_report_calls_each_model_once(fake_groq, pothole_agency, monkeypatch):
+    """One report costs one detection, one planning and one notification completion"""
+    monkeypatch.setattr(orchestrator.notifier, "mode", "llm")
+    response = client.post(
+        "/api/report-issue",
+        files={"image": ("test.jpg", create_test_image(), "image/jpeg")},
+        data={"reporter_name": "Test User", "location": "Test Location"}
+    )
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "success"
+    assert data["agency_notified"] == "Test Works Department"
+    assert data["metadata"]["llm_calls"] == {
+        "detect_issue": 1,
+        "plan_actions": 1,
+        "send_notification": 1
+    }
+    assert sorted(fake_groq.calls) == ["actions", "detection", "notification"]
+    
+    db = SessionLocal()
+    notifications = db.query(Notification).filter(Notification.issue_id == data["issue_id"]).all()
+    db.close()
+    assert len(notifications) == 1
+    assert notifications[0].message == fake_groq.notification
+
+def test_report_uses_one_connection(fake_groq, pothole_agency):
+    """Issue and notification are written on the request's single unit-of-work session"""
+    def report(color):
+        img = Image.new('RGB', (50, 50), color=color)
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG')
+        buffer.seek(0)
+        return client.post(
+            "/api/report-issue",
+            files={"image": ("test.jpg", buffer, "image/jpeg")},
+            data={"reporter_name": "Test User", "location": "Test Location"}
+        )
+    
+    report('blue')  # warm the agency routing index
+    checkouts = []
+    listener = lambda *args: checkouts.append(1)
+    event.listen(engine, "checkout", listener)
+    try:
+        response = report('yellow')
+    finally:
+        event.remove(engine, "checkout", listener)
+    
+    assert response.json()["status"] == "success"
+    assert len(checkouts) == 1
@@ -0,0 +1,195 @@
+import io
+import json
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy.exc import OperationalError
+
+from agents.batch import BatchProcessor, BatchSource, ManifestError, batch_summary, create_batch, parse_manifest
+from app.main import app, orchestrator
+from database.models import BatchItem, CivicIssue, SessionLocal
+from utils.rate_limit import RateLimiter
+
+client = TestClient(app)
+
+
+def image_bytes(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 40), color=color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+def test_parse_manifest_csv_and_jsonl():
+    csv_rows = parse_manifest(
+        b"filename,reporter_name,location,latitude,longitude\na.jpg,Crew 1,Ward 5,26.9,75.8\nb.jpg,,,,\n",
+        "manifest.csv"
+    )
+    assert csv_rows[0] == {
+        "filename": "a.jpg", "reporter_name": "Crew 1", "location": "Ward 5",
+        "latitude": 26.9, "longitude": 75.8, "audio_text": None
+    }
+    assert csv_rows[1]["reporter_name"] is None
+
+    jsonl_rows = parse_manifest(b'{"filename": "a.jpg", "latitude": "26.9"}\n\n', "rows.jsonl")
+    assert jsonl_rows[0]["latitude"] == 26.9
+
+    with pytest.raises(ManifestError):
+        parse_manifest(b"reporter_name\nCrew 1\n", "manifest.csv")
+    with pytest.raises(ManifestError):
+        parse_manifest(b"filename,latitude\na.jpg,north\n", "manifest.csv")
+
+
+def test_directory_source(tmp_path):
+    (tmp_path / "sweep").mkdir()
+    (tmp_path / "sweep" / "a.jpg").write_bytes(image_bytes('red'))
+    (tmp_path / "notes.txt").write_text("ignored")
+    (tmp_path / "manifest.jsonl").write_text('{"filename": "a.jpg"}\n')
+
+    source = BatchSource(tmp_path)
+    assert list(source.images) == ["sweep/a.jpg"]
+    assert source.manifest[0] == "manifest.jsonl"
+    assert source.resolve("a.jpg") == "sweep/a.jpg"
+
+
+def test_batch_endpoint_streams_results(fake_groq):
+    archive = make_zip({
+        "sweep/a.jpg": image_bytes('red'),
+        "sweep/b.jpg": image_bytes('green'),
+        "manifest.csv": b"filename,reporter_name,location,latitude,longitude\n"
+                        b"a.jpg,Crew 1,Ward 5,26.9,75.8\n"
+                        b"b.jpg,Crew 2,Ward 6,,\n"
+                        b"missing.jpg,Crew 3,Ward 7,,\n"
+    })
+
+    response = client.post(
+        "/api/batches",
+        files={"archive": ("sweep.zip", archive, "application/zip")}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = read_ndjson(response)
+    assert records[0]["type"] == "batch" and records[0]["items"] == 2
+    items = {r["item"]: r for r in records if r["type"] == "item"}
+    assert items["sweep/a.jpg"]["status"] == "done"
+    assert items["sweep/b.jpg"]["status"] == "done"
+    summary = records[-1]
+    assert summary["type"] == "summary"
+    assert summary["counts"] == {"done": 2, "failed": 1}
+
+    db = SessionLocal()
+    issue = db.query(CivicIssue).filter(CivicIssue.id == items["sweep/a.jpg"]["issue_id"]).first()
+    assert issue.reporter_name == "Crew 1"
+    assert issue.latitude == 26.9
+    assert issue.issue_type == "pothole"
+    db.close()
+
+    assert client.get(f"/api/batches/{records[0]['batch_id']}").json()["status"] == "completed"
+
+
+def test_batch_endpoint_rejects_non_zip():
+    response = client.post(
+        "/api/batches",
+        files={"archive": ("sweep.zip", io.BytesIO(b"not a zip"), "application/zip")}
+    )
+    assert response.status_code == 400
+
+
+def test_resume_skips_processed_items(fake_groq, tmp_path):
+    for i in range(4):
+        (tmp_path / f"{i}.jpg").write_bytes(image_bytes((i * 60, 10, 10)))
+    db = SessionLocal()
+    batch_id = create_batch(db, BatchSource(tmp_path), tmp_path / "store", 10 ** 7)
+    db.close()
+
+    processor = BatchProcessor(orchestrator, concurrency=1, rate_per_minute=0, flush_size=1)
+    run = processor.run(batch_id)
+    assert next(run)["type"] == "batch"
+    first = next(run)
+    assert first["status"] == "done"
+    run.close()  # simulate the stream being cut off
+
+    db = SessionLocal()
+    assert batch_summary(db, batch_id)["status"] == "interrupted"
+    db.close()
+
+    records = list(processor.run(batch_id))
+    resumed = [r["item"] for r in records if r["type"] == "item"]
+    assert first["item"] not in resumed
+    assert records[-1]["counts"] == {"done": 4}
+
+    db = SessionLocal()
+    issue_ids = [item.issue_id for item in db.query(BatchItem).filter(BatchItem.batch_id == batch_id)]
+    db.close()
+    assert len(set(issue_ids)) == 4
+
+
+def test_failed_detection_is_not_retried_by_the_batch(fake_groq, tmp_path):
+    (tmp_path / "a.jpg").write_bytes(image_bytes('purple'))
+    original = fake_groq.create
+    failures = {"left": 1}
+
+    def flaky(model, messages, **kwargs):
+        if isinstance(messages[0]["content"], list) and failures["left"]:
+            failures["left"] -= 1
+            raise RuntimeError("503 Service Unavailable")
+        return original(model, messages, **kwargs)
+
+    fake_groq.chat.completions.create = flaky
+    db = SessionLocal()
+    batch_id = create_batch(db, BatchSource(tmp_path), tmp_path / "store", 10 ** 7)
+    db.close()
+
+    processor = BatchProcessor(orchestrator, rate_per_minute=0, retry_delay=0)
+    item = [r for r in processor.run(batch_id) if r["type"] == "item"][0]
+    # The LLM client owns retries of provider errors; the batch doesn't add its own
+    assert item["status"] == "failed"
+    assert item["attempts"] == 1
+    assert failures["left"] == 0
+
+
+def test_transient_database_error_is_retried(fake_groq, tmp_path, monkeypatch):
+    (tmp_path / "a.jpg").write_bytes(image_bytes('olive'))
+    process = orchestrator.process
+    failures = {"left": 1}
+
+    def flaky(state, **kwargs):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise OperationalError("SELECT 1", {}, Exception("database is locked"))
+        return process(state, **kwargs)
+
+    monkeypatch.setattr(orchestrator, "process", flaky)
+    db = SessionLocal()
+    batch_id = create_batch(db, BatchSource(tmp_path), tmp_path / "store", 10 ** 7)
+    db.close()
+
+    processor = BatchProcessor(orchestrator, rate_per_minute=0, retry_delay=0)
+    item = [r for r in processor.run(batch_id) if r["type"] == "item"][0]
+    assert item["status"] == "done"
+    assert item["attempts"] == 2
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(rate=20, burst=1)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+    assert RateLimiter(rate=0).try_acquire()
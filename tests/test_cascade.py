@@ -0,0 +1,121 @@
+import base64
+import io
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from agents.issue_detector import IssueDetectorAgent
+from benchmarks.fake_groq import DETECTION
+
+SCREEN_MODEL = "small-screen"
+LARGE_MODEL = "large-vision"
+
+
+class ModelStub:
+    """Answers per model name; a model mapped to an exception raises it"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        with self._lock:
+            self.calls.append(model)
+        answer = self.answers[model]
+        if isinstance(answer, Exception):
+            raise answer
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(answer)))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        )
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "street.jpg"
+    Image.new("RGB", (800, 600), color=(90, 90, 90)).save(path, format="JPEG")
+    return str(path)
+
+
+def cascade_detector(screen_answer, large_answer=DETECTION):
+    detector = IssueDetectorAgent()
+    detector.cascade = True
+    detector.model = LARGE_MODEL
+    detector.screen_model = SCREEN_MODEL
+    detector.screen_negative_confidence = 0.85
+    detector.groq_client = ModelStub({SCREEN_MODEL: screen_answer, LARGE_MODEL: large_answer})
+    return detector
+
+
+def test_confident_negative_screen_skips_large_model(image):
+    detector = cascade_detector({"issue_detected": False, "issue_type": "none", "confidence": 0.95})
+
+    result = detector.detect_issue(image)
+
+    assert detector.groq_client.calls == [SCREEN_MODEL]
+    assert result["issue_detected"] is False and result["cascade"] == "screened_out"
+    assert result["model_calls"] == 1
+    stats = detector.cascade_stats()
+    assert (stats["screened"], stats["skipped"], stats["escalated"]) == (1, 1, 0)
+    assert stats["escalation_rate"] == 0.0
+
+
+def test_positive_screen_escalates_and_records_agreement(image):
+    detector = cascade_detector({"issue_detected": True, "issue_type": "garbage", "confidence": 0.7})
+
+    result = detector.detect_issue(image)
+
+    assert detector.groq_client.calls == [SCREEN_MODEL, LARGE_MODEL]
+    assert result["issue_type"] == "pothole" and result["severity"] == "high"
+    assert result["cascade"] == "escalated" and result["model_calls"] == 2
+    stats = detector.cascade_stats()
+    assert stats["detected_agreement"] == 1.0
+    assert stats["type_agreement"] == 0.0
+
+
+@pytest.mark.parametrize("screen_answer", [
+    {"issue_detected": False, "issue_type": "none", "confidence": 0.6},
+    RuntimeError("screen model unavailable"),
+    {"unexpected": "shape"}
+])
+def test_uncertain_or_failed_screen_escalates(image, screen_answer):
+    detector = cascade_detector(screen_answer)
+
+    result = detector.detect_issue(image)
+
+    assert detector.groq_client.calls[-1] == LARGE_MODEL
+    assert result["issue_detected"] is True and result["cascade"] == "escalated"
+    stats = detector.cascade_stats()
+    assert stats["escalated"] == 1
+    assert stats["screen_failures"] == (0 if isinstance(screen_answer, dict) and "confidence" in screen_answer else 1)
+
+
+def test_screen_sees_a_low_resolution_copy(image):
+    detector = cascade_detector({"issue_detected": False, "issue_type": "none", "confidence": 0.99})
+    sent = []
+    create = detector.groq_client.create
+
+    def capture(model, messages, **kwargs):
+        sent.append(messages[0]["content"][1]["image_url"]["url"])
+        return create(model, messages, **kwargs)
+
+    detector.groq_client.chat.completions.create = capture
+    detector.detect_issue(image)
+
+    payload = base64.b64decode(sent[0].split(",", 1)[1])
+    assert max(Image.open(io.BytesIO(payload)).size) <= detector.screen_max_dimension
+
+
+def test_cascade_off_calls_only_the_large_model(image):
+    detector = cascade_detector({"issue_detected": False, "issue_type": "none", "confidence": 0.99})
+    detector.cascade = False
+
+    result = detector.detect_issue(image)
+
+    assert detector.groq_client.calls == [LARGE_MODEL]
+    assert result["model_calls"] == 1 and "cascade" not in result
@@ -0,0 +1,167 @@
+import io
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from agents.incident_clusterer import IncidentClusterer
+from app.main import app, orchestrator
+from database.models import Agency, CivicIssue, Notification, SessionLocal
+
+client = TestClient(app)
+
+_pixels = random.Random(5)
+
+
+@pytest.fixture(autouse=True)
+def clusterer(monkeypatch):
+    """A fresh clusterer per test, and a pothole agency to notify"""
+    db = SessionLocal()
+    if not db.query(Agency).filter(Agency.name == "Test Works Department").first():
+        db.add(Agency(name="Test Works Department", department="Infrastructure", email="works@test.gov",
+                      phone="+91-141-0000000", issue_types=["pothole"]))
+        db.commit()
+    db.close()
+    instance = IncidentClusterer(radius_m=75, window_hours=72, image_match=True, escalate_every=0)
+    monkeypatch.setattr(orchestrator, "clusterer", instance)
+    monkeypatch.setattr(orchestrator.notifier, "mode", "template")
+    return instance
+
+
+@pytest.fixture
+def spot():
+    """Coordinates no other test reports at"""
+    return (random.uniform(-60, -50), random.uniform(-170, -160))
+
+
+def image_bytes():
+    """A random blocky photo, so perceptual hashes of different reports differ"""
+    blocks = Image.new('L', (9, 8))
+    blocks.putdata([_pixels.randrange(256) for _ in range(72)])
+    buffer = io.BytesIO()
+    blocks.resize((90, 80), Image.NEAREST).convert('RGB').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def report(lat=None, lon=None, image=None):
+    data = {"reporter_name": "Citizen", "location": "Ward 12"}
+    if lat is not None:
+        data.update(latitude=str(lat), longitude=str(lon))
+    response = client.post(
+        "/api/report-issue",
+        files={"image": ("report.jpg", io.BytesIO(image or image_bytes()), "image/jpeg")},
+        data=data
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def offset(point, meters):
+    return point[0] + meters / 111320.0, point[1]
+
+
+def load(issue_id):
+    db = SessionLocal()
+    try:
+        return db.query(CivicIssue).filter(CivicIssue.id == issue_id).one()
+    finally:
+        db.close()
+
+
+def notification_count(issue_id):
+    db = SessionLocal()
+    try:
+        return db.query(Notification).filter(Notification.issue_id == issue_id).count()
+    finally:
+        db.close()
+
+
+def test_nearby_report_joins_open_incident(fake_groq, spot):
+    first = report(*spot)
+    calls_before = list(fake_groq.calls)
+    second = report(*offset(spot, 30))
+
+    assert second["duplicate_of"] == first["issue_id"]
+    assert second["report_count"] == 2
+    assert second["metadata"]["incident_match"] == "spatial"
+    # Only the vision call: no action plan, no notification
+    assert fake_groq.calls[len(calls_before):] == ["detection"]
+    assert "plan_actions" not in second["metadata"]["node_timings_ms"]
+    assert second["suggested_actions"] == first["suggested_actions"]
+
+    assert load(second["issue_id"]).status == "duplicate"
+    assert load(first["issue_id"]).report_count == 2
+    assert notification_count(first["issue_id"]) == 1
+    assert notification_count(second["issue_id"]) == 0
+
+
+def test_far_old_or_closed_incidents_are_not_joined(fake_groq, spot):
+    first = report(*spot)
+    assert report(*offset(spot, 200))["duplicate_of"] is None
+
+    db = SessionLocal()
+    db.query(CivicIssue).filter(CivicIssue.id == first["issue_id"]).update(
+        {"created_at": datetime.utcnow() - timedelta(days=5)}
+    )
+    db.commit()
+    db.close()
+    assert report(*offset(spot, 10))["duplicate_of"] is None
+
+
+def test_resolved_incident_starts_a_new_one(fake_groq, spot):
+    first = report(*spot)
+    db = SessionLocal()
+    incident = db.query(CivicIssue).filter(CivicIssue.id == first["issue_id"]).one()
+    incident.status = "resolved"
+    db.commit()
+    db.close()
+
+    assert report(*spot)["duplicate_of"] is None
+
+
+def test_other_issue_type_is_a_separate_incident(fake_groq, spot):
+    report(*spot)
+    fake_groq.detection = {**fake_groq.detection, "issue_type": "garbage"}
+    assert report(*spot)["duplicate_of"] is None
+
+
+def test_repeat_reports_escalate_and_notify_once(fake_groq, spot, clusterer):
+    clusterer.escalate_every = 3
+    fake_groq.detection = {**fake_groq.detection, "severity": "medium"}
+    first = report(*spot)
+    for _ in range(2):
+        report(*offset(spot, 20))
+
+    incident = load(first["issue_id"])
+    assert incident.report_count == 3
+    assert incident.priority == "high"
+    db = SessionLocal()
+    messages = [n.message for n in db.query(Notification).filter(Notification.issue_id == first["issue_id"])]
+    db.close()
+    assert len(messages) == 2
+    assert messages[1].startswith("[ESCALATED TO HIGH]") and "reported 3 times" in messages[1]
+    assert clusterer.stats()["escalations"] == 1
+
+
+def test_higher_severity_report_raises_priority(fake_groq, spot):
+    fake_groq.detection = {**fake_groq.detection, "severity": "low"}
+    first = report(*spot)
+    fake_groq.detection = {**fake_groq.detection, "severity": "critical"}
+    report(*spot)
+
+    assert load(first["issue_id"]).priority == "critical"
+
+
+def test_same_photo_without_coordinates_joins_by_image(fake_groq, clusterer):
+    photo = image_bytes()
+    first = report(image=photo)
+    second = report(image=photo)
+
+    assert second["duplicate_of"] == first["issue_id"]
+    assert second["metadata"]["incident_match"] == "image"
+    assert load(first["issue_id"]).report_count == 2
+
+    clusterer.image_match = False
+    assert report(image=photo)["metadata"]["incident_match"] is None
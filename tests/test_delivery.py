@@ -0,0 +1,210 @@
+import io
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from agents.delivery import OutboxDispatcher, SMTPTransport
+from app.main import app, orchestrator
+from database.models import Agency, CivicIssue, Notification, SessionLocal
+from utils.smtp_sink import SMTPSink
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def smtp_sink():
+    sink = SMTPSink().start()
+    yield sink
+    sink.stop()
+
+
+@pytest.fixture
+def agencies():
+    """Two agencies with email addresses, and an outbox emptied of other tests' rows"""
+    db = SessionLocal()
+    db.query(Notification).filter(Notification.status.in_(["pending", "sending"])).delete(synchronize_session=False)
+    ids = []
+    for name, email in (("Outbox Roads", "roads@outbox.test"), ("Outbox Water", "water@outbox.test")):
+        agency = db.query(Agency).filter(Agency.name == name).first()
+        if agency is None:
+            agency = Agency(name=name, department="Test", email=email, phone="1", issue_types=[])
+            db.add(agency)
+            db.flush()
+        ids.append(agency.id)
+    db.commit()
+    db.close()
+    return ids
+
+
+def enqueue(agency_id, message="Pothole at MI Road", count=1):
+    db = SessionLocal()
+    try:
+        issue = CivicIssue(reporter_name="Tester", location="MI Road", issue_type="pothole", priority="high")
+        db.add(issue)
+        db.flush()
+        for i in range(count):
+            orchestrator.notifier.send_notification(
+                issue.id, {"agency_id": agency_id}, f"{message} #{i}", db=db
+            )
+        db.commit()
+        return issue.id
+    finally:
+        db.close()
+
+
+def notifications(issue_id):
+    db = SessionLocal()
+    try:
+        return db.query(Notification).filter(Notification.issue_id == issue_id).order_by(Notification.id).all()
+    finally:
+        db.close()
+
+
+def dispatcher_for(sink, **kwargs):
+    transport = SMTPTransport(host=sink.host, port=sink.port, sender="alerts@civic.test")
+    return OutboxDispatcher(transport=transport, workers=1, backoff_base=0, poll_interval=0.05, **kwargs)
+
+
+def test_report_enqueues_pending_notification(fake_groq, agencies, monkeypatch):
+    monkeypatch.setattr(orchestrator.notifier, "mode", "template")
+    monkeypatch.setattr(orchestrator.notifier.router, "route", lambda issue_type: {
+        "agency_id": agencies[0], "agency_name": "Outbox Roads", "email": "roads@outbox.test", "phone": "1"
+    })
+    buffer = io.BytesIO()
+    Image.new('RGB', (60, 60), color='teal').save(buffer, format='JPEG')
+    buffer.seek(0)
+    data = client.post(
+        "/api/report-issue",
+        files={"image": ("test.jpg", buffer, "image/jpeg")},
+        data={"reporter_name": "Test User", "location": "Test Location"}
+    ).json()
+
+    rows = notifications(data["issue_id"])
+    assert len(rows) == 1
+    assert rows[0].status == "pending"
+    assert rows[0].attempts == 0
+    assert client.get("/api/notifications/outbox").json()["counts"]["pending"] >= 1
+
+
+def test_dispatcher_delivers_over_smtp(agencies, smtp_sink):
+    issue_id = enqueue(agencies[0])
+
+    assert dispatcher_for(smtp_sink).dispatch_once() == 1
+
+    [row] = notifications(issue_id)
+    assert row.status == "sent"
+    assert row.attempts == 1
+    assert row.sent_at is not None
+    [mail] = smtp_sink.messages
+    assert mail["to"] == ["roads@outbox.test"]
+    assert mail["subject"] == f"[Civic issue #{issue_id}] Pothole at MI Road #0"
+    assert "Pothole at MI Road #0" in mail["body"]
+
+
+def test_batches_per_agency_on_one_connection(agencies, smtp_sink):
+    roads = enqueue(agencies[0], count=3)
+    water = enqueue(agencies[1], message="Leak", count=2)
+
+    assert dispatcher_for(smtp_sink).dispatch_once() == 5
+
+    assert smtp_sink.connections == 2
+    assert len(smtp_sink.messages) == 5
+    assert all(row.status == "sent" for row in notifications(roads) + notifications(water))
+
+
+def test_rejected_message_is_retried_with_backoff(agencies, smtp_sink):
+    issue_id = enqueue(agencies[0])
+    smtp_sink.fail_next = 1
+    dispatcher = dispatcher_for(smtp_sink)
+    dispatcher.backoff_base = 60
+
+    dispatcher.dispatch_once()
+    [row] = notifications(issue_id)
+    assert row.status == "pending"
+    assert row.attempts == 1
+    assert "451" in row.last_error
+    assert row.next_attempt_at > datetime.utcnow() + timedelta(seconds=30)
+    # Not due yet
+    assert dispatcher.dispatch_once() == 0
+
+    dispatcher.backoff_base = 0
+    db = SessionLocal()
+    db.query(Notification).filter(Notification.id == row.id).update({"next_attempt_at": None})
+    db.commit()
+    db.close()
+    assert dispatcher.dispatch_once() == 1
+    [row] = notifications(issue_id)
+    assert row.status == "sent"
+    assert row.attempts == 2
+
+
+def test_gives_up_after_max_attempts(agencies, smtp_sink):
+    issue_id = enqueue(agencies[0])
+    smtp_sink.fail_next = 10
+    dispatcher = dispatcher_for(smtp_sink, max_attempts=3)
+
+    for _ in range(5):
+        dispatcher.dispatch_once()
+
+    [row] = notifications(issue_id)
+    assert row.status == "failed"
+    assert row.attempts == 3
+    assert smtp_sink.messages == []
+
+
+def test_concurrent_workers_deliver_each_notification_once(agencies, smtp_sink):
+    enqueue(agencies[0], count=20)
+    enqueue(agencies[1], count=20)
+    dispatchers = [dispatcher_for(smtp_sink, batch_size=5) for _ in range(4)]
+    barrier = threading.Barrier(len(dispatchers))
+
+    def drain(dispatcher):
+        barrier.wait()
+        while dispatcher.dispatch_once():
+            pass
+
+    threads = [threading.Thread(target=drain, args=(d,)) for d in dispatchers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    subjects = [mail["subject"] for mail in smtp_sink.messages]
+    assert len(subjects) == 40
+    assert len(set(subjects)) == 40
+
+
+def test_stale_claim_is_reclaimed(agencies, smtp_sink):
+    issue_id = enqueue(agencies[0])
+    db = SessionLocal()
+    db.query(Notification).filter(Notification.issue_id == issue_id).update({
+        "status": "sending", "claim_token": "crashed", "claimed_at": datetime.utcnow() - timedelta(hours=1)
+    })
+    db.commit()
+    db.close()
+
+    assert dispatcher_for(smtp_sink, lease=60).dispatch_once() == 1
+    assert notifications(issue_id)[0].status == "sent"
+
+
+def test_outcome_of_a_lost_claim_is_ignored(agencies, smtp_sink):
+    issue_id = enqueue(agencies[0])
+    dispatcher = dispatcher_for(smtp_sink)
+    send_batch = dispatcher.transport.send_batch
+
+    def slow_send(agency, batch):
+        # The lease runs out mid-send and another worker takes the row over
+        db = SessionLocal()
+        db.query(Notification).filter(Notification.issue_id == issue_id).update({"claim_token": "other"})
+        db.commit()
+        db.close()
+        return send_batch(agency, batch)
+
+    dispatcher.transport.send_batch = slow_send
+    assert dispatcher.dispatch_once() == 1
+
+    row = notifications(issue_id)[0]
+    assert row.status == "sending" and row.claim_token == "other" and row.attempts == 0
@@ -0,0 +1,143 @@
+import io
+import time
+from PIL import Image, ImageDraw
+from fastapi.testclient import TestClient
+from agents.detection_cache import (
+    DetectionCache,
+    InMemoryDetectionBackend,
+    SQLDetectionBackend,
+    content_hash,
+    hamming_distance,
+    perceptual_hash
+)
+from app.main import app
+
+client = TestClient(app)
+
+RESULT = {
+    "issue_detected": True,
+    "issue_type": "garbage",
+    "severity": "medium",
+    "description": "Pile of garbage",
+    "confidence": 0.8
+}
+
+def make_image(size=(200, 150), quality=90, fmt="JPEG"):
+    img = Image.new("RGB", size, color=(40, 120, 40))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([size[0] // 4, size[1] // 4, size[0] // 2, size[1] // 2], fill=(220, 200, 30))
+    draw.ellipse([size[0] // 2, size[1] // 3, size[0] - 10, size[1] - 10], fill=(10, 10, 90))
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+def test_exact_hash_hit():
+    cache = DetectionCache(InMemoryDetectionBackend(), use_perceptual=False)
+    image = make_image()
+    
+    first = cache.lookup(image)
+    assert first["entry"] is None
+    cache.store(first["image_hash"], first["perceptual_hash"], RESULT)
+    
+    second = cache.lookup(image)
+    assert second["entry"]["result"] == RESULT
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_near_duplicate_hit_for_reencoded_copy():
+    """A resized, recompressed copy differs byte-wise but matches perceptually"""
+    cache = DetectionCache(InMemoryDetectionBackend(), use_perceptual=True, max_distance=6)
+    original = make_image()
+    copy = make_image(size=(400, 300), quality=60)
+    assert content_hash(original) != content_hash(copy)
+    assert hamming_distance(perceptual_hash(original), perceptual_hash(copy)) <= 6
+    
+    first = cache.lookup(original)
+    cache.store(first["image_hash"], first["perceptual_hash"], RESULT)
+    
+    second = cache.lookup(copy)
+    assert second["entry"]["result"] == RESULT
+    assert cache.stats()["near_duplicate_hits"] == 1
+
+def test_flat_images_never_match_perceptually():
+    """Featureless photos all hash to zero; they must not share a detection"""
+    cache = DetectionCache(InMemoryDetectionBackend(), use_perceptual=True)
+    grey, red = io.BytesIO(), io.BytesIO()
+    Image.new("RGB", (640, 480), color=(60, 60, 60)).save(grey, format="PNG")
+    Image.new("RGB", (640, 480), color=(200, 0, 0)).save(red, format="PNG")
+    
+    first = cache.lookup(grey.getvalue())
+    assert first["perceptual_hash"] is None
+    cache.store(first["image_hash"], first["perceptual_hash"], RESULT)
+    assert cache.lookup(red.getvalue())["entry"] is None
+
+def test_sql_backend_finds_near_duplicates_by_band():
+    cache = DetectionCache(SQLDetectionBackend(), use_perceptual=True)
+    cache.clear()
+    first = cache.lookup(make_image())
+    cache.store(first["image_hash"], first["perceptual_hash"], RESULT)
+    
+    assert cache.lookup(make_image(size=(400, 300), quality=60))["entry"]["result"] == RESULT
+    unrelated = io.BytesIO()
+    Image.effect_noise((200, 150), 80).convert("RGB").save(unrelated, format="JPEG")
+    assert cache.lookup(unrelated.getvalue())["entry"] is None
+
+def test_entries_expire():
+    cache = DetectionCache(InMemoryDetectionBackend(ttl=0.05), use_perceptual=False)
+    image = make_image()
+    lookup = cache.lookup(image)
+    cache.store(lookup["image_hash"], None, RESULT)
+    time.sleep(0.1)
+    assert cache.lookup(image)["entry"] is None
+
+def test_sql_backend_links_first_issue():
+    cache = DetectionCache(SQLDetectionBackend())
+    cache.clear()
+    image = make_image(size=(120, 90))
+    
+    lookup = cache.lookup(image)
+    cache.store(lookup["image_hash"], lookup["perceptual_hash"], RESULT)
+    cache.link_issue(lookup["image_hash"], 41)
+    cache.link_issue(lookup["image_hash"], 42)
+    
+    entry = cache.lookup(image)["entry"]
+    assert entry["result"] == RESULT
+    assert entry["issue_id"] == 41
+
+def test_repeat_upload_skips_vision_call(fake_groq):
+    """The second upload of the same photo reuses detection and links to the first issue"""
+    image = make_image()
+    
+    def report():
+        return client.post(
+            "/api/report-issue",
+            files={"image": ("dup.jpg", io.BytesIO(image), "image/jpeg")},
+            data={"reporter_name": "Test User", "location": "Test Location"}
+        ).json()
+    
+    first = report()
+    second = report()
+    
+    assert fake_groq.calls.count("detection") == 1
+    assert first["metadata"]["detection_cache"] == "miss"
+    assert second["metadata"]["detection_cache"] == "hit"
+    assert "detect_issue" not in second["metadata"]["llm_calls"]
+    assert second["duplicate_of"] == first["issue_id"]
+    
+    issue = client.get(f"/api/issues/{second['issue_id']}").json()
+    assert issue["duplicate_of"] == first["issue_id"]
+    assert issue["image_hash"] == content_hash(image)
+
+def test_audio_context_bypasses_the_cache(fake_groq):
+    """The same photo with a different spoken description is judged again"""
+    image = make_image(size=(180, 140))
+    
+    for audio_text in ("Garbage pile", "Water leaking from the pipe"):
+        response = client.post(
+            "/api/report-issue",
+            files={"image": ("audio.jpg", io.BytesIO(image), "image/jpeg")},
+            data={"reporter_name": "Test User", "location": "Test Location", "audio_text": audio_text}
+        ).json()
+        assert response["metadata"]["detection_cache"] == "miss"
+        assert response.get("duplicate_of") is None
+    assert fake_groq.calls.count("detection") == 2
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import pytest
+from agents.executor import AgentExecutor, ExecutorSaturatedError
+
+def test_executor_runs_off_event_loop():
+    """Blocking work runs on a pool thread, not the event loop thread"""
+    executor = AgentExecutor(max_workers=2, max_in_flight=2)
+
+    async def main():
+        loop_thread = threading.get_ident()
+        worker_thread = await executor.run(threading.get_ident)
+        return loop_thread, worker_thread
+
+    loop_thread, worker_thread = asyncio.run(main())
+    assert loop_thread != worker_thread
+    executor.shutdown()
+
+def test_executor_rejects_when_saturated():
+    """Submissions beyond max_in_flight fail fast instead of queueing"""
+    executor = AgentExecutor(max_workers=1, max_in_flight=2)
+    release = threading.Event()
+
+    first = executor.submit(release.wait)
+    second = executor.submit(release.wait)
+    assert executor.in_flight == 2
+
+    with pytest.raises(ExecutorSaturatedError):
+        executor.submit(release.wait)
+
+    release.set()
+    first.result(timeout=5)
+    second.result(timeout=5)
+    executor.shutdown()
+    assert executor.in_flight == 0
+
+def test_executor_event_loop_stays_responsive():
+    """Other coroutines keep running while a slow job occupies the pool"""
+    executor = AgentExecutor(max_workers=1, max_in_flight=1)
+    release = threading.Event()
+
+    async def main():
+        job = asyncio.ensure_future(executor.run(release.wait, 5))
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        release.set()
+        await job
+        return ticks
+
+    assert asyncio.run(main()) == 5
+    executor.shutdown()
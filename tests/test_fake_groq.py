@@ -0,0 +1,88 @@
+import json
+import random
+
+import pytest
+
+from benchmarks.fake_groq import FakeGroqServer, sample_latency
+from benchmarks.load_test import compare, metric_delta
+from utils.llm_client import build_llm_client
+
+DETECTION_MESSAGES = [{"role": "user", "content": [
+    {"type": "text", "text": "Analyze this image"},
+    {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,AAAA"}}
+]}]
+ACTION_MESSAGES = [{"role": "user", "content": "Provide actionable suggestions for this pothole"}]
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**options):
+        servers.append(FakeGroqServer(**options))
+        return servers[-1]
+
+    yield start
+    for fake in servers:
+        fake.close()
+
+
+def completion(fake, messages, retries=0):
+    llm = build_llm_client(base_url=fake.base_url, api_key="test-key")
+    llm.max_retries = retries
+    return llm.chat.completions.create(model="fake-model", messages=messages, max_tokens=16)
+
+
+def test_latency_distributions():
+    rng = random.Random(1)
+    assert sample_latency(None, rng) == 0.0
+    assert sample_latency(0.25, rng) == 0.25
+    assert sample_latency({"dist": "constant", "seconds": 0.5}, rng) == 0.5
+    assert all(0.1 <= sample_latency({"dist": "uniform", "low": 0.1, "high": 0.2}, rng) <= 0.2 for _ in range(50))
+    samples = sorted(sample_latency({"dist": "lognormal", "median": 0.8, "sigma": 0.3}, rng) for _ in range(2001))
+    assert samples[1000] == pytest.approx(0.8, rel=0.1)
+    assert min(sample_latency({"dist": "normal", "mean": 0.0, "sd": 1.0}, rng) for _ in range(50)) == 0.0
+    with pytest.raises(ValueError):
+        sample_latency({"dist": "pareto"}, rng)
+
+
+def test_canned_responses_per_request_kind(server):
+    fake = server(responses={"detection": {"issue_detected": False, "issue_type": "none"}})
+
+    detection = json.loads(completion(fake, DETECTION_MESSAGES).choices[0].message.content)
+    actions = json.loads(completion(fake, ACTION_MESSAGES).choices[0].message.content)
+
+    assert detection == {"issue_detected": False, "issue_type": "none"}
+    assert actions["immediate_actions"] == ["Barricade the pothole"]
+    assert fake.stats()["calls"] == {"detection": 1, "actions": 1, "notification": 0}
+
+
+def test_error_rate_injects_failures(server):
+    fake = server(error_rate=1.0, error_status=503, retry_after=0)
+
+    with pytest.raises(Exception) as error:
+        completion(fake, ACTION_MESSAGES)
+    assert getattr(error.value, "status_code", None) == 503
+    assert fake.stats()["errors"] == 1
+
+    fake.error_rate = 0.0
+    fake.script(429, {"Retry-After": "0"})
+    assert completion(fake, ACTION_MESSAGES, retries=1).choices[0].message.content
+    assert fake.stats() == {
+        "requests": 3, "errors": 2, "malformed": 0, "calls": {"detection": 0, "actions": 3, "notification": 0}
+    }
+
+
+def test_load_test_results_helpers():
+    before = {"civic_llm_requests_total": [({"outcome": "ok"}, 10.0)]}
+    after = {"civic_llm_requests_total": [({"outcome": "ok"}, 16.0), ({"outcome": "error"}, 2.0)]}
+    assert metric_delta(before, after, "civic_llm_requests_total") == 8.0
+    assert metric_delta(before, after, "civic_llm_requests_total", "outcome") == {"ok": 6.0, "error": 2.0}
+
+    results = {"endpoints": {"report": {"p95_ms": 150.0, "throughput_rps": 4.0}}, "llm_calls_per_report": 2.0}
+    baseline = {"commit": "abc123", "endpoints": {"report": {"p95_ms": 200.0, "throughput_rps": 4.0}},
+                "llm_calls_per_report": 3.0}
+    assert compare(results, baseline) == {
+        "baseline_commit": "abc123",
+        "changes": {"report.throughput_rps": "+0.0%", "report.p95_ms": "-25.0%", "llm_calls_per_report": "-33.3%"}
+    }
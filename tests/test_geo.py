@@ -0,0 +1,153 @@
+import math
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from database.models import CivicIssue, SessionLocal
+from database.spatial import backfill_geohashes
+from utils import geo
+
+client = TestClient(app)
+
+# A quiet corner of the map so other tests' issues never show up
+CENTER = (-33.8688, 151.2093)
+
+
+def test_encode_known_geohashes():
+    assert geo.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geo.encode(42.6, -5.6, 5) == "ezs42"
+    min_lat, min_lon, max_lat, max_lon = geo.decode_bbox("u4pruydqqvj")
+    assert min_lat <= 57.64911 <= max_lat and min_lon <= 10.40744 <= max_lon
+
+
+def test_covering_cells_contain_every_point_of_the_box():
+    rng = random.Random(3)
+    for bbox in [(26.90, 75.78, 26.92, 75.80), (-17.1, 179.9, -16.9, -179.9), (-10, -10, 10, 10)]:
+        cells = geo.covering_cells(bbox, max_cells=16)
+        assert 0 < len(cells) <= 16
+        for _ in range(200):
+            lat = rng.uniform(bbox[0], bbox[2])
+            lon = rng.uniform(bbox[1], bbox[3]) if bbox[1] <= bbox[3] else rng.choice([179.95, -179.95])
+            point = geo.encode(lat, lon)
+            assert any(point.startswith(cell) for cell in cells)
+
+
+def test_radius_bbox_wraps_the_antimeridian():
+    min_lat, min_lon, max_lat, max_lon = geo.radius_bbox(-17.0, 179.999, 1000)
+    assert min_lon > max_lon
+    assert geo.haversine_m(-17.0, 179.999, -17.0, -179.999) < 1000
+
+
+@pytest.fixture(scope="module")
+def spatial_issues():
+    """Issues on rings 100 m .. 3 km around CENTER, plus two across the antimeridian"""
+    rng = random.Random(11)
+    db = SessionLocal()
+    rows = []
+    for i in range(60):
+        distance = 100 + i * 50
+        bearing = math.radians(rng.uniform(0, 360))
+        lat = CENTER[0] + distance * math.cos(bearing) / geo.METERS_PER_DEGREE_LAT
+        lon = CENTER[1] + distance * math.sin(bearing) / (geo.METERS_PER_DEGREE_LAT * math.cos(math.radians(CENTER[0])))
+        rows.append(CivicIssue(
+            reporter_name=f"Geo {i}", location="Sydney", latitude=lat, longitude=lon,
+            issue_type="pothole" if i % 2 else "garbage", status="reported", priority="low"
+        ))
+    rows.append(CivicIssue(reporter_name="East", location="Fiji", latitude=-17.0, longitude=179.9995, issue_type="pothole"))
+    rows.append(CivicIssue(reporter_name="West", location="Fiji", latitude=-17.0, longitude=-179.9995, issue_type="pothole"))
+    db.add_all(rows)
+    db.commit()
+    ids = [row.id for row in rows]
+    db.close()
+    return ids
+
+
+def test_geohash_is_set_on_write(spatial_issues):
+    db = SessionLocal()
+    try:
+        issue = db.query(CivicIssue).filter(CivicIssue.id == spatial_issues[0]).one()
+        assert issue.geohash == geo.encode(issue.latitude, issue.longitude)
+        issue.latitude, issue.longitude = 0.0, 0.0
+        db.commit()
+        assert issue.geohash == geo.encode(0.0, 0.0)
+    finally:
+        db.close()
+
+
+def test_nearby_matches_brute_force(spatial_issues):
+    db = SessionLocal()
+    candidates = db.query(CivicIssue).filter(CivicIssue.location == "Sydney").all()
+    db.close()
+    for radius in (250, 1000, 2500):
+        expected = sorted(
+            issue.id for issue in candidates
+            if geo.haversine_m(*CENTER, issue.latitude, issue.longitude) <= radius
+        )
+        response = client.get("/api/issues/nearby", params={
+            "lat": CENTER[0], "lon": CENTER[1], "radius_m": radius, "limit": 500
+        })
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert sorted(issue["id"] for issue in data["issues"]) == expected
+        distances = [issue["distance_m"] for issue in data["issues"]]
+        assert distances == sorted(distances) and all(d <= radius for d in distances)
+
+
+def test_nearby_filters_and_limit(spatial_issues):
+    data = client.get("/api/issues/nearby", params={
+        "lat": CENTER[0], "lon": CENTER[1], "radius_m": 5000, "issue_type": "pothole", "limit": 5
+    }).json()
+    assert len(data["issues"]) == 5
+    assert data["total"] == 30
+    assert all(issue["issue_type"] == "pothole" for issue in data["issues"])
+
+
+def test_bbox_returns_issues_inside_the_box(spatial_issues):
+    data = client.get("/api/issues/bbox", params={
+        "min_lat": CENTER[0] - 0.01, "min_lon": CENTER[1] - 0.01,
+        "max_lat": CENTER[0] + 0.01, "max_lon": CENTER[1] + 0.01,
+        "fields": "id,latitude,longitude", "limit": 500
+    }).json()
+    assert data["issues"] and not data["truncated"]
+    for issue in data["issues"]:
+        assert abs(issue["latitude"] - CENTER[0]) <= 0.01 and abs(issue["longitude"] - CENTER[1]) <= 0.01
+
+
+def test_queries_across_the_antimeridian(spatial_issues):
+    east, west = spatial_issues[-2:]
+    nearby = client.get("/api/issues/nearby", params={"lat": -17.0, "lon": 179.9999, "radius_m": 200}).json()
+    assert {issue["id"] for issue in nearby["issues"]} == {east, west}
+
+    bbox = client.get("/api/issues/bbox", params={
+        "min_lat": -17.1, "min_lon": 179.99, "max_lat": -16.9, "max_lon": -179.99
+    }).json()
+    assert {issue["id"] for issue in bbox["issues"]} == {east, west}
+
+
+@pytest.mark.parametrize("path,params", [
+    ("/api/issues/nearby", {"lat": 91, "lon": 0}),
+    ("/api/issues/nearby", {"lat": 0, "lon": 181}),
+    ("/api/issues/nearby", {"lat": 0, "lon": 0, "radius_m": 10_000_000}),
+    ("/api/issues/bbox", {"min_lat": 10, "min_lon": 0, "max_lat": 5, "max_lon": 1}),
+    ("/api/issues/bbox", {"min_lat": 0, "min_lon": -200, "max_lat": 5, "max_lon": 1}),
+])
+def test_invalid_coordinates_are_rejected(path, params):
+    assert client.get(path, params=params).status_code == 400
+
+
+def test_backfill_fills_missing_geohashes(spatial_issues):
+    db = SessionLocal()
+    try:
+        db.query(CivicIssue).filter(CivicIssue.id.in_(spatial_issues)).update(
+            {"geohash": None}, synchronize_session=False
+        )
+        db.commit()
+        assert backfill_geohashes(db, batch_size=7) >= len(spatial_issues)
+        missing = db.query(CivicIssue).filter(
+            CivicIssue.id.in_(spatial_issues), CivicIssue.geohash.is_(None)
+        ).count()
+        assert missing == 0
+    finally:
+        db.close()
@@ -0,0 +1,78 @@
+import io
+from PIL import Image
+from utils.image_processing import (
+    derived_image_path,
+    load_or_create_derived,
+    preprocess_image,
+    sniff_mime_type
+)
+
+def encode(img, fmt="JPEG", **kwargs):
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **kwargs)
+    return buffer.getvalue()
+
+def test_downscales_large_photo():
+    original = encode(Image.effect_noise((2400, 1800), 64).convert("RGB"), quality=95)
+    processed, mime = preprocess_image(original, max_dimension=1024)
+    
+    assert mime == "image/jpeg"
+    assert len(processed) < len(original)
+    with Image.open(io.BytesIO(processed)) as img:
+        assert max(img.size) == 1024
+
+def test_applies_exif_orientation_and_strips_metadata():
+    img = Image.new("RGB", (400, 200), color="blue")
+    exif = img.getexif()
+    exif[0x0112] = 6  # rotated 90 degrees clockwise
+    exif[0x010F] = "PhoneMaker"
+    original = encode(img, exif=exif)
+    
+    processed, _ = preprocess_image(original, max_dimension=1024)
+    with Image.open(io.BytesIO(processed)) as out:
+        assert out.size == (200, 400)
+        assert not out.getexif()
+
+def test_png_with_alpha_is_reencoded_with_correct_mime():
+    img = Image.effect_noise((1000, 900), 64).convert("RGBA")
+    processed, mime = preprocess_image(encode(img, fmt="PNG"), max_dimension=800, output_format="WEBP")
+    
+    assert mime == "image/webp"
+    assert sniff_mime_type(processed) == "image/webp"
+
+def test_small_clean_upload_is_passed_through():
+    original = encode(Image.new("RGB", (64, 64), color="red"), fmt="PNG")
+    processed, mime = preprocess_image(original)
+    
+    assert processed == original
+    assert mime == "image/png"
+
+def test_undecodable_bytes_pass_through():
+    processed, mime = preprocess_image(b"not an image")
+    assert processed == b"not an image"
+    assert mime == "image/jpeg"
+
+def test_derived_copy_is_cached_next_to_upload(tmp_path):
+    upload = tmp_path / "report.png"
+    upload.write_bytes(encode(Image.effect_noise((1000, 750), 64).convert("RGB"), fmt="PNG"))
+    
+    processed, mime = load_or_create_derived(str(upload), max_dimension=512)
+    derived = derived_image_path(str(upload), max_dimension=512)
+    
+    assert derived == tmp_path / "report.vision-512q85.jpg"
+    assert derived.read_bytes() == processed
+    assert load_or_create_derived(str(upload), max_dimension=512) == (processed, mime)
+
+def test_derived_copy_is_keyed_on_encoding_settings(tmp_path):
+    upload = tmp_path / "report.png"
+    upload.write_bytes(encode(Image.effect_noise((1000, 750), 64).convert("RGB"), fmt="PNG"))
+    
+    small, _ = load_or_create_derived(str(upload), max_dimension=256)
+    large, _ = load_or_create_derived(str(upload), max_dimension=768)
+    
+    with Image.open(io.BytesIO(small)) as img:
+        assert max(img.size) == 256
+    with Image.open(io.BytesIO(large)) as img:
+        assert max(img.size) == 768
+    assert derived_image_path(str(upload), max_dimension=256).exists()
+    assert derived_image_path(str(upload), max_dimension=768).exists()
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from database.models import CivicIssue, SessionLocal
+from database.queries import decode_cursor, encode_cursor
+
+client = TestClient(app)
+
+BASE_TIME = datetime(2030, 1, 1, 12, 0, 0)
+
+@pytest.fixture(scope="module")
+def listing_issues():
+    """25 issues in a distant-future window, two of them sharing a timestamp"""
+    db = SessionLocal()
+    rows = []
+    for i in range(25):
+        rows.append(CivicIssue(
+            reporter_name=f"Lister {i}",
+            location="Listing Street",
+            issue_type="garbage" if i % 2 else "pothole",
+            description="listing test",
+            status="reported" if i % 3 else "resolved",
+            priority="high" if i % 5 == 0 else "low",
+            assigned_agency="Listing Agency",
+            suggested_actions={"immediate_actions": ["x"] * 50},
+            created_at=BASE_TIME + timedelta(minutes=min(i, 23))
+        ))
+    db.add_all(rows)
+    db.commit()
+    ids = [row.id for row in rows]
+    db.close()
+    return ids
+
+def fetch(**params):
+    params.setdefault("assigned_agency", "Listing Agency")
+    response = client.get("/api/issues", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_keyset_pages_cover_every_row_once(listing_issues):
+    seen, cursor = [], None
+    while True:
+        page = fetch(limit=7, cursor=cursor)
+        seen.extend(issue["id"] for issue in page["issues"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    
+    assert sorted(seen) == sorted(listing_issues)
+    assert len(seen) == len(set(seen))
+    # Newest first, ties on created_at broken by id
+    assert seen[:2] == sorted(listing_issues[-2:], reverse=True)
+
+def test_filters_combine(listing_issues):
+    page = fetch(limit=100, issue_type="pothole", priority="high")
+    assert page["issues"]
+    assert all(i["issue_type"] == "pothole" and i["priority"] == "high" for i in page["issues"])
+    
+    window = fetch(
+        limit=100,
+        created_after=(BASE_TIME + timedelta(minutes=5)).isoformat(),
+        created_before=(BASE_TIME + timedelta(minutes=10)).isoformat()
+    )
+    assert len(window["issues"]) == 5
+
+def test_heavy_columns_are_projected_out(listing_issues):
+    default = fetch(limit=1)["issues"][0]
+    assert "suggested_actions" not in default
+    assert "description" in default
+    
+    narrow = fetch(limit=1, fields="id,status")["issues"][0]
+    assert set(narrow) == {"id", "status"}
+    
+    full = fetch(limit=1, fields="all")["issues"][0]
+    assert "suggested_actions" in full
+
+def test_invalid_requests_are_rejected():
+    assert client.get("/api/issues", params={"cursor": "garbage!"}).status_code == 400
+    assert client.get("/api/issues", params={"fields": "id,password"}).status_code == 400
+    assert client.get("/api/issues", params={"limit": 0}).status_code == 422
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(BASE_TIME, 42)) == (BASE_TIME, 42)
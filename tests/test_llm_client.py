@@ -0,0 +1,136 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import groq
+import pytest
+
+from utils.llm_client import CircuitBreaker, CircuitOpenError, LLMClient, build_llm_client, estimate_tokens
+from utils.rate_limit import RateLimiter
+
+MESSAGES = [{"role": "user", "content": "Summarise this civic issue"}]
+
+
+def make_client(server, monkeypatch, **overrides):
+    monkeypatch.setenv("LLM_BACKOFF_BASE", "0.01")
+    monkeypatch.setenv("LLM_TIMEOUT", "2")
+    for name, value in overrides.items():
+        monkeypatch.setenv(name, str(value))
+    return build_llm_client(base_url=server.base_url, api_key="test-key")
+
+
+def call(client):
+    return client.chat.completions.create(model="llama-3.3-70b-versatile", messages=MESSAGES, max_tokens=64)
+
+
+def test_successful_call_reuses_connection(llm_server, monkeypatch):
+    client = make_client(llm_server, monkeypatch)
+    for _ in range(3):
+        assert call(client).choices[0].message.content == "ok"
+    assert llm_server.requests == 3
+    assert len(llm_server.connections) == 1
+
+
+def test_retries_5xx_then_succeeds(llm_server, monkeypatch):
+    client = make_client(llm_server, monkeypatch)
+    llm_server.script(503, times=2)
+
+    assert call(client).choices[0].message.content == "ok"
+    assert llm_server.requests == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_honours_retry_after_on_429(llm_server, monkeypatch):
+    client = make_client(llm_server, monkeypatch)
+    llm_server.script(429, headers={"Retry-After": "0.3"})
+
+    start = time.monotonic()
+    call(client)
+    assert time.monotonic() - start >= 0.3
+    assert client.stats()["rate_limited"] == 1
+    assert client.stats()["circuit"] == "closed"
+
+
+def test_client_errors_are_not_retried(llm_server, monkeypatch):
+    client = make_client(llm_server, monkeypatch)
+    llm_server.script(400)
+
+    with pytest.raises(groq.BadRequestError):
+        call(client)
+    assert llm_server.requests == 1
+
+
+def test_timeout_is_retried(llm_server, monkeypatch):
+    client = make_client(llm_server, monkeypatch, LLM_TIMEOUT=0.3)
+    llm_server.script(200, delay=1.0)
+
+    assert call(client).choices[0].message.content == "ok"
+    assert llm_server.requests == 2
+
+
+def test_gives_up_and_opens_circuit(llm_server, monkeypatch):
+    client = make_client(llm_server, monkeypatch, LLM_MAX_RETRIES=2, LLM_CIRCUIT_FAILURES=3, LLM_CIRCUIT_RESET=60)
+    llm_server.script(500, times=3)
+
+    with pytest.raises(groq.InternalServerError):
+        call(client)
+    assert llm_server.requests == 3
+    assert client.stats()["circuit"] == "open"
+
+    # Fails fast without reaching the provider
+    with pytest.raises(CircuitOpenError):
+        call(client)
+    assert llm_server.requests == 3
+
+
+def test_agent_falls_back_when_circuit_open(llm_server, monkeypatch):
+    from agents.notification_agent import NotificationAgent
+
+    client = make_client(llm_server, monkeypatch, LLM_MAX_RETRIES=0, LLM_CIRCUIT_FAILURES=1)
+    llm_server.script(502)
+    agent = NotificationAgent()
+    agent.groq_client = client
+    issue = {"reporter_name": "A", "location": "Ward 5", "issue_type": "pothole", "description": "Hole", "severity": "high"}
+
+    assert agent.generate_notification(issue).startswith("URGENT: POTHOLE")
+    assert agent.generate_notification(issue).startswith("URGENT: POTHOLE")
+    assert llm_server.requests == 1
+
+
+def test_circuit_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_request_limit_is_shared_across_threads():
+    instant = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: None)))
+    client = LLMClient(instant, requests_per_minute=600, request_burst=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=call, args=(client,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 10 requests/second: the 2nd..4th call wait 0.1s each
+    assert time.monotonic() - start >= 0.28
+
+
+def test_token_bucket_charges_actual_usage():
+    limiter = RateLimiter(rate=100, burst=1000)
+    limiter.acquire(200)
+    limiter.adjust(900)  # the call used far more than estimated
+    assert not limiter.try_acquire(1)
+
+
+def test_estimate_tokens_counts_images():
+    messages = [{"role": "user", "content": [
+        {"type": "text", "text": "x" * 400},
+        {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,..."}}
+    ]}]
+    assert estimate_tokens(messages, max_tokens=100) == 101 + 1500 + 100
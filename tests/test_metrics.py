@@ -0,0 +1,157 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.main import app, orchestrator
+from monitoring import health_check
+from utils import metrics
+from utils.llm_client import build_llm_client
+
+client = TestClient(app)
+
+MESSAGES = [{"role": "user", "content": "Summarise this civic issue"}]
+
+
+def scrape(test_client=client):
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return metrics.parse_metrics(response.text)
+
+
+def value(samples, name, **labels):
+    return sum(
+        sample_value for sample_labels, sample_value in samples.get(name, [])
+        if all(sample_labels.get(key) == wanted for key, wanted in labels.items())
+    )
+
+
+def test_exposition_round_trips():
+    registry = metrics.Registry()
+    requests = metrics.Counter("demo_requests", "Requests", ["route"], registry=registry)
+    latency = metrics.Histogram("demo_seconds", "Latency", buckets=(0.1, 1.0), registry=registry)
+    requests.labels(route='/a"b').inc(3)
+    for seconds in (0.05, 0.5, 5):
+        latency.observe(seconds)
+
+    text = metrics.generate_latest(registry).decode()
+    assert "# TYPE demo_requests counter" in text
+    parsed = metrics.parse_metrics(text)
+    assert parsed["demo_requests_total"] == [({"route": '/a"b'}, 3.0)]
+    assert [count for _, count in parsed["demo_seconds_bucket"]] == [1.0, 2.0, 3.0]
+    assert parsed["demo_seconds_count"][0][1] == 3.0 and parsed["demo_seconds_sum"][0][1] == pytest.approx(5.55)
+    with pytest.raises(ValueError):
+        metrics.Counter("demo_requests", "Again", registry=registry)
+
+
+def test_llm_calls_record_latency_tokens_and_cost(llm_server, monkeypatch):
+    monkeypatch.setenv("LLM_BACKOFF_BASE", "0.01")
+    llm = build_llm_client(base_url=llm_server.base_url, api_key="test-key")
+    before = metrics.parse_metrics(metrics.generate_latest().decode())
+    labels = {"model": "llama-3.3-70b-versatile", "caller": "metrics_test"}
+
+    llm_server.script(503)
+    with metrics.caller("metrics_test"):
+        llm.chat.completions.create(model="llama-3.3-70b-versatile", messages=MESSAGES, max_tokens=16)
+
+    after = metrics.parse_metrics(metrics.generate_latest().decode())
+
+    def increase(name, **extra):
+        return value(after, name, **labels, **extra) - value(before, name, **labels, **extra)
+
+    assert increase("civic_llm_requests_total", outcome="ok") == 1
+    assert increase("civic_llm_requests_total", outcome="error") == 1
+    assert increase("civic_llm_request_duration_seconds_count") == 2
+    assert increase("civic_llm_tokens_total", kind="prompt") == 100
+    assert increase("civic_llm_tokens_total", kind="completion") == 50
+    assert increase("civic_llm_cost_usd_total") == pytest.approx((100 * 0.59 + 50 * 0.79) / 1_000_000)
+
+
+def test_report_records_node_http_db_and_cache_metrics(fake_groq):
+    before = scrape()
+    image = io.BytesIO()
+    Image.new("RGB", (64, 64), color=(120, 40, 200)).save(image, format="JPEG")
+    response = client.post(
+        "/api/report-issue",
+        files={"image": ("metrics.jpg", image.getvalue(), "image/jpeg")},
+        data={"reporter_name": "Metrics", "location": "Ward 3"}
+    )
+    assert response.status_code == 200, response.text
+    after = scrape()
+
+    def increase(name, **labels):
+        return value(after, name, **labels) - value(before, name, **labels)
+
+    assert increase("civic_http_requests_total", route="/api/report-issue", method="POST", status="200") == 1
+    assert increase("civic_http_request_duration_seconds_count", route="/api/report-issue") == 1
+    for node in ("detect_issue", "plan_actions", "persist_issue"):
+        assert increase("civic_node_duration_seconds_count", node=node) == 1
+    assert increase("civic_cache_lookups_total", cache="detection", result="miss") == 1
+    assert increase("civic_db_query_duration_seconds_count", operation="INSERT") >= 1
+
+    client.get("/api/issues/999999999")
+    assert value(scrape(), "civic_http_requests_total", route="/api/issues/{issue_id}", status="404") >= 1
+
+
+def test_detection_fallback_is_counted(fake_groq, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("vision model unavailable")
+
+    monkeypatch.setattr(orchestrator.detector.groq_client.chat.completions, "create", broken)
+    before = value(scrape(), "civic_fallbacks_total", agent="detection")
+    image = io.BytesIO()
+    Image.new("RGB", (32, 32), color=(1, 2, 3)).save(image, format="JPEG")
+    client.post(
+        "/api/report-issue",
+        files={"image": ("broken.jpg", image.getvalue(), "image/jpeg")},
+        data={"reporter_name": "Metrics", "location": "Ward 4"}
+    )
+    assert value(scrape(), "civic_fallbacks_total", agent="detection") == before + 1
+
+
+def test_mcp_server_exposes_metrics():
+    from mcp.server import app as mcp_app
+
+    mcp_client = TestClient(mcp_app)
+    mcp_client.get("/mcp/health")
+    samples = scrape(mcp_client)
+    assert value(samples, "civic_http_requests_total", service="mcp", route="/mcp/health") >= 1
+
+
+def _scrape_with(requests_by_status, report_latencies, llm_outcomes=None, circuit=0):
+    registry = metrics.Registry()
+    http = metrics.Counter("civic_http_requests", "", ["service", "method", "route", "status"], registry=registry)
+    latency = metrics.Histogram("civic_http_request_duration_seconds", "", ["service", "method", "route"],
+                                registry=registry)
+    llm = metrics.Counter("civic_llm_requests", "", ["model", "caller", "outcome"], registry=registry)
+    metrics.Gauge("civic_llm_circuit_open", "", registry=registry).set(circuit)
+    for status, count in requests_by_status.items():
+        http.labels("api", "GET", "/api/issues", status).inc(count)
+    for seconds in report_latencies:
+        latency.labels("api", "POST", "/api/report-issue").observe(seconds)
+    for outcome, count in (llm_outcomes or {}).items():
+        llm.labels("m", "detect_issue", outcome).inc(count)
+    return metrics.parse_metrics(metrics.generate_latest(registry).decode())
+
+
+def test_health_check_evaluates_slos_between_scrapes():
+    previous = _scrape_with({200: 100, 500: 50}, [0.2] * 10, {"ok": 100})
+    current = _scrape_with({200: 300, 500: 51}, [0.2] * 10 + [20.0] * 10, {"ok": 150, "error": 50}, circuit=1)
+
+    results = health_check.evaluate_slos(current, previous)
+    # Only the interval counts: 1 error in 201 requests, not 51 in 351
+    assert results["http_error_ratio"][0] == pytest.approx(1 / 201) and results["http_error_ratio"][2]
+    assert results["report_p95_seconds"][0] > 15 and not results["report_p95_seconds"][2]
+    assert results["llm_error_ratio"][0] == pytest.approx(0.5) and not results["llm_error_ratio"][2]
+    assert not results["llm_circuit_open"][2]
+    # Too few detections to judge
+    assert results["fallback_ratio"] == (None, health_check.SLOS["fallback_ratio"], True)
+
+
+def test_histogram_quantile_interpolates():
+    buckets = [(0.1, 50.0), (1.0, 90.0), (float("inf"), 100.0)]
+    assert health_check.histogram_quantile(0.5, buckets) == pytest.approx(0.1)
+    assert health_check.histogram_quantile(0.7, buckets) == pytest.approx(0.55)
+    assert health_check.histogram_quantile(0.99, buckets) == pytest.approx(1.0)
@@ -0,0 +1,121 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from agents.issue_detector import IssueDetectorAgent, merge_detections
+from app import main
+from app.main import app
+from benchmarks.fake_groq import FakeGroq
+
+client = TestClient(app)
+
+
+def jpeg(color):
+    image = io.BytesIO()
+    Image.new("RGB", (48, 48), color=color).save(image, format="JPEG")
+    return image.getvalue()
+
+
+def photo_paths(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"angle_{i}.jpg"
+        path.write_bytes(jpeg((40 * i, 80, 120)))
+        paths.append(str(path))
+    return paths
+
+
+def test_merge_detections_votes_by_confidence():
+    merged = merge_detections([
+        {"issue_detected": True, "issue_type": "pothole", "severity": "medium", "confidence": 0.9},
+        {"issue_detected": True, "issue_type": "pothole", "severity": "high", "confidence": 0.6},
+        {"issue_detected": True, "issue_type": "garbage", "severity": "low", "confidence": 0.8},
+        {"issue_detected": False, "issue_type": "none", "severity": "low", "confidence": 0.0, "fallback": True}
+    ])
+
+    assert merged["issue_type"] == "pothole" and merged["severity"] == "high"
+    assert merged["images_agreeing"] == 2
+    assert merged["confidence"] == pytest.approx((0.9 + 0.6) / 3)
+
+
+def test_merge_detections_confident_negatives_win():
+    merged = merge_detections([
+        {"issue_detected": True, "issue_type": "garbage", "confidence": 0.4},
+        {"issue_detected": False, "issue_type": "none", "confidence": 0.9},
+        {"issue_detected": False, "issue_type": "none", "confidence": 0.8}
+    ])
+    assert merged["issue_detected"] is False and merged["images_agreeing"] == 2
+
+
+def test_batch_mode_sends_every_photo_in_one_request(tmp_path):
+    detector = IssueDetectorAgent()
+    detector.multi_image_mode = "batch"
+    detector.groq_client = FakeGroq()
+    sent = []
+    create = detector.groq_client.create
+
+    def capture(model, messages, **kwargs):
+        sent.append(messages[0]["content"])
+        return create(model, messages, **kwargs)
+
+    detector.groq_client.chat.completions.create = capture
+    first, *others = photo_paths(tmp_path, 3)
+    result = detector.detect_issue(first, extra_images=[(path, None) for path in others])
+
+    assert len(sent) == 1 and result["model_calls"] == 1
+    assert sum(part["type"] == "image_url" for part in sent[0]) == 3
+    assert "3 photos show the same incident" in sent[0][0]["text"]
+
+
+def test_vote_mode_asks_once_per_photo(tmp_path):
+    detector = IssueDetectorAgent()
+    detector.multi_image_mode = "vote"
+    detector.groq_client = FakeGroq()
+    first, *others = photo_paths(tmp_path, 3)
+
+    result = detector.detect_issue(first, extra_images=[(path, None) for path in others])
+
+    assert detector.groq_client.calls == ["detection"] * 3
+    assert result["model_calls"] == 3 and result["images_agreeing"] == 3
+
+
+def test_report_with_several_photos_stores_them_in_order(fake_groq):
+    photos = [jpeg((200, 30 * i, 10)) for i in range(3)]
+    response = client.post(
+        "/api/report-issue",
+        files=[("image", (f"angle_{i}.jpg", photo, "image/jpeg")) for i, photo in enumerate(photos)],
+        data={"reporter_name": "Multi", "location": "Ward 4"}
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["metadata"]["images"] == 3
+    assert body["metadata"]["llm_calls"]["detect_issue"] == 1
+    assert fake_groq.calls.count("detection") == 1
+
+    issue = client.get(f"/api/issues/{body['issue_id']}").json()
+    assert len(issue["images"]) == 3
+    assert issue["images"][0] == issue["image_path"]
+    assert len(set(issue["images"])) == 3
+
+
+def test_single_photo_issue_lists_its_image(fake_groq):
+    response = client.post(
+        "/api/report-issue",
+        files={"image": ("one.jpg", jpeg((10, 200, 10)), "image/jpeg")},
+        data={"reporter_name": "Single", "location": "Ward 5"}
+    )
+    issue = client.get(f"/api/issues/{response.json()['issue_id']}").json()
+    assert issue["images"] == [issue["image_path"]]
+
+
+def test_too_many_photos_are_rejected(fake_groq, monkeypatch):
+    monkeypatch.setattr(main, "MAX_IMAGES_PER_REPORT", 2)
+    response = client.post(
+        "/api/report-issue",
+        files=[("image", (f"{i}.jpg", jpeg((i, i, i)), "image/jpeg")) for i in range(3)],
+        data={"reporter_name": "Many", "location": "Ward 6"}
+    )
+    assert response.status_code == 400
+    assert fake_groq.calls == []
@@ -0,0 +1,142 @@
+import io
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from agents.notification_templates import NotificationTemplates
+from app.main import app, orchestrator
+from database.models import Agency, Notification, NotificationTemplate, SessionLocal
+
+client = TestClient(app)
+
+ISSUE = {
+    "reporter_name": "Asha",
+    "location": "MI Road",
+    "latitude": 26.9124,
+    "longitude": 75.7873,
+    "issue_type": "pothole",
+    "description": "Deep pothole near the bus stop",
+    "severity": "high"
+}
+AGENCY = {"agency_id": 1, "agency_name": "Public Works Department", "email": "pwd@example.gov", "phone": "1"}
+
+
+@pytest.fixture
+def template_file(tmp_path):
+    path = tmp_path / "notifications.json"
+    path.write_text(json.dumps({
+        "default": "{severity_label} {issue_label} at {location}{coordinates}: {action_required}",
+        "issue_types": {"water_leak": "Leak at {location}"},
+        "agencies": {"Public Works Department": {"pothole": "PWD pothole at {location} {unknown_field}"}}
+    }))
+    return path
+
+
+def test_most_specific_template_wins(template_file):
+    templates = NotificationTemplates(path=template_file, session_factory=None)
+
+    assert templates.render(ISSUE, AGENCY) == "PWD pothole at MI Road"
+    assert templates.render({**ISSUE, "issue_type": "water_leak"}, AGENCY) == "Leak at MI Road"
+    assert templates.render({**ISSUE, "issue_type": "garbage"}, None) == (
+        "HIGH Garbage at MI Road (26.91240, 75.78730): Respond within 24 hours"
+    )
+
+
+def test_database_templates_override_file(template_file):
+    db = SessionLocal()
+    db.add(NotificationTemplate(agency_name=None, issue_type="water_leak", template="DB leak at {location}"))
+    db.add(NotificationTemplate(agency_name=None, issue_type="garbage", template="Broken {location"))
+    db.commit()
+    try:
+        templates = NotificationTemplates(path=template_file)
+        assert templates.render({**ISSUE, "issue_type": "water_leak"}) == "DB leak at MI Road"
+        # The malformed template is skipped in favour of the default
+        assert templates.render({**ISSUE, "issue_type": "garbage"}).startswith("HIGH Garbage")
+    finally:
+        db.query(NotificationTemplate).delete()
+        db.commit()
+        db.close()
+
+
+def test_shipped_templates_render():
+    templates = NotificationTemplates(session_factory=None)
+    message = templates.render({**ISSUE, "issue_type": "accident", "severity": "critical"}, AGENCY)
+    assert message.startswith("[CRITICAL] Accident reported at MI Road")
+    assert "Immediate dispatch required" in message
+
+
+@pytest.fixture
+def pothole_agency():
+    db = SessionLocal()
+    if not db.query(Agency).filter(Agency.name == "Test Works Department").first():
+        db.add(Agency(name="Test Works Department", department="Infrastructure", email="works@test.gov",
+                      phone="+91-141-0000000", issue_types=["pothole"]))
+        db.commit()
+    db.close()
+
+
+def report(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (60, 60), color=color).save(buffer, format='JPEG')
+    buffer.seek(0)
+    return client.post(
+        "/api/report-issue",
+        files={"image": ("test.jpg", buffer, "image/jpeg")},
+        data={"reporter_name": "Test User", "location": "Test Location"}
+    ).json()
+
+
+def stored_message(issue_id):
+    db = SessionLocal()
+    try:
+        return db.query(Notification).filter(Notification.issue_id == issue_id).one().message
+    finally:
+        db.close()
+
+
+def test_hybrid_mode_uses_template_without_llm(fake_groq, pothole_agency, monkeypatch):
+    monkeypatch.setattr(orchestrator.notifier, "mode", "hybrid")
+    data = report('orange')
+
+    assert "send_notification" not in data["metadata"]["llm_calls"]
+    assert "notification" not in fake_groq.calls
+    assert stored_message(data["issue_id"]).startswith("[HIGH] Pothole reported at Test Location")
+
+
+def test_hybrid_mode_polishes_critical_in_background(fake_groq, pothole_agency, monkeypatch):
+    monkeypatch.setattr(orchestrator.notifier, "mode", "hybrid")
+    fake_groq.detection = {**fake_groq.detection, "severity": "critical"}
+    data = report('brown')
+
+    assert "send_notification" not in data["metadata"]["llm_calls"]
+    deadline = time.time() + 5
+    while stored_message(data["issue_id"]) != fake_groq.notification and time.time() < deadline:
+        time.sleep(0.05)
+    assert stored_message(data["issue_id"]) == fake_groq.notification
+    assert fake_groq.calls.count("notification") == 1
+    # The polish releases the row it held back in the outbox
+    db = SessionLocal()
+    try:
+        row = db.query(Notification).filter(Notification.issue_id == data["issue_id"]).one()
+        assert row.status == "pending" and row.next_attempt_at is None
+    finally:
+        db.close()
+
+
+def test_critical_notification_is_not_held_for_polish(fake_groq, pothole_agency, monkeypatch):
+    monkeypatch.setattr(orchestrator.notifier, "mode", "hybrid")
+    fake_groq.detection = {**fake_groq.detection, "severity": "critical"}
+    fake_groq.latency = {"notification": 0.5}
+    data = report('maroon')
+
+    # Due for delivery right away, with the template wording until the polish lands
+    db = SessionLocal()
+    try:
+        row = db.query(Notification).filter(Notification.issue_id == data["issue_id"]).one()
+        assert row.next_attempt_at is None
+        assert row.message.startswith("[CRITICAL]")
+    finally:
+        db.close()
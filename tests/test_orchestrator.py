@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from PIL import Image
+
+from agents.orchestrator import CivicAgentOrchestrator
+from benchmarks.fake_groq import FakeGroq
+from database.models import Agency, SessionLocal
+
+
+@pytest.fixture
+def image_file(tmp_path):
+    path = tmp_path / "report.jpg"
+    Image.new('RGB', (64, 64), color='gray').save(path, format='JPEG')
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def pothole_agency():
+    db = SessionLocal()
+    if not db.query(Agency).filter(Agency.name == "Test Works Department").first():
+        db.add(Agency(
+            name="Test Works Department",
+            department="Infrastructure",
+            email="works@test.gov",
+            phone="+91-141-0000000",
+            issue_types=["pothole"]
+        ))
+        db.commit()
+    db.close()
+
+
+def make_orchestrator(parallel, fake):
+    orchestrator = CivicAgentOrchestrator(parallel=parallel)
+    orchestrator.detection_cache = None
+    orchestrator.planner.cache = None
+    orchestrator.notifier.mode = "llm"
+    for agent in (orchestrator.detector, orchestrator.planner, orchestrator.notifier):
+        agent.groq_client = fake
+    return orchestrator
+
+
+def initial_state(image_path):
+    return {
+        "image_path": image_path,
+        "audio_text": None,
+        "reporter_name": "Test User",
+        "location": "Test Location",
+        "latitude": None,
+        "longitude": None,
+        "issue_id": None,
+        "llm_calls": {},
+        "node_timings": {}
+    }
+
+
+def test_parallel_graph_matches_sequential(image_file):
+    """Both graph shapes persist the same issue with the same LLM calls"""
+    results = []
+    for parallel in (False, True):
+        fake = FakeGroq()
+        result = make_orchestrator(parallel, fake).process(initial_state(image_file))
+        assert sorted(fake.calls) == ["actions", "detection", "notification"]
+        results.append(result)
+
+    sequential, parallel = results
+    for key in ("issue_type", "severity", "suggested_actions", "agency_data", "notification_message", "llm_calls"):
+        assert sequential[key] == parallel[key]
+    assert parallel["notification_sent"] is True
+    assert parallel["issue_id"] and parallel["issue_id"] != sequential["issue_id"]
+
+
+def test_branches_overlap(image_file):
+    """Planning and notification drafting run in the same superstep after detection"""
+    fake = FakeGroq(latency={"actions": 0.3, "notification": 0.3})
+    orchestrator = make_orchestrator(True, fake)
+
+    start = time.perf_counter()
+    result = orchestrator.process(initial_state(image_file))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.55
+    assert result["node_timings"]["plan_actions"] >= 300
+    assert result["node_timings"]["send_notification"] >= 300
+
+
+def test_node_timings_recorded(image_file):
+    result = make_orchestrator(True, FakeGroq()).process(initial_state(image_file), on_progress=lambda node: None)
+
+    assert set(result["node_timings"]) == {
+        "detect_issue", "cluster_incident", "plan_actions", "route_notification", "send_notification", "persist_issue"
+    }
+
+
+def test_no_issue_skips_branches(image_file):
+    fake = FakeGroq(responses={"detection": {
+        "issue_detected": False,
+        "issue_type": "none",
+        "severity": "low",
+        "description": "Nothing here",
+        "confidence": 0.1
+    }})
+    result = make_orchestrator(True, fake).process(initial_state(image_file))
+
+    assert fake.calls == ["detection"]
+    assert set(result["node_timings"]) == {"detect_issue", "persist_issue"}
@@ -0,0 +1,144 @@
+import io
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from agents.executor import AgentExecutor, ExecutorSaturatedError
+from agents.triage import triage_priority
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("audio_text, priority", [
+    (None, "normal"),
+    ("There is a road here", "normal"),
+    ("Bike accident, two people injured", "critical"),
+    ("Fire near the garbage dump", "critical"),
+    ("Sewage overflow on the street", "high"),
+    ("Garbage not picked up for a week", "low"),
+    ("Yahan bahut kachra pada hai", "low"),
+    ("Man electrocuted by a live wire", "critical"),
+    # Words that merely start with a keyword are not that keyword
+    ("aage ek gaddha hai", "high"),
+    ("Deadline passed for garbage pickup", "low"),
+    ("pothole on the firewood market road", "normal"),
+    ("The gunny bags are blocking the road", "normal")
+])
+def test_triage_from_audio_keywords(audio_text, priority):
+    assert triage_priority(audio_text) == priority
+
+
+def test_critical_reports_meet_latency_target_under_saturation():
+    """A critical report waits for one running job, not for the backlog ahead of it"""
+    executor = AgentExecutor(max_workers=2, max_in_flight=60)
+    job_seconds = 0.05
+
+    def work():
+        time.sleep(job_seconds)
+
+    backlog = [executor.submit(work, priority=priority) for priority in ("low", "normal") * 20]
+    time.sleep(0.02)
+
+    latencies = []
+    for _ in range(3):
+        start = time.monotonic()
+        executor.submit(work, priority="critical").result(timeout=10)
+        latencies.append(time.monotonic() - start)
+
+    # FIFO would put each behind ~40 jobs / 2 workers * 50ms = 1s of work
+    assert max(latencies) < 4 * job_seconds
+    assert sum(not future.done() for future in backlog) > 20
+    stats = executor.stats()
+    assert stats["classes"]["critical"]["wait_p95_ms"] < 2 * job_seconds * 1000
+    assert stats["classes"]["low"]["queued"] > 0
+    executor.shutdown()
+    assert all(future.done() for future in backlog)
+
+
+def test_class_limits_keep_workers_for_higher_classes():
+    executor = AgentExecutor(max_workers=4, max_in_flight=20, class_limits={"low": 1})
+    lock = threading.Lock()
+    running, peak = [0], [0]
+    release = threading.Event()
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+
+    low = [executor.submit(work, priority="low") for _ in range(5)]
+    time.sleep(0.05)
+    high = executor.submit(lambda: "served", priority="high")
+    assert high.result(timeout=5) == "served"
+    low_stats = executor.stats()["classes"]["low"]
+    assert (low_stats["running"], low_stats["queued"]) == (1, 4)
+    release.set()
+    for future in low:
+        future.result(timeout=5)
+    assert peak[0] == 1
+    executor.shutdown()
+
+
+def test_aging_prevents_starvation():
+    executor = AgentExecutor(max_workers=1, max_in_flight=10, aging_seconds=0.01)
+    release = threading.Event()
+    order = []
+    blocker = executor.submit(release.wait, 5, priority="critical")
+
+    executor.submit(order.append, "low", priority="low")
+    time.sleep(0.2)  # the low job ages past weight 8 while the worker is busy
+    executor.submit(order.append, "critical", priority="critical")
+    release.set()
+    blocker.result(timeout=5)
+    executor.shutdown()
+    assert order == ["low", "critical"]
+
+
+def test_critical_reserve_admits_critical_when_full():
+    executor = AgentExecutor(max_workers=1, max_in_flight=2, critical_reserve=1)
+    release = threading.Event()
+    futures = [executor.submit(release.wait, 5, priority="low") for _ in range(2)]
+    with pytest.raises(ExecutorSaturatedError):
+        executor.submit(release.wait, 5, priority="normal")
+    futures.append(executor.submit(release.wait, 5, priority="critical"))
+    with pytest.raises(ExecutorSaturatedError):
+        executor.submit(release.wait, 5, priority="critical")
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    executor.shutdown()
+
+
+def test_no_critical_reserve_by_default(monkeypatch):
+    monkeypatch.delenv("SCHEDULER_CRITICAL_RESERVE", raising=False)
+    executor = AgentExecutor(max_workers=1, max_in_flight=1)
+    release = threading.Event()
+    future = executor.submit(release.wait, 5, priority="low")
+    with pytest.raises(ExecutorSaturatedError):
+        executor.submit(release.wait, 5, priority="critical")
+    release.set()
+    future.result(timeout=5)
+    executor.shutdown()
+
+
+def test_report_is_scheduled_with_triaged_priority(fake_groq):
+    image = io.BytesIO()
+    Image.new("RGB", (48, 48), color=(200, 10, 10)).save(image, format="JPEG")
+    response = client.post(
+        "/api/report-issue",
+        files={"image": ("crash.jpg", image.getvalue(), "image/jpeg")},
+        data={"reporter_name": "Triage", "location": "Ward 9", "audio_text": "Car accident, man bleeding"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["metadata"]["priority"] == "critical"
+
+    stats = client.get("/api/scheduler/stats").json()
+    assert stats["classes"]["critical"]["wait_p50_ms"] is not None
+    assert set(stats["classes"]) == {"critical", "high", "normal", "low"}
@@ -0,0 +1,75 @@
+from fastapi.testclient import TestClient
+from app.main import app, stats_cache
+from database.models import CivicIssue, IssueStat, SessionLocal
+from database.stats import read_issue_stats, rebuild_issue_stats
+
+client = TestClient(app)
+
+def snapshot():
+    db = SessionLocal()
+    try:
+        return read_issue_stats(db)
+    finally:
+        db.close()
+
+def rebuilt():
+    db = SessionLocal()
+    try:
+        rebuild_issue_stats(db)
+        return read_issue_stats(db)
+    finally:
+        db.close()
+
+def test_summary_tracks_inserts_updates_and_deletes():
+    rebuilt()
+    before = snapshot()
+    
+    db = SessionLocal()
+    issue = CivicIssue(
+        reporter_name="Stats",
+        location="Stats Lane",
+        status="processing"
+    )
+    db.add(issue)
+    db.commit()
+    
+    after_insert = snapshot()
+    assert after_insert["total"] == before["total"] + 1
+    assert after_insert["by_status"]["processing"] == before["by_status"].get("processing", 0) + 1
+    
+    issue.status = "reported"
+    issue.priority = "critical"
+    issue.issue_type = "water_leak"
+    issue.assigned_agency = "Stats Agency"
+    db.commit()
+    
+    after_update = snapshot()
+    assert after_update["by_status"].get("processing", 0) == before["by_status"].get("processing", 0)
+    assert after_update["by_priority"]["critical"] == before["by_priority"].get("critical", 0) + 1
+    assert after_update["by_agency"]["Stats Agency"] == 1
+    # Incremental maintenance agrees with a full GROUP BY recount
+    assert after_update == rebuilt()
+    
+    db.delete(issue)
+    db.commit()
+    db.close()
+    assert snapshot() == before
+
+def test_stats_endpoint():
+    stats_cache.clear()
+    response = client.get("/api/stats")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"total", "by_status", "by_priority", "by_issue_type", "by_agency"}
+    assert data["total"] == snapshot()["total"]
+
+def test_total_is_derived_from_status_rows():
+    data = rebuilt()
+    db = SessionLocal()
+    try:
+        assert db.query(IssueStat).filter(IssueStat.dimension == "total").count() == 0
+        assert data["total"] == db.query(CivicIssue).count()
+    finally:
+        db.close()
+    assert data["total"] == sum(data["by_status"].values())
@@ -0,0 +1,154 @@
+import json
+import random
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from agents.action_planner import FALLBACK_ACTIONS, ActionPlannerAgent
+from agents.issue_detector import IssueDetectorAgent
+from benchmarks.fake_groq import ACTIONS, DETECTION, FakeGroqServer, malform
+from utils import metrics
+from utils.llm_client import build_llm_client
+from utils.structured_output import (
+    ActionPlanOutput,
+    DetectionOutput,
+    StructuredOutputError,
+    complete_structured,
+    parse_structured,
+    repair_json
+)
+
+
+class ScriptedClient:
+    """Answers each call with the next scripted text; an exception in the script is raised"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.requests = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        with self._lock:
+            self.requests.append(request)
+            answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        )
+
+
+def outcomes(schema):
+    samples = metrics.parse_metrics(metrics.generate_latest().decode()).get("civic_llm_structured_outputs_total", [])
+    return {labels["outcome"]: value for labels, value in samples if labels["schema"] == schema}
+
+
+@pytest.mark.parametrize("kind", ["fenced", "prose", "trailing_comma", "truncated"])
+@pytest.mark.parametrize("schema, payload", [(DetectionOutput, DETECTION), (ActionPlanOutput, ACTIONS)])
+def test_common_malformations_are_repaired_locally(kind, schema, payload):
+    raw = malform(json.dumps(payload), random.Random(3), kind)
+    with pytest.raises(ValueError):
+        json.loads(raw)
+
+    result = parse_structured(raw, schema)
+
+    if kind == "truncated":
+        first = next(iter(payload))
+        assert result[first] == payload[first]
+    else:
+        assert result == schema.model_validate(payload).model_dump()
+
+
+def test_repair_cuts_truncated_output_back_to_complete_members():
+    assert json.loads(repair_json('{"issue_detected": true, "issue_type": "pothole", "sev')) == {
+        "issue_detected": True, "issue_type": "pothole"
+    }
+    assert json.loads(repair_json('{"immediate_actions": ["Barricade", "Fill the')) == {
+        "immediate_actions": ["Barricade", "Fill the"]
+    }
+
+
+def test_unrepairable_or_invalid_responses_raise():
+    with pytest.raises(StructuredOutputError):
+        parse_structured("I'm sorry, I can't help with that.", DetectionOutput)
+    with pytest.raises(StructuredOutputError):
+        parse_structured('{"issue_type": "pothole"}', DetectionOutput)
+    with pytest.raises(StructuredOutputError):
+        parse_structured('{"immediate_actions": []}', ActionPlanOutput)
+    with pytest.raises(StructuredOutputError):
+        parse_structured('```json\n{"issue_detected": true,}\n```', DetectionOutput, repair=False)
+
+
+def test_retries_only_when_repair_fails():
+    before = outcomes("DetectionOutput")
+    client = ScriptedClient("Here you go: " + json.dumps(DETECTION) + ",", "no json here", json.dumps(DETECTION))
+
+    repaired, _, calls = complete_structured(client, DetectionOutput, model="m", messages=[])
+    assert calls == 1 and repaired["issue_type"] == "pothole"
+    assert client.requests[0]["response_format"] == {"type": "json_object"}
+
+    result, response, calls = complete_structured(client, DetectionOutput, model="m", messages=[])
+    assert calls == 2 and result["severity"] == "high" and response.usage.total_tokens == 15
+
+    after = outcomes("DetectionOutput")
+    for outcome, expected in (("valid", 1), ("repaired", 1), ("invalid", 1)):
+        assert after.get(outcome, 0) - before.get(outcome, 0) == expected
+
+
+def test_gives_up_after_parse_retries():
+    client = ScriptedClient("nope", "still nope")
+    with pytest.raises(StructuredOutputError) as error:
+        complete_structured(client, ActionPlanOutput, retries=1, model="m", messages=[])
+    assert error.value.attempts == 2 and client.answers == []
+
+
+def test_json_mode_rejection_is_repaired_from_failed_generation():
+    class BadRequest(Exception):
+        status_code = 400
+        body = {"error": {"code": "json_validate_failed", "failed_generation": '{"issue_detected": false,}'}}
+
+    client = ScriptedClient(BadRequest("json_validate_failed"))
+    result, response, calls = complete_structured(client, DetectionOutput, model="m", messages=[])
+    assert result["issue_detected"] is False and response is None and calls == 1
+
+
+def test_planner_uses_repaired_plan_and_falls_back_after_retries():
+    planner = ActionPlannerAgent()
+    planner.cache = None
+    planner.groq_client = ScriptedClient("```json\n" + json.dumps(ACTIONS) + "\n```")
+    actions, cached, _ = planner.plan("pothole", "Pothole on the road", "high")
+    assert actions["immediate_actions"] == ACTIONS["immediate_actions"] and not cached
+
+    planner.groq_client = ScriptedClient("refused", "refused again")
+    actions, _, _ = planner.plan("pothole", "Pothole on the road", "high")
+    assert actions == FALLBACK_ACTIONS and planner.groq_client.answers == []
+
+
+def test_detector_counts_parse_retries_as_model_calls(tmp_path):
+    from PIL import Image
+
+    path = tmp_path / "road.jpg"
+    Image.new("RGB", (64, 64), color=(70, 70, 70)).save(path, format="JPEG")
+    detector = IssueDetectorAgent()
+    detector.cascade = False
+    detector.groq_client = ScriptedClient("I cannot tell.", json.dumps(DETECTION))
+
+    result = detector.detect_issue(str(path))
+
+    assert result["issue_type"] == "pothole" and result["model_calls"] == 2
+
+
+def test_fake_server_malformed_rate():
+    fake = FakeGroqServer(malformed_rate=1.0, seed=5)
+    try:
+        llm = build_llm_client(base_url=fake.base_url, api_key="test-key")
+        messages = [{"role": "user", "content": "Provide actionable suggestions for this pothole"}]
+        content = llm.chat.completions.create(model="m", messages=messages).choices[0].message.content
+        with pytest.raises(ValueError):
+            json.loads(content)
+        assert fake.stats()["malformed"] == 1
+    finally:
+        fake.close()
@@ -0,0 +1,150 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from database.grid import read_tile, rebuild_issue_grid, tile_precision
+from database.models import CivicIssue, IssueGridCount, SessionLocal
+from utils import geo
+
+client = TestClient(app)
+
+ZOOM = 14
+
+
+@pytest.fixture
+def spot():
+    """A tile no other test reports in, and a point near its centre"""
+    lat, lon = random.uniform(60, 65), random.uniform(-150, -140)
+    x, y = geo.lat_lon_to_tile(lat, lon, ZOOM)
+    min_lat, min_lon, max_lat, max_lon = geo.tile_bbox(ZOOM, x, y)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2, x, y
+
+
+def add_issues(lat, lon, issue_types, **fields):
+    db = SessionLocal()
+    rows = [
+        CivicIssue(**{"reporter_name": "Heat", "location": "Alaska", "latitude": lat, "longitude": lon,
+                      "issue_type": issue_type, "status": "reported", **fields})
+        for issue_type in issue_types
+    ]
+    db.add_all(rows)
+    db.commit()
+    ids = [row.id for row in rows]
+    db.close()
+    return ids
+
+
+def tile(x, y, z=ZOOM, **params):
+    response = client.get(f"/api/tiles/{z}/{x}/{y}", params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_counts_are_maintained_on_insert(spot):
+    lat, lon, x, y = spot
+    add_issues(lat, lon, ["pothole", "pothole", "garbage"])
+
+    data = tile(x, y).json()
+    assert data["total"] == 3
+    assert data["precision"] == tile_precision(ZOOM)
+    [cell] = data["cells"]
+    assert cell["by_type"] == {"pothole": 2, "garbage": 1}
+    assert geo.encode(lat, lon).startswith(cell["geohash"])
+
+    assert tile(x, y, issue_type="garbage").json()["total"] == 1
+    # The same issues show up, coarser, on every zoom level, in the tile holding their cell's centre
+    for z in (3, 8, 11):
+        min_lat, min_lon, max_lat, max_lon = geo.decode_bbox(geo.encode(lat, lon, tile_precision(z)))
+        zx, zy = geo.lat_lon_to_tile((min_lat + max_lat) / 2, (min_lon + max_lon) / 2, z)
+        assert tile(zx, zy, z=z, issue_type="pothole").json()["total"] >= 2
+
+
+def test_updates_and_deletes_move_counts(spot):
+    lat, lon, x, y = spot
+    pothole, garbage = add_issues(lat, lon, ["pothole", "garbage"])
+
+    db = SessionLocal()
+    db.query(CivicIssue).filter(CivicIssue.id == pothole).one().issue_type = "water_leak"
+    db.commit()
+    db.query(CivicIssue).filter(CivicIssue.id == garbage).one().status = "duplicate"
+    db.commit()
+    assert tile(x, y).json()["cells"][0]["by_type"] == {"water_leak": 1}
+
+    issue = db.query(CivicIssue).filter(CivicIssue.id == pothole).one()
+    issue.latitude += 1.0
+    db.commit()
+    assert tile(x, y).json()["total"] == 0
+    db.delete(issue)
+    db.commit()
+    db.close()
+    far_x, far_y = geo.lat_lon_to_tile(lat + 1.0, lon, ZOOM)
+    assert tile(far_x, far_y).json()["total"] == 0
+
+
+def test_placeholder_rows_count_once_classified(spot):
+    lat, lon, x, y = spot
+    [issue_id] = add_issues(lat, lon, [None])
+    assert tile(x, y).json()["total"] == 0
+
+    db = SessionLocal()
+    issue = db.query(CivicIssue).filter(CivicIssue.id == issue_id).one()
+    issue.issue_type = "pothole"
+    db.commit()
+    db.close()
+    assert tile(x, y).json()["total"] == 1
+
+
+def test_day_range_filter(spot):
+    lat, lon, x, y = spot
+    add_issues(lat, lon, ["pothole"], created_at=datetime.utcnow() - timedelta(days=10))
+    add_issues(lat, lon, ["pothole"])
+
+    today = date.today()
+    assert tile(x, y).json()["total"] == 2
+    assert tile(x, y, since=(today - timedelta(days=2)).isoformat()).json()["total"] == 1
+    assert tile(x, y, until=(today - timedelta(days=5)).isoformat()).json()["total"] == 1
+
+
+def test_etag_and_last_modified(spot):
+    lat, lon, x, y = spot
+    add_issues(lat, lon, ["pothole"])
+    first = tile(x, y)
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    assert client.get(f"/api/tiles/{ZOOM}/{x}/{y}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/api/tiles/{ZOOM}/{x}/{y}", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    add_issues(lat, lon, ["garbage"])
+    second = client.get(f"/api/tiles/{ZOOM}/{x}/{y}", headers={"If-None-Match": etag})
+    assert second.status_code == 200 and second.headers["etag"] != etag
+    assert second.json()["total"] == 2
+
+
+def test_rebuild_matches_incremental_counts(spot):
+    lat, lon, x, y = spot
+    add_issues(lat, lon, ["pothole", "garbage", "garbage"])
+    add_issues(lat + 0.001, lon + 0.001, ["accident"], status="duplicate")
+    db = SessionLocal()
+    try:
+        area = geo.encode(lat, lon, 3)
+
+        def snapshot():
+            rows = db.query(IssueGridCount).filter(
+                IssueGridCount.count > 0, IssueGridCount.cell.startswith(area)
+            ).all()
+            return {(r.precision, r.cell, r.issue_type, r.day): r.count for r in rows}
+
+        incremental = snapshot()
+        rebuild_issue_grid(db)
+        assert snapshot() == incremental
+        assert read_tile(db, ZOOM, x, y)["total"] == 3
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("path", ["/api/tiles/3/8/0", "/api/tiles/23/0/0", "/api/tiles/2/1/1?since=2024-02-01&until=2024-01-01"])
+def test_invalid_tiles_are_rejected(path):
+    assert client.get(path).status_code == 400
@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+import io
+import pytest
+from PIL import Image
+from fastapi.testclient import TestClient
+from utils.uploads import InvalidImageError, UploadTooLargeError, save_upload
+import app.main as main
+
+client = TestClient(main.app)
+
+class FakeUpload:
+    def __init__(self, data):
+        self._buffer = io.BytesIO(data)
+    
+    async def read(self, size=-1):
+        return self._buffer.read(size)
+
+def png_bytes(size=(320, 240), color="green"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color=color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def save(data, tmp_path, **kwargs):
+    kwargs.setdefault("max_bytes", 10 * 1024 * 1024)
+    return asyncio.run(save_upload(FakeUpload(data), tmp_path, chunk_size=1024, **kwargs))
+
+def test_upload_is_content_addressed(tmp_path):
+    data = png_bytes()
+    saved = save(data, tmp_path)
+    
+    assert saved.sha256 == hashlib.sha256(data).hexdigest()
+    assert saved.path == tmp_path / f"{saved.sha256}.png"
+    assert saved.path.read_bytes() == data
+    assert saved.data == data
+    assert (saved.width, saved.height) == (320, 240)
+    assert saved.content_type == "image/png"
+
+def test_identical_uploads_share_one_file(tmp_path):
+    first = save(png_bytes(), tmp_path)
+    second = save(png_bytes(), tmp_path)
+    other = save(png_bytes(color="red"), tmp_path)
+    
+    assert first.path == second.path
+    assert other.path != first.path
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted({first.path.name, other.path.name})
+
+def test_oversized_upload_is_rejected_and_cleaned_up(tmp_path):
+    with pytest.raises(UploadTooLargeError):
+        save(png_bytes(size=(800, 600)), tmp_path, max_bytes=512)
+    assert list(tmp_path.iterdir()) == []
+
+def test_pixel_limit(tmp_path):
+    with pytest.raises(UploadTooLargeError):
+        save(png_bytes(size=(400, 400)), tmp_path, max_pixels=100 * 100)
+
+def test_non_image_is_rejected(tmp_path):
+    with pytest.raises(InvalidImageError):
+        save(b"definitely not an image" * 100, tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+def test_api_rejects_large_content_length(monkeypatch):
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 1024)
+    response = client.post(
+        "/api/report-issue",
+        files={"image": ("big.png", png_bytes(size=(1000, 1000)) * 50, "image/png")},
+        data={"reporter_name": "Test User", "location": "Test Location"}
+    )
+    assert response.status_code == 413
+
+def test_api_rejects_non_image(fake_groq):
+    response = client.post(
+        "/api/report-issue",
+        files={"image": ("notes.txt", b"hello" * 100, "text/plain")},
+        data={"reporter_name": "Test User", "location": "Test Location"}
+    )
+    assert response.status_code == 400
+    assert fake_groq.calls == []
@@ -0,0 +1,141 @@
+import math
+from typing import List, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: i for i, char in enumerate(BASE32)}
+
+# Stored on civic_issues: cells of about 5 m x 5 m
+GEOHASH_PRECISION = 9
+
+# Sorts after every geohash character, so [cell, cell + GEOHASH_END) is the prefix range
+GEOHASH_END = "{"
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+
+BBox = Tuple[float, float, float, float]  # min_lat, min_lon, max_lat, max_lon
+
+
+def encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash of a point, ``precision`` characters long"""
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"Invalid coordinates: {lat}, {lon}")
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def decode_bbox(geohash: str) -> BBox:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if (value >> shift) & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(lat: float, lon: float, radius_m: float) -> BBox:
+    """Box enclosing the circle; ``min_lon > max_lon`` when it crosses the antimeridian"""
+    d_lat = radius_m / METERS_PER_DEGREE_LAT
+    min_lat, max_lat = max(-90.0, lat - d_lat), min(90.0, lat + d_lat)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if max_lat >= 90 or min_lat <= -90 or cos_lat < 1e-9:
+        return min_lat, -180.0, max_lat, 180.0
+    d_lon = d_lat / cos_lat
+    if d_lon >= 180:
+        return min_lat, -180.0, max_lat, 180.0
+    min_lon, max_lon = lon - d_lon, lon + d_lon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def split_antimeridian(bbox: BBox) -> List[BBox]:
+    min_lat, min_lon, max_lat, max_lon = bbox
+    if min_lon <= max_lon:
+        return [bbox]
+    return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+
+
+def _cell_span(low: float, high: float, origin: float, size: float, last: int) -> range:
+    first = int((low - origin) // size)
+    end = min(int((high - origin) // size), last)
+    return range(max(first, 0), end + 1)
+
+
+def covering_cells(bbox: BBox, max_cells: int = 16, max_precision: int = GEOHASH_PRECISION) -> List[str]:
+    """Geohash cells covering ``bbox`` at the finest precision that needs at most ``max_cells``"""
+    parts = split_antimeridian(bbox)
+    for precision in range(max_precision, 0, -1):
+        height, width = cell_size(precision)
+        lat_cells, lon_cells = round(180 / height), round(360 / width)
+        spans = [
+            (_cell_span(min_lat, max_lat, -90.0, height, lat_cells - 1),
+             _cell_span(min_lon, max_lon, -180.0, width, lon_cells - 1))
+            for min_lat, min_lon, max_lat, max_lon in parts
+        ]
+        if sum(len(rows) * len(columns) for rows, columns in spans) > max_cells and precision > 1:
+            continue
+        cells = set()
+        for rows, columns in spans:
+            for row in rows:
+                for column in columns:
+                    cells.add(encode(-90.0 + (row + 0.5) * height, -180.0 + (column + 0.5) * width, precision))
+        return sorted(cells)
+    return []
+
+
+def tile_bbox(z: int, x: int, y: int) -> BBox:
+    """Bounds of a Web Mercator (slippy map) tile"""
+    n = 2 ** z
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def lat_lon_to_tile(lat: float, lon: float, z: int) -> Tuple[int, int]:
+    n = 2 ** z
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(x, n - 1), min(y, n - 1)
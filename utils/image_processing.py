@@ -0,0 +1,124 @@
+import io
+import logging
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMAT_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif"
+}
+
+DERIVED_SUFFIXES = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+
+def sniff_mime_type(image_bytes: bytes) -> str:
+    """MIME type from the file signature, defaulting to JPEG"""
+    if image_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if image_bytes[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "image/jpeg"
+
+
+def preprocess_image(
+    image_bytes: bytes,
+    max_dimension: int = 1024,
+    quality: int = 85,
+    output_format: str = "JPEG"
+) -> Tuple[bytes, str]:
+    """Prepare an upload for vision inference.
+
+    Applies the EXIF orientation, downscales so the longest side is at most
+    ``max_dimension``, flattens transparency and re-encodes to
+    ``output_format`` without metadata. Returns ``(bytes, mime_type)``.
+    Undecodable input is passed through unchanged with its sniffed MIME type.
+    """
+    output_format = output_format.upper()
+    if output_format not in DERIVED_SUFFIXES:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            source_format = img.format
+            has_metadata = bool(img.getexif()) or "icc_profile" in img.info
+            oriented = ImageOps.exif_transpose(img)
+            oversized = max(oriented.size) > max_dimension
+
+            if oriented.mode in ("RGBA", "LA", "P"):
+                rgba = oriented.convert("RGBA")
+                flattened = Image.new("RGB", rgba.size, (255, 255, 255))
+                flattened.paste(rgba, mask=rgba.split()[-1])
+                oriented = flattened
+            elif oriented.mode != "RGB":
+                oriented = oriented.convert("RGB")
+
+            if oversized:
+                oriented.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+            buffer = io.BytesIO()
+            oriented.save(buffer, format=output_format, quality=quality, optimize=True)
+            processed = buffer.getvalue()
+    except Exception:
+        return image_bytes, sniff_mime_type(image_bytes)
+
+    # Small, clean uploads can already be tighter than our re-encode.
+    if (
+        not oversized
+        and not has_metadata
+        and source_format in FORMAT_MIME_TYPES
+        and len(image_bytes) <= len(processed)
+    ):
+        return image_bytes, FORMAT_MIME_TYPES[source_format]
+
+    return processed, FORMAT_MIME_TYPES[output_format]
+
+
+def derived_image_path(
+    image_path: str,
+    output_format: str = "JPEG",
+    max_dimension: int = 1024,
+    quality: int = 85
+) -> Path:
+    """Location of the inference-ready copy kept next to the original upload.
+
+    The encoding settings are part of the name (``report.vision-1024q85.jpg``),
+    so changing ``VISION_MAX_DIMENSION`` or the quality never serves a copy
+    made with the old settings.
+    """
+    path = Path(image_path)
+    suffix = DERIVED_SUFFIXES[output_format.upper()]
+    return path.with_name(f"{path.stem}.vision-{max_dimension}q{quality}{suffix}")
+
+
+def load_or_create_derived(
+    image_path: str,
+    image_bytes: Optional[bytes] = None,
+    max_dimension: int = 1024,
+    quality: int = 85,
+    output_format: str = "JPEG"
+) -> Tuple[bytes, str]:
+    """Return the preprocessed image, reusing the cached copy in ``uploads/`` if present"""
+    derived = derived_image_path(image_path, output_format, max_dimension, quality)
+    source = Path(image_path)
+
+    if derived.exists() and (not source.exists() or derived.stat().st_mtime >= source.stat().st_mtime):
+        data = derived.read_bytes()
+        return data, sniff_mime_type(data)
+
+    if image_bytes is None:
+        image_bytes = source.read_bytes()
+
+    processed, mime_type = preprocess_image(image_bytes, max_dimension, quality, output_format)
+    try:
+        derived.write_bytes(processed)
+    except OSError as e:
+        logger.warning("Could not cache preprocessed image %s: %s", derived, e)
+    return processed, mime_type
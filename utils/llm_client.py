@@ -0,0 +1,316 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import groq
+import httpx
+from dotenv import load_dotenv
+
+from utils import metrics
+from utils.rate_limit import RateLimiter
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Rough vision cost of one image; text is estimated at ~4 characters per token
+IMAGE_TOKEN_ESTIMATE = 1500
+
+# USD per 1M (prompt, completion) tokens: Groq list prices; override with LLM_PRICES='{"model": [in, out]}'
+MODEL_PRICES = {
+    "meta-llama/llama-4-maverick-17b-128e-instruct": (0.20, 0.60),
+    "meta-llama/llama-4-scout-17b-16e-instruct": (0.11, 0.34),
+    "llama-3.3-70b-versatile": (0.59, 0.79)
+}
+MODEL_PRICES.update({model: tuple(prices) for model, prices in json.loads(os.getenv("LLM_PRICES") or "{}").items()})
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stops calling a failing provider for ``reset_timeout`` seconds.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast. Once the timeout has passed one trial call is let
+    through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: int = 0) -> int:
+    """Upper-bound guess of a request's token cost, charged before the call"""
+    tokens = max_tokens or 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content) // 4 + 1
+            continue
+        for part in content or []:
+            if part.get("type") == "image_url":
+                tokens += IMAGE_TOKEN_ESTIMATE
+            else:
+                tokens += len(part.get("text", "")) // 4 + 1
+    return tokens
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """``Retry-After`` (or ``retry-after-ms``) of an HTTP error response, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """Rate-limited, retrying wrapper around a Groq client.
+
+    Exposes the same ``chat.completions.create`` call as ``groq.Groq`` so the
+    agents (and the fake Groq client used by tests and benchmarks) are unchanged.
+    Every call waits on the process-wide request and token buckets, runs
+    with a timeout, and is retried with exponential backoff and full jitter
+    on 429 / 5xx / timeouts, sleeping for ``Retry-After`` when the provider
+    sends one. Repeated provider failures open a circuit breaker so callers
+    fall back immediately instead of queueing on a dead endpoint.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        request_burst: float = 5,
+        max_retries: int = 3,
+        timeout: float = 30.0,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        breaker: CircuitBreaker = None
+    ):
+        self.client = client
+        self.request_limiter = RateLimiter(requests_per_minute / 60.0, burst=request_burst)
+        self.token_limiter = RateLimiter(tokens_per_minute / 60.0, burst=tokens_per_minute)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.counters = {
+            "calls": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "circuit_rejections": 0
+        }
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model: str, messages: List[Dict[str, Any]], **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        estimate = estimate_tokens(messages, kwargs.get("max_tokens", 0))
+
+        caller = metrics.llm_caller.get()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count("circuit_rejections")
+                metrics.LLM_REQUESTS.labels(model, caller, "circuit_open").inc()
+                raise CircuitOpenError("LLM provider circuit is open; skipping call")
+
+            self.request_limiter.acquire()
+            if self.token_limiter.rate > 0:
+                self.token_limiter.acquire(min(estimate, self.token_limiter.capacity))
+            self._count("calls")
+
+            start = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+            except Exception as e:
+                metrics.LLM_LATENCY.labels(model, caller).observe(time.perf_counter() - start)
+                status = getattr(e, "status_code", None)
+                metrics.LLM_REQUESTS.labels(model, caller, "rate_limited" if status == 429 else "error").inc()
+                if status == 429:
+                    self._count("rate_limited")
+                    # Throttling is not an outage; don't trip the breaker
+                    self.breaker.record_success()
+                elif self._is_provider_failure(e):
+                    self.breaker.record_failure()
+                else:
+                    # Our request was rejected (4xx): retrying won't help
+                    self.breaker.record_success()
+                    raise
+
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = self._backoff(attempt, retry_after_seconds(e))
+                logger.warning("LLM call to %s failed (%s); retrying in %.2fs", model, e.__class__.__name__, delay)
+                self._count("retries")
+                metrics.LLM_RETRIES.labels(model).inc()
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            metrics.LLM_LATENCY.labels(model, caller).observe(time.perf_counter() - start)
+            metrics.LLM_REQUESTS.labels(model, caller, "ok").inc()
+            self.breaker.record_success()
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                record_usage(model, caller, usage)
+                if getattr(usage, "total_tokens", None) is not None:
+                    self.token_limiter.adjust(usage.total_tokens - estimate)
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {**counters, "circuit": self.breaker.state}
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            # The provider knows when capacity frees up; add a little jitter
+            # so retries from many threads don't land at the same instant.
+            return min(self.backoff_max, retry_after) + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _is_provider_failure(error: Exception) -> bool:
+        if isinstance(error, (groq.APIConnectionError, httpx.TransportError)):
+            return True
+        status = getattr(error, "status_code", None)
+        return status is not None and (status >= 500 or status in RETRYABLE_STATUS)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+
+def record_usage(model: str, caller: str, usage):
+    """Token and cost counters from a completion's ``usage``"""
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    metrics.LLM_TOKENS.labels(model, caller, "prompt").inc(prompt_tokens)
+    metrics.LLM_TOKENS.labels(model, caller, "completion").inc(completion_tokens)
+    prices = MODEL_PRICES.get(model)
+    if prices:
+        metrics.LLM_COST.labels(model, caller).inc(
+            (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+        )
+
+
+def build_llm_client(base_url: str = None, api_key: str = None) -> LLMClient:
+    """Create an ``LLMClient`` configured by ``GROQ_*`` / ``LLM_*`` env vars.
+
+    The underlying Groq client keeps its own retries off (they would ignore
+    our limiter and breaker) and uses one pooled httpx client, so every
+    agent reuses the same keep-alive connections.
+    """
+    timeout = float(os.getenv("LLM_TIMEOUT", "30"))
+    http_client = httpx.Client(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+        )
+    )
+    client = groq.Groq(
+        api_key=api_key or os.getenv("GROQ_API_KEY"),
+        base_url=base_url or os.getenv("GROQ_BASE_URL") or None,
+        max_retries=0,
+        timeout=timeout,
+        http_client=http_client
+    )
+    return LLMClient(
+        client,
+        requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")),
+        tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "0")),
+        request_burst=float(os.getenv("LLM_REQUEST_BURST", "5")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        timeout=timeout,
+        backoff_base=float(os.getenv("LLM_BACKOFF_BASE", "0.5")),
+        backoff_max=float(os.getenv("LLM_BACKOFF_MAX", "20")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET", "30"))
+        )
+    )
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide client shared by every agent, so limits apply to the whole process"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_llm_client()
+    return _client
+
+
+metrics.LLM_CIRCUIT_OPEN.set_function(
+    lambda: 1.0 if _client is not None and _client.breaker.state == "open" else 0.0
+)
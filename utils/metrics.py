@@ -0,0 +1,375 @@
+"""
+Process-wide metrics in the Prometheus text exposition format.
+
+A small stand-in for ``prometheus_client`` (same ``Counter`` / ``Gauge`` /
+``Histogram`` / ``labels()`` calls, ``generate_latest`` for a ``/metrics``
+endpoint) so the services need no extra dependency. ``parse_metrics``
+reads a scrape back for ``monitoring/health_check.py``.
+
+The metrics the services record are declared at the bottom of this
+module so every process exposes the same names.
+"""
+
+import bisect
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric"):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional["_Metric"]:
+        return self._metrics.get(name)
+
+    def collect(self) -> List["_Metric"]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def reset(self):
+        """Zero every metric (tests and benchmarks)"""
+        for metric in self.collect():
+            metric.reset()
+
+
+REGISTRY = Registry()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values, **labels):
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def reset(self):
+        with self._lock:
+            self._children.clear()
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+    def samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, label_names, label_values, value in self.samples():
+            lines.append(f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+    def samples(self):
+        return [
+            (f"{self.name}_total" if not self.name.endswith("_total") else self.name, self.labelnames, key, child.value)
+            for key, child in self._items()
+        ]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; ``set_function`` makes it read a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._unlabelled().dec(amount)
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def set_function(self, function: Callable[[], object]):
+        """``function`` returns the value, or ``{label values: value}`` for a labelled gauge"""
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                values = self._function()
+            except Exception:
+                values = {}
+            if not isinstance(values, dict):
+                values = {(): values}
+            return [
+                (self.name, self.labelnames, tuple(str(v) for v in key), float(value))
+                for key, value in sorted(values.items()) if value is not None
+            ]
+        return [(self.name, self.labelnames, key, child.value) for key, child in self._items()]
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+    def samples(self):
+        samples = []
+        bucket_labels = self.labelnames + ("le",)
+        for key, child in self._items():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", bucket_labels, key + (_format_value(bound),), cumulative))
+            samples.append((f"{self.name}_sum", self.labelnames, key, total))
+            samples.append((f"{self.name}_count", self.labelnames, key, cumulative))
+        return samples
+
+
+def generate_latest(registry: Registry = REGISTRY) -> bytes:
+    lines = []
+    for metric in registry.collect():
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_metrics(text: str) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    """``{sample name: [(labels, value), ...]}`` from a text exposition"""
+    parsed: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        label_dict = {
+            key: raw.replace('\\"', '"').replace("\\n", "\n").replace("\\\\", "\\")
+            for key, raw in _LABEL.findall(labels or "")
+        }
+        parsed.setdefault(name, []).append((label_dict, float(value)))
+    return parsed
+
+
+def instrument_app(app, service: str):
+    """Count and time the requests of a FastAPI ``app`` per route, and serve ``GET /metrics``"""
+    from starlette.responses import Response
+
+    @app.middleware("http")
+    async def record_request(request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # The route template, not the raw path, keeps label cardinality bounded
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.labels(service, request.method, route, status).inc()
+            HTTP_LATENCY.labels(service, request.method, route).observe(time.perf_counter() - start)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+# Which agent an LLM call is made for; set around graph nodes and background work
+llm_caller: ContextVar[str] = ContextVar("llm_caller", default="other")
+
+
+@contextmanager
+def caller(name: str):
+    token = llm_caller.set(name)
+    try:
+        yield
+    finally:
+        llm_caller.reset(token)
+
+
+# Latency buckets for LLM completions, which take seconds rather than milliseconds
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+HTTP_REQUESTS = Counter(
+    "civic_http_requests", "HTTP requests handled", ["service", "method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "civic_http_request_duration_seconds", "HTTP request latency", ["service", "method", "route"]
+)
+NODE_LATENCY = Histogram(
+    "civic_node_duration_seconds", "Duration of each agent workflow node", ["node"]
+)
+NODE_ERRORS = Counter(
+    "civic_node_errors", "Agent workflow nodes that raised", ["node"]
+)
+LLM_REQUESTS = Counter(
+    "civic_llm_requests", "LLM completion attempts by outcome (ok | error | rate_limited | circuit_open)",
+    ["model", "caller", "outcome"]
+)
+LLM_LATENCY = Histogram(
+    "civic_llm_request_duration_seconds", "Latency of single LLM completion attempts", ["model", "caller"],
+    buckets=LLM_BUCKETS
+)
+LLM_RETRIES = Counter("civic_llm_retries", "LLM attempts retried after a failure", ["model"])
+LLM_TOKENS = Counter(
+    "civic_llm_tokens", "Tokens reported in LLM response usage (kind: prompt | completion)",
+    ["model", "caller", "kind"]
+)
+LLM_COST = Counter(
+    "civic_llm_cost_usd", "Estimated LLM spend from usage and LLM_PRICES", ["model", "caller"]
+)
+LLM_CIRCUIT_OPEN = Gauge("civic_llm_circuit_open", "1 while the LLM circuit breaker is open")
+FALLBACKS = Counter(
+    "civic_fallbacks", "Agent results replaced by a canned fallback after an LLM failure", ["agent"]
+)
+CACHE_LOOKUPS = Counter(
+    "civic_cache_lookups", "Cache lookups by cache and result (hit results differ per cache; miss)",
+    ["cache", "result"]
+)
+DB_QUERY_LATENCY = Histogram(
+    "civic_db_query_duration_seconds", "Duration of SQL statements by operation", ["operation"],
+    buckets=DB_BUCKETS
+)
+DB_ERRORS = Counter("civic_db_errors", "SQL statements that raised", ["operation"])
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    "civic_scheduler_queue_depth", "Reports waiting for an agent worker by priority class", ["priority"]
+)
+SCHEDULER_RUNNING = Gauge(
+    "civic_scheduler_running", "Reports being processed by priority class", ["priority"]
+)
+SCHEDULER_WAIT = Histogram(
+    "civic_scheduler_wait_seconds", "Time reports spent queued before a worker picked them up", ["priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+CASCADE_DECISIONS = Counter(
+    "civic_cascade_decisions", "Screened images by outcome (skipped | escalated | screen_failed)", ["decision"]
+)
+CASCADE_AGREEMENT = Counter(
+    "civic_cascade_agreement", "Screen vs large vision model agreement on escalated images", ["field", "agreed"]
+)
+STRUCTURED_OUTPUTS = Counter(
+    "civic_llm_structured_outputs", "JSON LLM responses by schema and parse outcome (valid | repaired | invalid)",
+    ["schema", "outcome"]
+)
@@ -0,0 +1,57 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` acquisitions per second.
+
+    Up to ``burst`` tokens can be spent back to back after an idle period;
+    afterwards callers are spaced ``1 / rate`` seconds apart. A ``rate`` of
+    0 (or less) disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, count: float, burst: float = None) -> "RateLimiter":
+        return cls(count / 60.0, burst=burst if burst is not None else 1.0)
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until ``tokens`` are available and take them"""
+        while True:
+            wait = self._take(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        return self._take(tokens) <= 0
+
+    def adjust(self, tokens: float):
+        """Charge (positive) or refund (negative) ``tokens`` without blocking.
+
+        Used once the real cost of a call is known; charging can leave the
+        bucket in debt, which later callers wait out.
+        """
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens - tokens)
+
+    def _take(self, tokens: float) -> float:
+        """Take ``tokens`` if available (returns 0), else the seconds to wait"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
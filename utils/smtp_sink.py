@@ -0,0 +1,140 @@
+"""
+Minimal local SMTP server that accepts every message and keeps it in memory.
+
+A stand-in for a real mail relay when developing or testing the
+notification outbox with ``NOTIFICATION_TRANSPORT=smtp``:
+
+    python utils/smtp_sink.py --port 1025
+    SMTP_HOST=localhost SMTP_PORT=1025 NOTIFICATION_TRANSPORT=smtp python app/main.py
+
+Only the commands ``smtplib`` needs for plain delivery are implemented
+(EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT). ``fail_next`` makes the
+next N messages be rejected with a 451 so retry paths can be exercised.
+"""
+
+import argparse
+import socketserver
+import threading
+from email import message_from_bytes
+from typing import List
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        sink = self.server.sink
+        sink.opened()
+        self._reply("220 smtp-sink ready")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250 smtp-sink")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip().strip("<>"), []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip().strip("<>"))
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                if sink.take_failure():
+                    self._reply("451 Temporary failure, try again later")
+                else:
+                    sink.record(sender, recipients, b"".join(data))
+                    self._reply("250 OK: queued")
+                sender, recipients = None, []
+            elif verb == "RSET":
+                sender, recipients = None, []
+                self._reply("250 OK")
+            elif verb == "NOOP":
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+    def _reply(self, text: str):
+        self.wfile.write(f"{text}\r\n".encode())
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """In-memory SMTP server on ``host:port`` (port 0 picks a free one)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, verbose: bool = False):
+        self.messages: List[dict] = []
+        self.connections = 0
+        self.fail_next = 0
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def record(self, sender: str, recipients: List[str], data: bytes):
+        message = message_from_bytes(data)
+        entry = {
+            "from": sender,
+            "to": recipients,
+            "subject": message.get("Subject"),
+            "body": message.get_payload(decode=True).decode("utf-8", "replace") if not message.is_multipart() else "",
+            "message": message
+        }
+        with self._lock:
+            self.messages.append(entry)
+        if self.verbose:
+            print(f"--- mail from {sender} to {', '.join(recipients)}: {entry['subject']}\n{entry['body']}\n")
+
+    def opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def take_failure(self) -> bool:
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return True
+            return False
+
+    def start(self) -> "SMTPSink":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, verbose=True).start()
+    print(f"SMTP sink listening on {sink.host}:{sink.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        sink.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+JSON responses from the LLM, validated against Pydantic schemas.
+
+``complete_structured`` asks the provider for JSON mode
+(``response_format={"type": "json_object"}``, ``LLM_JSON_MODE``), parses
+the answer and validates it. A response that is not valid JSON first goes
+through ``repair_json`` (markdown fences, prose around the object,
+trailing commas, truncated output; ``LLM_JSON_REPAIR``), which costs
+nothing; only when repair or validation fails is the model asked again,
+at most ``LLM_PARSE_RETRIES`` times. Every parsed response is counted in
+``civic_llm_structured_outputs`` by schema and outcome.
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator, model_validator
+
+from utils import metrics
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+JSON_REPAIR = os.getenv("LLM_JSON_REPAIR", "true").lower() == "true"
+PARSE_RETRIES = int(os.getenv("LLM_PARSE_RETRIES", "1"))
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+
+
+class StructuredOutputError(ValueError):
+    """Raised when no response could be parsed into the schema; ``attempts`` counts the calls made"""
+
+    def __init__(self, message: str, attempts: int = 1):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+class ScreenOutput(BaseModel):
+    """Answer of the screening model"""
+    issue_detected: bool
+    issue_type: str = "none"
+    confidence: float
+
+    @field_validator("confidence")
+    @classmethod
+    def _clamp(cls, value: float) -> float:
+        return min(1.0, max(0.0, value))
+
+
+class DetectionOutput(BaseModel):
+    """Answer of the large vision model"""
+    model_config = ConfigDict(extra="allow")
+
+    issue_detected: bool
+    issue_type: str = "none"
+    severity: str = "medium"
+    description: str = ""
+    confidence: float = 0.0
+
+    @field_validator("issue_type", "severity")
+    @classmethod
+    def _lower(cls, value: str) -> str:
+        return value.strip().lower()
+
+    @field_validator("confidence")
+    @classmethod
+    def _clamp(cls, value: float) -> float:
+        return min(1.0, max(0.0, value))
+
+
+class ActionPlanOutput(BaseModel):
+    """Action plan; a truncated plan is kept as long as it has at least one action"""
+    immediate_actions: List[str] = []
+    citizen_actions: List[str] = []
+    authority_actions: List[str] = []
+    preventive_measures: List[str] = []
+
+    @model_validator(mode="after")
+    def _not_empty(self):
+        if not any((self.immediate_actions, self.citizen_actions, self.authority_actions, self.preventive_measures)):
+            raise ValueError("action plan has no actions")
+        return self
+
+
+def _closers(stack: List[str]) -> str:
+    return "".join(reversed(stack))
+
+
+def repair_json(raw: str) -> str:
+    """Best-effort valid JSON text for the first object in ``raw``; raises ValueError if there is none.
+
+    Takes the content of a markdown fence, drops prose before the first
+    ``{`` and after the object, removes trailing commas, and closes a
+    truncated object: an unterminated string is closed in place, and if
+    the result still does not parse it is cut back to the last complete
+    member.
+    """
+    fenced = _FENCE.search(raw)
+    text = fenced.group(1) if fenced else raw
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("no JSON object in the response")
+
+    out, stack, cuts = [], [], []
+    in_string = escaped = False
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            out.append(ch)
+            if stack:
+                stack.pop()
+            if not stack:
+                return "".join(out)
+            continue
+        elif ch == ",":
+            cuts.append((len(out), list(stack)))
+        out.append(ch)
+
+    # Truncated: close what is open, else cut back to the last complete member
+    text = "".join(out) + ('"' if in_string else "")
+    candidates = [text.rstrip().rstrip(",") + _closers(stack)]
+    candidates += [text[:position] + _closers(open_stack) for position, open_stack in reversed(cuts)]
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+        except ValueError:
+            continue
+        return candidate
+    raise ValueError("could not repair truncated JSON")
+
+
+def parse_structured(raw: str, schema: Type[BaseModel], repair: bool = None) -> Dict[str, Any]:
+    """Validate ``raw`` against ``schema``, repairing it locally if needed; raises StructuredOutputError"""
+    repair = JSON_REPAIR if repair is None else repair
+    outcome = "valid"
+    try:
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            if not repair:
+                raise
+            data = json.loads(repair_json(raw))
+            outcome = "repaired"
+        result = schema.model_validate(data).model_dump()
+    except (ValueError, ValidationError) as e:
+        metrics.STRUCTURED_OUTPUTS.labels(schema.__name__, "invalid").inc()
+        raise StructuredOutputError(f"{schema.__name__}: {e}") from e
+    metrics.STRUCTURED_OUTPUTS.labels(schema.__name__, outcome).inc()
+    return result
+
+
+def failed_generation(error: Exception) -> Optional[str]:
+    """Text the provider rejected in JSON mode (Groq's ``json_validate_failed``), if ``error`` carries it"""
+    body = getattr(error, "body", None)
+    if not isinstance(body, dict):
+        return None
+    details = body.get("error", body)
+    return details.get("failed_generation") if isinstance(details, dict) else None
+
+
+def complete_structured(
+    client,
+    schema: Type[BaseModel],
+    retries: int = None,
+    repair: bool = None,
+    **request
+) -> Tuple[Dict[str, Any], Any, int]:
+    """Chat completion parsed into ``schema``: ``(result, response, calls made)``.
+
+    ``request`` is passed to ``client.chat.completions.create``. Call
+    errors propagate unchanged (the client already retried them); a
+    JSON-mode rejection is parsed from its failed generation, in which
+    case ``response`` is None.
+    """
+    retries = PARSE_RETRIES if retries is None else retries
+    if JSON_MODE:
+        request.setdefault("response_format", {"type": "json_object"})
+
+    error = None
+    for attempt in range(1, retries + 2):
+        try:
+            response = client.chat.completions.create(**request)
+            content = response.choices[0].message.content or ""
+        except Exception as e:
+            content = failed_generation(e)
+            if content is None:
+                raise
+            response = None
+        try:
+            return parse_structured(content, schema, repair), response, attempt
+        except StructuredOutputError as e:
+            error = e
+            if attempt <= retries:
+                logger.info("Unparseable %s response, asking again: %s", schema.__name__, e)
+    raise StructuredOutputError(str(error), attempts=retries + 1)
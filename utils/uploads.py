@@ -0,0 +1,175 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import aiofiles
+from PIL import ImageFile
+
+from utils.image_processing import sniff_mime_type
+
+CHUNK_SIZE = 64 * 1024
+
+MIME_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif"
+}
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured byte limit"""
+
+
+class InvalidImageError(Exception):
+    """Raised when an upload is not a decodable image"""
+
+
+class SavedUpload(NamedTuple):
+    path: Path
+    sha256: str
+    size: int
+    width: int
+    height: int
+    content_type: str
+    data: bytes
+
+
+async def save_upload(
+    upload,
+    upload_dir: Path,
+    max_bytes: int,
+    max_pixels: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> SavedUpload:
+    """Stream ``upload`` to disk in chunks, hashing and sniffing it in the same pass.
+
+    The file is written under a temporary name and then renamed to
+    ``<sha256><ext>``, so concurrent uploads never collide and identical
+    photos share one file. The bytes are also returned so callers don't have
+    to read the file back. Raises ``UploadTooLargeError`` as soon as
+    ``max_bytes`` is crossed and ``InvalidImageError`` if no image header
+    can be parsed.
+    """
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = upload_dir / f".{uuid.uuid4().hex}.part"
+
+    hasher = hashlib.sha256()
+    parser = ImageFile.Parser()
+    chunks = []
+    size = 0
+
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+
+                hasher.update(chunk)
+                # Only the header is needed for the dimensions; stop feeding
+                # the parser once it knows them to avoid decoding the image.
+                if parser.image is None:
+                    try:
+                        parser.feed(chunk)
+                    except Exception:
+                        pass
+                chunks.append(chunk)
+                await out.write(chunk)
+    except Exception:
+        _remove_quietly(temp_path)
+        raise
+
+    if parser.image is None:
+        _remove_quietly(temp_path)
+        raise InvalidImageError("Uploaded file is not a valid image")
+
+    width, height = parser.image.size
+    if max_pixels and width * height > max_pixels:
+        _remove_quietly(temp_path)
+        raise UploadTooLargeError(f"Image is {width}x{height}, above the {max_pixels} pixel limit")
+
+    data = b"".join(chunks)
+    digest = hasher.hexdigest()
+    content_type = sniff_mime_type(data[:16])
+    final_path = upload_dir / f"{digest}{MIME_EXTENSIONS.get(content_type, '.jpg')}"
+
+    if final_path.exists():
+        _remove_quietly(temp_path)
+    else:
+        os.replace(temp_path, final_path)
+
+    return SavedUpload(
+        path=final_path,
+        sha256=digest,
+        size=size,
+        width=width,
+        height=height,
+        content_type=content_type,
+        data=data
+    )
+
+
+def store_image_bytes(
+    data: bytes,
+    upload_dir: Path,
+    max_bytes: int,
+    max_pixels: Optional[int] = None
+) -> SavedUpload:
+    """Synchronous counterpart of ``save_upload`` for images already in memory.
+
+    Applies the same limits and content-addressed naming; used for images
+    read out of batch archives and directories.
+    """
+    if len(data) > max_bytes:
+        raise UploadTooLargeError(f"Image exceeds the {max_bytes} byte limit")
+
+    parser = ImageFile.Parser()
+    for offset in range(0, len(data), CHUNK_SIZE):
+        try:
+            parser.feed(data[offset:offset + CHUNK_SIZE])
+        except Exception:
+            break
+        if parser.image is not None:
+            break
+    if parser.image is None:
+        raise InvalidImageError("File is not a valid image")
+
+    width, height = parser.image.size
+    if max_pixels and width * height > max_pixels:
+        raise UploadTooLargeError(f"Image is {width}x{height}, above the {max_pixels} pixel limit")
+
+    digest = hashlib.sha256(data).hexdigest()
+    content_type = sniff_mime_type(data[:16])
+    final_path = upload_dir / f"{digest}{MIME_EXTENSIONS.get(content_type, '.jpg')}"
+    if not final_path.exists():
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = upload_dir / f".{uuid.uuid4().hex}.part"
+        try:
+            temp_path.write_bytes(data)
+            os.replace(temp_path, final_path)
+        except Exception:
+            _remove_quietly(temp_path)
+            raise
+
+    return SavedUpload(
+        path=final_path,
+        sha256=digest,
+        size=len(data),
+        width=width,
+        height=height,
+        content_type=content_type,
+        data=data
+    )
+
+
+def _remove_quietly(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass